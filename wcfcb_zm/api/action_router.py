@@ -0,0 +1,251 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Registry-based action routing for the multi-action API endpoints.
+
+An endpoint such as `budget_virement_handler` owns an ActionRouter. Actions are
+registered with a decorator that declares their parameters; the router coerces
+the raw request arguments once, calls the action and returns its value directly.
+Every call is timed into a per-action histogram kept in Redis so all workers
+report into the same counters.
+
+Every router also exposes a `batch` action that runs several actions in one
+request. Functions decorated with `shared_cache` are evaluated once per batch,
+so actions that need the same Budget Request or budget list share one load.
+"""
+
+import functools
+import time
+
+import frappe
+
+from wcfcb_zm.api.redis_stats import delete_stats, full_histogram, read_stats, record_call
+
+# Values older client code sends for "not set"
+EMPTY_VALUES = (None, '', 'None', 'null', 'undefined')
+
+# Upper bound on the number of actions a single batch request may run
+MAX_BATCH_SIZE = 25
+
+
+class ActionArgumentError(Exception):
+    """Raised when request arguments do not match an action's parameter schema"""
+
+
+class Param:
+    """Declared parameter of a router action.
+
+    `type` is one of str, float, int, bool, list or dict. `aliases` are older
+    argument names that are accepted for the same parameter.
+    """
+
+    def __init__(self, type=str, required=False, default=None, aliases=()):
+        self.type = type
+        self.required = required
+        self.default = default
+        self.aliases = tuple(aliases)
+
+    def coerce(self, name, value):
+        if value in EMPTY_VALUES:
+            return self.default
+
+        try:
+            if self.type is str:
+                return str(value).strip()
+            if self.type is float:
+                return float(value)
+            if self.type is int:
+                return int(float(value))
+            if self.type is bool:
+                if isinstance(value, str):
+                    return value.strip().lower() in ('1', 'true', 'yes')
+                return bool(value)
+            if self.type in (list, dict):
+                value = frappe.parse_json(value) if isinstance(value, str) else value
+                if not isinstance(value, self.type):
+                    raise ValueError
+                return value
+        except (TypeError, ValueError):
+            raise ActionArgumentError(f'Invalid value for {name}: expected {self.type.__name__}')
+
+        return value
+
+
+class ActionRouter:
+    """Dispatch table mapping action names to functions with parameter schemas"""
+
+    def __init__(self, name):
+        self.name = name
+        self.actions = {'batch': (self.dispatch_batch, {'calls': Param(list, required=True)})}
+
+    def action(self, action_name=None, /, **params):
+        """Register the decorated function as an action.
+
+        Keyword arguments map parameter names to Param instances. The function
+        itself is returned unchanged so it can still be called directly.
+        """
+        def decorator(fn):
+            self.actions[action_name or fn.__name__] = (fn, params)
+            return fn
+        return decorator
+
+    def parse_args(self, action, kwargs):
+        """Coerce raw request arguments against the action's schema; unknown arguments are ignored"""
+        fn, params = self.actions[action]
+        args = {}
+        missing = []
+
+        for param_name, param in params.items():
+            value = kwargs.get(param_name)
+            for alias in param.aliases:
+                if value in EMPTY_VALUES:
+                    value = kwargs.get(alias)
+
+            value = param.coerce(param_name, value)
+            if param.required and value is None:
+                missing.append(param_name)
+            args[param_name] = value
+
+        if missing:
+            raise ActionArgumentError('Missing required parameters: ' + ', '.join(missing))
+
+        return args
+
+    def dispatch(self, action, kwargs):
+        """Validate arguments, run the action and record its timing"""
+        if action not in self.actions:
+            return {
+                'success': False,
+                'message': 'Invalid action: ' + str(action)
+            }
+
+        try:
+            args = self.parse_args(action, kwargs)
+        except ActionArgumentError as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+
+        fn = self.actions[action][0]
+        start = time.perf_counter()
+        try:
+            return fn(**args)
+        finally:
+            record_action_timing(self.name, action, (time.perf_counter() - start) * 1000)
+
+    def dispatch_batch(self, calls):
+        """Run a list of {action, kwargs} entries in order and return their results in the same order.
+
+        Entries fail independently; a failing action does not stop the rest of the batch.
+        """
+        if len(calls) > MAX_BATCH_SIZE:
+            return {
+                'success': False,
+                'message': f'A batch may contain at most {MAX_BATCH_SIZE} actions'
+            }
+        if in_batch():
+            return {
+                'success': False,
+                'message': 'Batches cannot be nested'
+            }
+
+        frappe.local.action_batch_cache = {}
+        try:
+            results = []
+            for call in calls:
+                if not isinstance(call, dict) or call.get('action') in (None, 'batch'):
+                    results.append({
+                        'success': False,
+                        'message': 'Invalid batch entry: ' + str(call)
+                    })
+                    continue
+
+                try:
+                    results.append(self.dispatch(call['action'], call.get('kwargs') or {}))
+                except Exception as e:
+                    results.append({
+                        'success': False,
+                        'message': 'Operation failed: ' + str(e)
+                    })
+
+            return {
+                'success': True,
+                'results': results
+            }
+
+        finally:
+            frappe.local.action_batch_cache = None
+
+
+def in_batch():
+    """Whether the current request is running the actions of a batch"""
+    return getattr(frappe.local, 'action_batch_cache', None) is not None
+
+
+def shared_cache(fn):
+    """Evaluate fn once per argument set for the duration of the current batch.
+
+    Outside a batch the function is called through unchanged, so single actions
+    always read fresh data. Cached values are shared between actions and must be
+    treated as read-only.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        cache = getattr(frappe.local, 'action_batch_cache', None)
+        if cache is None:
+            return fn(*args, **kwargs)
+
+        key = get_shared_cache_key(fn, args, kwargs)
+        if key not in cache:
+            cache[key] = fn(*args, **kwargs)
+        return cache[key]
+
+    return wrapper
+
+
+def get_shared_cache_key(fn, args, kwargs=None):
+    """Key under which shared_cache keeps the result of fn(*args, **kwargs) in the batch cache"""
+    fn = getattr(fn, '__wrapped__', fn)
+    return (fn.__module__, fn.__qualname__, tuple(args), tuple(sorted((kwargs or {}).items())))
+
+
+def get_stats_key(router_name):
+    return frappe.cache().make_key(f'wcfcb_action_stats:{router_name}')
+
+
+def record_action_timing(router_name, action, elapsed_ms):
+    """Add one call to the action's counters"""
+    record_call(get_stats_key(router_name), action, elapsed_ms)
+
+
+@frappe.whitelist()
+def get_action_stats(router='budget_virement'):
+    """Per-action call counts, timings and histograms, busiest actions first"""
+    frappe.only_for('System Manager')
+
+    [raw] = read_stats([get_stats_key(router)])
+    actions = [
+        {
+            'action': action,
+            'count': int(metrics.get('count', 0)),
+            'total_ms': float(metrics.get('total_ms', 0)),
+            'histogram': full_histogram(metrics['histogram']),
+        }
+        for action, metrics in raw.items()
+    ]
+
+    total_ms = sum(stats['total_ms'] for stats in actions) or 1
+    for stats in actions:
+        stats['avg_ms'] = stats['total_ms'] / stats['count'] if stats['count'] else 0
+        stats['share_of_time'] = stats['total_ms'] / total_ms
+
+    return sorted(actions, key=lambda stats: stats['total_ms'], reverse=True)
+
+
+@frappe.whitelist()
+def reset_action_stats(router='budget_virement'):
+    """Clear the counters of a router"""
+    frappe.only_for('System Manager')
+    delete_stats([get_stats_key(router)])
@@ -0,0 +1,172 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Available balance of every account in a budget, in one grouped query.
+
+Follows the rules of `material_request.get_budget_details`:
+
+    available = budget amount
+              - actual expenses (submitted, uncancelled GL entries)
+              - Material Request commitments (reservations in the Budget Reservation Entry ledger)
+              - Purchase Order commitments (unbilled part of open Purchase Orders)
+
+all restricted to the budget's fiscal year and to its cost center or project.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+
+def get_budget_scope(budget_name):
+    """Fiscal year dates and the cost center or project a budget is set against"""
+    scope = frappe.db.sql("""
+        SELECT
+            b.name,
+            b.budget_against,
+            IF(b.budget_against = 'Project', b.project, b.cost_center) AS against_value,
+            fy.year_start_date,
+            fy.year_end_date
+        FROM
+            `tabBudget` b
+        INNER JOIN
+            `tabFiscal Year` fy ON fy.name = b.fiscal_year
+        WHERE
+            b.name = %s
+    """, budget_name, as_dict=True)
+
+    if not scope:
+        frappe.throw(_("Budget {0} not found").format(budget_name))
+
+    return scope[0]
+
+
+def get_budget_account_balances(budget_name, accounts=None):
+    """Budget, actuals, commitments and available balance per account of a budget.
+
+    Returns {account: row} for all accounts of the budget, or only for `accounts`
+    when given. Accounts not in the budget are left out.
+    """
+    scope = get_budget_scope(budget_name)
+    against_field = 'project' if scope.budget_against == 'Project' else 'cost_center'
+
+    account_condition = 'AND ba.account IN %(accounts)s' if accounts else ''
+    rows = frappe.db.sql("""
+        SELECT
+            ba.account,
+            ba.budget_amount,
+            IFNULL(gl.actual_expenses, 0) AS actual_expenses,
+            IFNULL(mr.material_request_committed, 0) AS material_request_committed,
+            IFNULL(po.purchase_order_committed, 0) AS purchase_order_committed
+        FROM
+            `tabBudget Account` ba
+        LEFT JOIN (
+            SELECT gl.account, SUM(gl.debit - gl.credit) AS actual_expenses
+            FROM `tabGL Entry` gl
+            WHERE gl.account IN (SELECT account FROM `tabBudget Account` WHERE parent = %(budget)s)
+              AND gl.docstatus = 1
+              AND gl.is_cancelled = 0
+              AND gl.posting_date BETWEEN %(year_start_date)s AND %(year_end_date)s
+              AND gl.{against_field} = %(against)s
+            GROUP BY gl.account
+        ) gl ON gl.account = ba.account
+        LEFT JOIN (
+            SELECT re.expense_account, SUM(re.amount) AS material_request_committed
+            FROM `tabBudget Reservation Entry` re
+            JOIN `tabMaterial Request` mr ON mr.name = re.material_request
+            WHERE re.expense_account IN (SELECT account FROM `tabBudget Account` WHERE parent = %(budget)s)
+              AND re.is_cancelled = 0
+              AND mr.status != 'Stopped'
+              AND re.transaction_date BETWEEN %(year_start_date)s AND %(year_end_date)s
+              AND re.{against_field} = %(against)s
+            GROUP BY re.expense_account
+        ) mr ON mr.expense_account = ba.account
+        LEFT JOIN (
+            -- Only the part not yet billed; billed amounts are already in GL as actuals
+            SELECT poi.expense_account, SUM(GREATEST(poi.base_amount - IFNULL(poi.billed_amt, 0) * IFNULL(po.conversion_rate, 1), 0)) AS purchase_order_committed
+            FROM `tabPurchase Order Item` poi
+            JOIN `tabPurchase Order` po ON po.name = poi.parent
+            WHERE poi.expense_account IN (SELECT account FROM `tabBudget Account` WHERE parent = %(budget)s)
+              AND po.docstatus = 1
+              AND po.status NOT IN ('Completed', 'Cancelled', 'Closed')
+              AND po.transaction_date BETWEEN %(year_start_date)s AND %(year_end_date)s
+              AND poi.{against_field} = %(against)s
+            GROUP BY poi.expense_account
+        ) po ON po.expense_account = ba.account
+        WHERE
+            ba.parent = %(budget)s
+            {account_condition}
+        ORDER BY
+            ba.idx
+    """.format(against_field=against_field, account_condition=account_condition), {
+        'budget': budget_name,
+        'accounts': tuple(accounts or ()),
+        'against': scope.against_value,
+        'year_start_date': scope.year_start_date,
+        'year_end_date': scope.year_end_date,
+    }, as_dict=True)
+
+    balances = {}
+    for row in rows:
+        for field in ('budget_amount', 'actual_expenses', 'material_request_committed', 'purchase_order_committed'):
+            row[field] = flt(row[field])
+        row['committed'] = row.material_request_committed + row.purchase_order_committed
+        row['available_balance'] = row.budget_amount - row.actual_expenses - row.committed
+        balances[row.account] = row
+
+    return balances
+
+
+def check_transfer_sufficiency(transfers, budget, target_budget=None):
+    """Check a list of transfers against live availability, in order.
+
+    `transfers` are dicts with from_account, to_account and amount_requested.
+    From accounts belong to `budget`, to accounts to `target_budget` (or to
+    `budget` for intra-budget transfers). Balances are loaded once per budget;
+    each row then drains its from account and feeds its to account, so later
+    rows see what earlier rows left behind.
+
+    Returns one result per transfer with the balances before and after it and
+    whether the from account could cover it.
+    """
+    target_budget = target_budget or budget
+    running = {}
+    for budget_name in {budget, target_budget}:
+        for account, balance in get_budget_account_balances(budget_name).items():
+            running[(budget_name, account)] = balance.available_balance
+
+    results = []
+    for idx, transfer in enumerate(transfers, start=1):
+        transfer = frappe._dict(transfer)
+        amount = abs(flt(transfer.amount_requested))
+        from_key = (budget, transfer.from_account)
+        to_key = (target_budget, transfer.to_account)
+
+        row = frappe._dict({
+            'idx': transfer.idx or idx,
+            'from_account': transfer.from_account,
+            'to_account': transfer.to_account,
+            'amount_requested': amount,
+            'from_available': running.get(from_key, 0.0),
+            'to_available': running.get(to_key, 0.0),
+        })
+
+        if from_key not in running:
+            row.message = _('Account {0} not found in budget {1}').format(transfer.from_account, budget)
+        elif to_key not in running:
+            row.message = _('Account {0} not found in budget {1}').format(transfer.to_account, target_budget)
+
+        row.from_remaining = row.from_available - amount
+        row.to_new_amount = row.to_available + amount
+        row.sufficient = not row.get('message') and row.from_remaining >= 0
+        row.shortfall = max(0.0, -row.from_remaining) if from_key in running else amount
+
+        if from_key in running:
+            running[from_key] = row.from_remaining
+        if to_key in running:
+            running[to_key] = row.to_new_amount
+
+        results.append(row)
+
+    return results
@@ -0,0 +1,88 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Budget arithmetic shared by the Material Request and Purchase Order checks.
+
+Everything here works on amounts that were already aggregated by SQL and does
+not touch the database, or even import frappe, so it can be tested and timed
+without a site:
+
+    available        = budget amount - actual expenses - MR committed - PO committed
+    monthly budget   = annual budget amount * month percentage / 100
+    status           = requested amount against the annual and monthly availability
+"""
+
+WITHIN_BUDGET = 'WITHIN BUDGET'
+EXCEEDS_BUDGET = 'EXCEEDS BUDGET'
+EXCEEDS_ANNUAL_BUDGET = 'EXCEEDS ANNUAL BUDGET'
+WITHIN_MONTHLY_BUDGET = 'WITHIN MONTHLY BUDGET'
+EXCEEDS_MONTHLY_BUDGET = 'EXCEEDS MONTHLY BUDGET'
+NO_MONTHLY_DISTRIBUTION = 'NO MONTHLY DISTRIBUTION'
+
+
+def to_amount(value):
+    """Float of an amount; None, empty values and Decimals from SQL are accepted"""
+    return float(value or 0)
+
+
+def available_amount(budget_amount, actual_expenses=0, material_request_committed=0, purchase_order_committed=0):
+    return (
+        to_amount(budget_amount)
+        - to_amount(actual_expenses)
+        - to_amount(material_request_committed)
+        - to_amount(purchase_order_committed)
+    )
+
+
+def monthly_budget_amount(annual_budget, percentage):
+    """Part of the annual budget a month is allocated by its distribution percentage"""
+    return to_amount(annual_budget) * to_amount(percentage) / 100
+
+
+def shortage(requested_amount, available):
+    return max(0.0, to_amount(requested_amount) - to_amount(available))
+
+
+def budget_status(requested_amount, available, monthly_available=None):
+    """Status fields of a requested amount; `monthly_available` is None without a monthly distribution"""
+    requested_amount = to_amount(requested_amount)
+    within_annual = requested_amount <= to_amount(available)
+    status = {
+        'within_annual_budget': within_annual,
+        'annual_budget_status': WITHIN_BUDGET if within_annual else EXCEEDS_BUDGET,
+    }
+
+    if monthly_available is None:
+        status.update({
+            'within_monthly_budget': True,
+            'monthly_budget_status': NO_MONTHLY_DISTRIBUTION,
+            'overall_status': status['annual_budget_status'],
+        })
+        return status
+
+    within_monthly = requested_amount <= to_amount(monthly_available)
+    if not within_monthly:
+        overall = EXCEEDS_MONTHLY_BUDGET
+    elif not within_annual:
+        overall = EXCEEDS_ANNUAL_BUDGET
+    else:
+        overall = WITHIN_BUDGET
+
+    status.update({
+        'within_monthly_budget': within_monthly,
+        'monthly_budget_status': WITHIN_MONTHLY_BUDGET if within_monthly else EXCEEDS_MONTHLY_BUDGET,
+        'overall_status': overall,
+    })
+    return status
+
+
+def apply_budget_status(budgets, requested_amount):
+    """Add the status fields to each row returned by `get_budget_details`"""
+    for budget in budgets:
+        monthly_available = (
+            budget.get('monthly_available_budget', 0) if budget.get('has_monthly_distribution') else None
+        )
+        budget.update(budget_status(requested_amount, budget['available_budget'], monthly_available))
+    return budgets
+
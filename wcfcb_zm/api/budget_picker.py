@@ -0,0 +1,103 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Cached budget lists for the source and target budget pickers on Budget Request.
+
+All submitted budgets are summarised once (name, account count, what the budget
+is against, company and fiscal year) and kept in Redis as a single list. Budget
+submit, cancel and delete clear the cache. Filtering by company and fiscal year,
+searching and paging then work on the cached rows, so opening the form no longer
+scans every Budget Account row.
+"""
+
+import frappe
+from frappe.utils import cint
+
+from wcfcb_zm.api.instrumentation import instrumented
+
+BUDGET_PICKER_CACHE_KEY = 'wcfcb_budget_picker_rows'
+DEFAULT_PAGE_LENGTH = 20
+
+
+def get_budget_picker_rows():
+    """Submitted budgets as [name, account_count, against, company, fiscal_year] rows, cached"""
+    return frappe.cache().get_value(BUDGET_PICKER_CACHE_KEY, generator=load_budget_picker_rows)
+
+
+def load_budget_picker_rows():
+    rows = frappe.db.sql("""
+        SELECT
+            b.name,
+            COUNT(ba.name) AS account_count,
+            COALESCE(IF(b.budget_against = 'Project', b.project, b.cost_center), '') AS against,
+            b.company,
+            b.fiscal_year
+        FROM
+            `tabBudget` b
+        LEFT JOIN
+            `tabBudget Account` ba ON ba.parent = b.name AND ba.parenttype = 'Budget'
+        WHERE
+            b.docstatus = 1
+        GROUP BY
+            b.name
+        ORDER BY
+            b.name
+    """)
+
+    return [
+        [name, cint(account_count), against, company, fiscal_year]
+        for name, account_count, against, company, fiscal_year in rows
+    ]
+
+
+def search_budget_picker(company=None, fiscal_year=None, txt=None, multi_account_only=False,
+                         exclude=None, start=0, page_len=DEFAULT_PAGE_LENGTH):
+    """One page of cached budgets matching the filters and txt as [name, account_count, against]
+    rows, and the total number of matches"""
+    txt = (txt or '').strip().lower()
+    matches = [
+        row[:3] for row in get_budget_picker_rows()
+        if (not company or row[3] == company)
+        and (not fiscal_year or row[4] == fiscal_year)
+        and (not multi_account_only or row[1] > 1)
+        and row[0] != exclude
+        and (not txt or txt in row[0].lower() or txt in row[2].lower())
+    ]
+
+    start = cint(start)
+    page_len = cint(page_len) or DEFAULT_PAGE_LENGTH
+    return matches[start:start + page_len], len(matches)
+
+
+@frappe.whitelist()
+@instrumented
+@frappe.validate_and_sanitize_search_inputs
+def budget_picker_query(doctype, txt, searchfield, start, page_len, filters):
+    """Link field query for the budget pickers.
+
+    Supported filters: company, fiscal_year, multi_account (only budgets with more
+    than one account) and exclude (a budget name to leave out).
+    """
+    frappe.has_permission('Budget', throw=True)
+    filters = frappe._dict(filters or {})
+
+    rows, total = search_budget_picker(
+        company=filters.company,
+        fiscal_year=filters.fiscal_year,
+        txt=txt,
+        multi_account_only=cint(filters.multi_account),
+        exclude=filters.exclude,
+        start=start,
+        page_len=page_len,
+    )
+
+    return [
+        (name, f'{account_count} accounts' + (f' - {against}' if against else ''))
+        for name, account_count, against in rows
+    ]
+
+
+def clear_budget_picker_cache(doc=None, method=None):
+    """Budget on_submit/on_cancel/on_trash hook: the cached lists are rebuilt on next use"""
+    frappe.cache().delete_value(BUDGET_PICKER_CACHE_KEY)
@@ -3,162 +3,161 @@
 
 import frappe
 from frappe import _
+from frappe.utils import flt
+
+from wcfcb_zm.exn.doctype.budget_amendment_chain.budget_amendment_chain import (
+    get_chain_head,
+    get_chain_heads,
+    get_chain_history,
+    mark_cancelled,
+)
+from wcfcb_zm.api.action_router import ActionRouter, Param, in_batch, shared_cache
+from wcfcb_zm.api.budget_balance import check_transfer_sufficiency, get_budget_account_balances
+from wcfcb_zm.api.budget_picker import DEFAULT_PAGE_LENGTH, clear_budget_picker_cache, search_budget_picker
+from wcfcb_zm.api.instrumentation import instrumented
+from wcfcb_zm.api.summary_cache import clear_summary_cache, get_cached_summary
+from wcfcb_zm.api.transfer_items import (
+    DEFAULT_ITEM_PAGE_LENGTH,
+    get_budget_amounts,
+    get_net_delta_page,
+    get_net_deltas,
+    get_transfer_item_page,
+)
+from wcfcb_zm.api.virement_context import VirementContext, load_budget_request
+from wcfcb_zm.api.virement_queue import budget_locks, enqueue_approval_with_amendment
+from wcfcb_zm.api.workflow_meta import (
+    EXTERNAL_APPROVAL_STATE,
+    get_workflow_meta,
+    requires_external_approval,
+)
+
+virement_actions = ActionRouter('budget_virement')
 
 @frappe.whitelist()
-
+@instrumented
 def budget_virement_handler(action, **kwargs):
     """
     Main API function for all budget virement operations
 
     Args:
-        action: The action to perform (get_multi_account_budgets, get_budget_accounts, etc.)
-        **kwargs: Additional parameters based on action
+        action: The action to perform, one of the actions registered on virement_actions
+        **kwargs: Parameters declared by the action
 
     Returns:
         dict: Response object with success/error status
     """
     try:
-        if action == 'get_multi_account_budgets':
-            return get_multi_account_budgets()
-        elif action == 'get_budget_accounts':
-            budget = kwargs.get('budget')
-            exclude_account = kwargs.get('exclude_account')
-            return get_budget_accounts(budget, exclude_account)
-        elif action == 'get_target_budgets':
-            virement_type = kwargs.get('virement_type')
-            source_budget = kwargs.get('source_budget')
-            return get_target_budgets(virement_type, source_budget)
-        elif action == 'validate_amount_approval':
-            amount = kwargs.get('amount')
-            return validate_amount_approval(amount)
-
-        elif action == 'validate_budget_transfer':
-            budget = kwargs.get('budget')
-            expense_account = kwargs.get('expense_account')
-            amount = kwargs.get('amount')
-            return validate_budget_transfer(budget, expense_account, amount)
-        elif action == 'set_external_approval':
-            doc_name = kwargs.get('doc_name')
-            amount = kwargs.get('amount')
-            return set_external_approval_workflow(doc_name, amount)
-        elif action == 'process_approval_with_amendment':
-            doc_name = kwargs.get('doc_name')
-            virement_type = kwargs.get('virement_type')
-            budget = kwargs.get('budget')
-            target_budget = kwargs.get('target_budget')
-            expense_account = kwargs.get('expense_account')
-            to_expense_account = kwargs.get('to_expense_account')
-            amount_requested = kwargs.get('amount_requested')
-            return process_approval_with_amendment(doc_name, virement_type, budget, target_budget, expense_account, to_expense_account, amount_requested)
-        elif action == 'get_amended_budgets':
-            source_budget = kwargs.get('source_budget')
-            target_budget = kwargs.get('target_budget')
-            virement_type = kwargs.get('virement_type')
-            result = get_amended_budgets(source_budget, target_budget, virement_type)
-            frappe.response['message'] = result
-            return result
-        elif action == 'get_summary_details':
-            doc_name = kwargs.get('doc_name')
-            source_budget = kwargs.get('source_budget')
-            target_budget = kwargs.get('target_budget')
-            virement_type = kwargs.get('virement_type')
-            from_account = kwargs.get('from_account') or kwargs.get('expense_account')
-            to_account = kwargs.get('to_account') or kwargs.get('to_expense_account')
-            result = get_summary_details(source_budget, target_budget, virement_type, from_account, to_account, doc_name)
-            frappe.response['message'] = result
-            return result
-
-        else:
-            frappe.response['message'] = {
-                'success': False,
-                'message': 'Invalid action: ' + str(action)
-            }
+        return virement_actions.dispatch(action, kwargs)
 
     except Exception as e:
-        frappe.response['message'] = {
+        return {
             'success': False,
             'message': 'Operation failed: ' + str(e)
         }
 
-def get_multi_account_budgets():
-    """Get budgets with more than one account for Intra-Budget transfers"""
+# Implemented in virement_queue, exposed through the same endpoint
+virement_actions.action(
+    'queue_approval_with_amendment',
+    doc_name=Param(str, required=True),
+    virement_type=Param(str, required=True),
+    budget=Param(str, required=True),
+    target_budget=Param(str),
+    expense_account=Param(str),
+    to_expense_account=Param(str),
+    amount_requested=Param(float)
+)(enqueue_approval_with_amendment)
+
+@virement_actions.action(doc_name=Param(str, required=True))
+def get_budget_request(doc_name):
+    """Budget Request as a dict, e.g. the document an amendment was made from"""
+    budget_request = load_budget_request(doc_name)
+    budget_request.check_permission('read')
+    return {
+        'success': True,
+        'data': budget_request.as_dict()
+    }
+
+@virement_actions.action(
+    company=Param(str),
+    fiscal_year=Param(str),
+    txt=Param(str),
+    start=Param(int, default=0),
+    page_len=Param(int, default=DEFAULT_PAGE_LENGTH)
+)
+@shared_cache
+def get_multi_account_budgets(company=None, fiscal_year=None, txt=None, start=0, page_len=DEFAULT_PAGE_LENGTH):
+    """Get budgets with more than one account for Intra-Budget transfers, one page at a time"""
     try:
-        budgets = frappe.db.sql("""
-            SELECT
-                b.name as value,
-                CONCAT(b.name, ' (', COUNT(ba.account), ' accounts)') as description
-            FROM
-                `tabBudget` b
-            INNER JOIN
-                `tabBudget Account` ba ON ba.parent = b.name
-            WHERE
-                b.docstatus = 1
-            GROUP BY
-                b.name
-            HAVING
-                COUNT(ba.account) > 1
-            ORDER BY
-                b.name
-        """, as_dict=True)
+        rows, total = search_budget_picker(
+            company, fiscal_year, txt, multi_account_only=True, start=start, page_len=page_len
+        )
 
-        frappe.response['message'] = {
+        return {
             'success': True,
-            'data': budgets
+            'data': [
+                {'value': name, 'description': f'{name} ({account_count} accounts)'}
+                for name, account_count, against in rows
+            ],
+            'total': total
         }
 
     except Exception as e:
-        frappe.response['message'] = {
+        return {
             'success': False,
             'message': 'Error fetching multi-account budgets: ' + str(e)
         }
 
 @frappe.whitelist()
+@instrumented
 def get_account_balance_from_budget(budget_name, account):
     """Get available balance for a specific account from a budget"""
     try:
         if not budget_name or not account:
-            frappe.response['message'] = {
+            return {
                 'success': False,
                 'message': 'Budget name and account are required'
             }
-            return
 
-        # Get budget account data
-        budget_account = frappe.db.sql("""
-            SELECT budget_amount
-            FROM `tabBudget Account`
-            WHERE parent = %s AND account = %s
-        """, (budget_name, account), as_dict=True)
+        balance = get_budget_account_balances(budget_name, [account]).get(account)
 
-        if not budget_account:
-            frappe.response['message'] = {
+        if not balance:
+            return {
                 'success': False,
                 'message': f'Account {account} not found in budget {budget_name}'
             }
-            return
 
-        budget_amount = float(budget_account[0]['budget_amount'])
-
-        # Calculate actual expenses (this is a simplified version)
-        # In a real implementation, you might want to calculate actual expenses from GL entries
-        actual_expenses = 0  # Placeholder - could be calculated from GL entries
+        return {
+            'success': True,
+            'budget_amount': balance.budget_amount,
+            'actual_expenses': balance.actual_expenses,
+            'committed': balance.committed,
+            'available_balance': balance.available_balance
+        }
 
-        available_balance = budget_amount - actual_expenses
+    except Exception as e:
+        return {
+            'success': False,
+            'message': 'Error fetching account balance: ' + str(e)
+        }
 
-        frappe.response['message'] = {
+@virement_actions.action('get_budget_balances', budget=Param(str, required=True))
+@shared_cache
+def get_budget_balances(budget):
+    """Budget, actuals, commitments and available balance for every account of a budget"""
+    try:
+        return {
             'success': True,
-            'budget_amount': budget_amount,
-            'actual_expenses': actual_expenses,
-            'available_balance': available_balance
+            'data': list(get_budget_account_balances(budget).values())
         }
 
     except Exception as e:
-        frappe.response['message'] = {
+        return {
             'success': False,
-            'message': 'Error fetching account balance: ' + str(e)
+            'message': 'Error fetching budget balances: ' + str(e)
         }
 
 @frappe.whitelist()
+@instrumented
 def get_budget_accounts(doctype=None, txt=None, searchfield=None, start=None, page_len=None, filters=None):
     """Get accounts within a budget with progressive balance information - compatible with Frappe search widget"""
     try:
@@ -208,26 +207,20 @@ def get_budget_accounts(doctype=None, txt=None, searchfield=None, start=None, pa
 
         accounts = frappe.db.sql(query, params, as_dict=True)
 
-        # Calculate progressive balances if doc_name is provided
+        # Calculate progressive balances if doc_name is provided; the transfer items are
+        # folded into net changes per account by the database instead of loading the request
         progressive_balances = {}
         if doc_name:
             try:
-                budget_request = frappe.get_doc("Budget Request", doc_name)
-                if budget_request.transfer_items:
-                    # Initialize with original amounts
-                    running_balances = {}
-                    for account in accounts:
-                        running_balances[account.value] = account.original_amount
-
-                    # Apply transfers progressively
-                    for item in budget_request.transfer_items:
-                        if item.from_account in running_balances:
-                            running_balances[item.from_account] -= (item.amount_requested or 0)
-                        if item.to_account in running_balances:
-                            running_balances[item.to_account] += (item.amount_requested or 0)
-
-                    progressive_balances = running_balances
-            except:
+                request = frappe.db.get_value(
+                    "Budget Request", doc_name, ["budget", "target_budget", "virement_type"], as_dict=True
+                )
+                target_budget = request.target_budget if request.virement_type == 'Inter-Budget' else None
+                net_deltas = get_net_deltas(doc_name, request.budget, target_budget)
+                for account in accounts:
+                    if (budget, account.value) in net_deltas:
+                        progressive_balances[account.value] = account.original_amount + net_deltas[(budget, account.value)]
+            except Exception:
                 pass  # If error, just use original amounts
 
         # Format results with progressive balance information
@@ -252,6 +245,7 @@ def get_budget_accounts(doctype=None, txt=None, searchfield=None, start=None, pa
         return []
 
 @frappe.whitelist()
+@instrumented
 def get_budget_accounts_with_progressive(doctype=None, txt=None, searchfield=None, start=None, page_len=None, filters=None):
     """Get accounts within a budget with real-time progressive balance information from client-side calculations"""
     try:
@@ -332,6 +326,7 @@ def get_budget_accounts_with_progressive(doctype=None, txt=None, searchfield=Non
         return []
 
 @frappe.whitelist()
+@instrumented
 def get_amount(budget, account):
     """Get the current amount for an account in a budget"""
     try:
@@ -343,132 +338,157 @@ def get_amount(budget, account):
         frappe.log_error(f"Error getting amount for {account} in {budget}: {str(e)}")
         return 0
 
-def get_target_budgets(virement_type, source_budget=None):
-    """Get target budgets based on virement type and source budget"""
+@virement_actions.action(
+    'get_budget_accounts',
+    budget=Param(str, required=True),
+    exclude_account=Param(str)
+)
+@shared_cache
+def get_budget_account_options(budget, exclude_account=None):
+    """Accounts of a budget with their allocations, for the account queries and transfer cards"""
+    try:
+        accounts = frappe.db.sql("""
+            SELECT
+                ba.account as value,
+                acc.account_name,
+                ba.budget_amount
+            FROM
+                `tabBudget Account` ba
+            INNER JOIN
+                `tabAccount` acc ON ba.account = acc.name
+            WHERE
+                ba.parent = %(budget)s
+                AND ba.account != %(exclude_account)s
+            ORDER BY
+                acc.account_name
+        """, {'budget': budget, 'exclude_account': exclude_account or ''}, as_dict=True)
+
+        return {
+            'success': True,
+            'data': accounts
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'message': 'Error fetching budget accounts: ' + str(e)
+        }
+
+@virement_actions.action(
+    virement_type=Param(str),
+    source_budget=Param(str),
+    company=Param(str),
+    fiscal_year=Param(str),
+    txt=Param(str),
+    start=Param(int, default=0),
+    page_len=Param(int, default=DEFAULT_PAGE_LENGTH)
+)
+def get_target_budgets(virement_type, source_budget=None, company=None, fiscal_year=None, txt=None,
+                       start=0, page_len=DEFAULT_PAGE_LENGTH):
+    """Get target budgets based on virement type and source budget, one page at a time"""
     try:
         if virement_type == 'Inter-Budget':
             # For Inter-Budget: All budgets except source budget
-            if source_budget:
-                budgets = frappe.db.sql("""
-                    SELECT
-                        b.name as value,
-                        b.name as description
-                    FROM
-                        `tabBudget` b
-                    WHERE
-                        b.name != %(source_budget)s
-                        AND b.docstatus = 1
-                    ORDER BY
-                        b.name
-                """, {'source_budget': source_budget}, as_dict=True)
-            else:
-                budgets = frappe.db.sql("""
-                    SELECT
-                        b.name as value,
-                        b.name as description
-                    FROM
-                        `tabBudget` b
-                    WHERE
-                        b.docstatus = 1
-                    ORDER BY
-                        b.name
-                """, as_dict=True)
+            rows, total = search_budget_picker(
+                company, fiscal_year, txt, exclude=source_budget, start=start, page_len=page_len
+            )
+            budgets = [{'value': name, 'description': name} for name, account_count, against in rows]
         else:
             # For Intra-Budget: Return empty (target will be auto-populated)
-            budgets = []
+            budgets, total = [], 0
 
-        frappe.response['message'] = {
+        return {
             'success': True,
-            'data': budgets
+            'data': budgets,
+            'total': total
         }
 
     except Exception as e:
-        frappe.response['message'] = {
+        return {
             'success': False,
             'message': 'Error fetching target budgets: ' + str(e)
         }
 
+@virement_actions.action('get_workflow_meta')
+def get_budget_request_workflow_meta():
+    """Workflow states and external approval threshold, for client-side amount checks"""
+    return {
+        'success': True,
+        'data': get_workflow_meta()
+    }
+
+@virement_actions.action(amount=Param(float, required=True))
 def validate_amount_approval(amount):
     """Check if amount requires external approval and return workflow info"""
     try:
         if not amount:
-            frappe.response['message'] = {
+            return {
                 'success': False,
                 'message': 'Amount parameter is required'
             }
-            return
 
         amount_float = abs(float(amount))
-        requires_external = amount_float > 250000
+        workflow_meta = get_workflow_meta()
+        threshold = workflow_meta['external_approval_threshold']
+        requires_external = requires_external_approval(amount_float, threshold)
+        has_external_state = workflow_meta['has_external_approval_state']
 
-        # Check if External Approval state exists in workflow
-        external_state_exists = frappe.db.sql("""
-            SELECT COUNT(*) as count
-            FROM `tabWorkflow Document State`
-            WHERE parent = 'Budget Request'
-            AND state = 'External Approval'
-        """, as_dict=True)
-
-        has_external_state = external_state_exists and external_state_exists[0]['count'] > 0
-
-        frappe.response['message'] = {
+        return {
             'success': True,
             'requires_external_approval': requires_external,
             'amount': amount_float,
-            'threshold': 250000,
+            'threshold': threshold,
             'external_state_available': has_external_state,
-            'recommended_workflow_state': 'External Approval' if requires_external and has_external_state else 'Draft'
+            'recommended_workflow_state': EXTERNAL_APPROVAL_STATE if requires_external and has_external_state else 'Draft'
         }
 
     except Exception as e:
-        frappe.response['message'] = {
+        return {
             'success': False,
             'message': 'Amount validation error: ' + str(e)
         }
 
+@virement_actions.action(
+    'set_external_approval',
+    doc_name=Param(str, required=True),
+    amount=Param(float, required=True)
+)
 def set_external_approval_workflow(doc_name, amount):
-    """Set workflow state to External Approval for amounts > 250k"""
+    """Set workflow state to External Approval for amounts above the external approval threshold"""
     try:
         if not doc_name or not amount:
-            frappe.response['message'] = {
+            return {
                 'success': False,
                 'message': 'Document name and amount are required'
             }
-            return
 
         amount_float = abs(float(amount))
+        workflow_meta = get_workflow_meta()
 
-        if amount_float > 250000:
+        if requires_external_approval(amount_float, workflow_meta['external_approval_threshold']):
             # Check if External Approval state exists in workflow
-            external_state_exists = frappe.db.sql("""
-                SELECT COUNT(*) as count
-                FROM `tabWorkflow Document State`
-                WHERE parent = 'Budget Request'
-                AND state = 'External Approval'
-            """, as_dict=True)
-
-            if external_state_exists and external_state_exists[0]['count'] > 0:
+            if workflow_meta['has_external_approval_state']:
                 # Update the document workflow state using safe method
                 budget_request = frappe.get_doc("Budget Request", doc_name)
-                budget_request.workflow_state = 'External Approval'
+                budget_request.workflow_state = EXTERNAL_APPROVAL_STATE
                 budget_request.save()
 
                 frappe.db.commit()
 
-                frappe.response['message'] = {
+                return {
                     'success': True,
                     'message': 'Workflow state set to External Approval',
-                    'workflow_state': 'External Approval',
+                    'workflow_state': EXTERNAL_APPROVAL_STATE,
                     'amount': amount_float,
                     'doc_name': doc_name
                 }
             else:
-                frappe.response['message'] = {
+                return {
                     'success': False,
                     'message': 'External Approval workflow state not found'
                 }
         else:
-            frappe.response['message'] = {
+            return {
                 'success': True,
                 'message': 'Amount does not require external approval',
                 'workflow_state': 'Draft',
@@ -476,42 +496,42 @@ def set_external_approval_workflow(doc_name, amount):
             }
 
     except Exception as e:
-        frappe.response['message'] = {
+        return {
             'success': False,
             'message': 'Error setting external approval: ' + str(e)
         }
 
+@virement_actions.action(
+    budget=Param(str, required=True),
+    expense_account=Param(str, required=True),
+    amount=Param(float, required=True)
+)
 def validate_budget_transfer(budget, expense_account, amount):
     """Validate if budget has sufficient funds for the transfer"""
     try:
         if not all([budget, expense_account, amount]):
-            frappe.response['message'] = {
+            return {
                 'success': False,
                 'message': 'Budget, expense account, and amount are required for validation'
             }
-            return
 
-        # Get current budget allocation for the account
-        budget_account = frappe.db.sql("""
-            SELECT budget_amount
-            FROM `tabBudget Account`
-            WHERE parent = %s AND account = %s
-        """, (budget, expense_account), as_dict=True)
+        # Live availability: budget less actual expenses and open commitments
+        balance = get_budget_account_balances(budget, [expense_account]).get(expense_account)
 
-        if not budget_account:
-            frappe.response['message'] = {
+        if not balance:
+            return {
                 'success': False,
                 'message': 'Account not found in budget: ' + str(expense_account)
             }
-            return
 
-        available_amount = float(budget_account[0]['budget_amount'])
+        available_amount = balance.available_balance
         requested_amount = abs(float(amount))
         sufficient_budget = available_amount >= requested_amount
 
-        frappe.response['message'] = {
+        return {
             'success': True,
             'sufficient_budget': sufficient_budget,
+            'budget_amount': balance.budget_amount,
             'available_amount': available_amount,
             'requested_amount': requested_amount,
             'shortfall': max(0, requested_amount - available_amount),
@@ -519,24 +539,72 @@ def validate_budget_transfer(budget, expense_account, amount):
         }
 
     except Exception as e:
-        frappe.response['message'] = {
+        return {
             'success': False,
             'message': 'Error validating budget transfer: ' + str(e)
         }
 
+@virement_actions.action(
+    doc_name=Param(str),
+    items=Param(list),
+    budget=Param(str),
+    target_budget=Param(str)
+)
+def validate_transfer_items(doc_name=None, items=None, budget=None, target_budget=None):
+    """Validate all transfers of a Budget Request against live availability in one pass.
+
+    Pass either doc_name, or items with budget (and target_budget for inter-budget
+    transfers) to check unsaved rows. Earlier rows drain their accounts before
+    later rows are checked.
+    """
+    try:
+        if doc_name:
+            budget_request = load_budget_request(doc_name)
+            items = get_transfers_from_doc(budget_request)
+            budget = budget_request.budget
+            if budget_request.virement_type == 'Inter-Budget':
+                target_budget = budget_request.target_budget
+
+        if not budget or not items:
+            return {
+                'success': False,
+                'message': 'A Budget Request or a budget with transfer items is required for validation'
+            }
+
+        rows = check_transfer_sufficiency(items, budget, target_budget)
+        insufficient = [row for row in rows if not row.sufficient]
+
+        return {
+            'success': True,
+            'sufficient_budget': not insufficient,
+            'rows': rows,
+            'insufficient_rows': [row.idx for row in insufficient],
+            'total_shortfall': sum(row.shortfall for row in insufficient),
+            'message': 'Sufficient budget available' if not insufficient else 'Insufficient budget available'
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'message': 'Error validating transfer items: ' + str(e)
+        }
+
 def is_multi_transfer_mode(doc_name):
     """Check if Budget Request uses multi-transfer mode"""
     try:
-        budget_request = frappe.get_doc("Budget Request", doc_name)
+        budget_request = load_budget_request(doc_name)
         return len(budget_request.transfer_items) > 0
     except Exception:
         return False
 
 def get_transfer_data(doc_name):
     """Get transfer data for both single and multi-transfer modes"""
-    budget_request = frappe.get_doc("Budget Request", doc_name)
+    budget_request = load_budget_request(doc_name)
+    return get_transfers_from_doc(budget_request)
 
-    if is_multi_transfer_mode(doc_name):
+def get_transfers_from_doc(budget_request):
+    """Get transfer data from an already loaded Budget Request"""
+    if budget_request.transfer_items:
         # Multi-transfer mode: return list of transfer items
         transfers = []
         for item in budget_request.transfer_items:
@@ -554,14 +622,79 @@ def get_transfer_data(doc_name):
             'amount_requested': budget_request.amount_requested
         }]
 
+@virement_actions.action(
+    doc_name=Param(str, required=True),
+    start=Param(int, default=0),
+    page_len=Param(int, default=DEFAULT_ITEM_PAGE_LENGTH)
+)
+def get_transfer_items(doc_name, start=0, page_len=DEFAULT_ITEM_PAGE_LENGTH):
+    """One page of a Budget Request's transfer items, for requests too large to ship whole"""
+    try:
+        rows, total = get_transfer_item_page(doc_name, start, page_len)
+        return {
+            'success': True,
+            'data': rows,
+            'total': total
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'message': 'Error fetching transfer items: ' + str(e)
+        }
+
+@virement_actions.action(
+    doc_name=Param(str, required=True),
+    start=Param(int, default=0),
+    page_len=Param(int, default=DEFAULT_ITEM_PAGE_LENGTH)
+)
+def get_transfer_net_deltas(doc_name, start=0, page_len=DEFAULT_ITEM_PAGE_LENGTH):
+    """Net change per budget account across all transfer items, one page of accounts at a time"""
+    try:
+        rows, total = get_net_delta_page(doc_name, start, page_len)
+        return {
+            'success': True,
+            'data': rows,
+            'total': total
+        }
+
+    except Exception as e:
+        return {
+            'success': False,
+            'message': 'Error fetching net changes: ' + str(e)
+        }
+
+@virement_actions.action(
+    doc_name=Param(str, required=True),
+    virement_type=Param(str, required=True),
+    budget=Param(str, required=True),
+    target_budget=Param(str),
+    expense_account=Param(str),
+    to_expense_account=Param(str),
+    amount_requested=Param(float)
+)
 def process_approval_with_amendment(doc_name, virement_type, budget, target_budget, expense_account, to_expense_account, amount_requested):
-    """Process budget request approval with automatic budget amendment"""
+    """Process budget request approval with automatic budget amendment.
+
+    The approval owns the transaction: it commits once it holds the budget
+    locks, so any earlier uncommitted work is committed with it, and it
+    commits again when done. It therefore refuses to run inside a batch.
+    """
+    if in_batch():
+        return {
+            'success': False,
+            'message': 'Approvals commit their own transaction and cannot run inside a batch'
+        }
+
     try:
         # Parameters are being received correctly - debug logging removed
 
+        # Every document below is loaded once and shared by the whole approval
+        context = VirementContext()
+
         # Validate inputs - check if this is multi-transfer mode first
-        budget_request = frappe.get_doc("Budget Request", doc_name)
-        is_multi_transfer = is_multi_transfer_mode(doc_name)
+        budget_request = context.get_budget_request(doc_name)
+        is_multi_transfer = context.is_multi_transfer(doc_name)
 
         if is_multi_transfer:
             # For multi-transfer mode, only validate basic params
@@ -578,68 +711,77 @@ def process_approval_with_amendment(doc_name, virement_type, budget, target_budg
                 missing_params.append(param_names[i])
 
         if missing_params:
-            frappe.response['message'] = {
+            return {
                 'success': False,
                 'message': 'Missing required parameters: ' + ', '.join(missing_params) + '. Received: doc_name=' + str(doc_name) + ', virement_type=' + str(virement_type) + ', budget=' + str(budget) + ', expense_account=' + str(expense_account) + ', to_expense_account=' + str(to_expense_account) + ', amount_requested=' + str(amount_requested)
             }
-            return
 
         # STEP 1: Validate Budget Request state (budget_request already loaded above)
         current_state = budget_request.workflow_state
 
         # STEP 1.1: Check if Budget Request is approved before proceeding with amendment
         if current_state != "Approved":
-            frappe.response['message'] = {
+            return {
                 'success': False,
                 'message': f'Budget Request must be approved before processing amendments. Current state: {current_state}. Please approve the Budget Request first.'
             }
-            return
 
         # STEP 1.2: Additional check - ensure document is submitted (docstatus = 1)
         if budget_request.docstatus != 1:
-            frappe.response['message'] = {
+            return {
                 'success': False,
                 'message': f'Budget Request must be submitted before processing amendments. Current docstatus: {budget_request.docstatus}. Please submit the Budget Request first.'
             }
-            return
 
-        # STEP 2: Determine transfer mode and process accordingly
-        if is_multi_transfer_mode(doc_name):
-            # Multi-transfer mode: process all transfer items
-            amendment_result = process_multi_transfer_amendment(doc_name, virement_type, budget, target_budget)
-        else:
-            # Single-transfer mode: use existing logic
-            if virement_type == "Intra-Budget":
-                amendment_result = process_intra_budget_amendment(budget, expense_account, to_expense_account, amount_requested)
-            elif virement_type == "Inter-Budget":
-                if not target_budget:
-                    frappe.response['message'] = {
+        # STEP 2: Serialize against other approvals touching the same budgets. Approvals on
+        # unrelated budgets take different locks and still run in parallel.
+        with budget_locks([budget, target_budget]):
+            # The transaction's snapshot was taken before the lock, so reads would not see an
+            # amendment committed while we waited. Start a new transaction before reading anything.
+            frappe.db.commit()
+
+            # Another approval may have amended these budgets while we waited for the lock;
+            # build on the head of each amendment chain so its changes are not lost
+            budget = get_chain_head(budget)
+            if target_budget:
+                target_budget = get_chain_head(target_budget)
+
+            # STEP 2.1: Determine transfer mode and process accordingly
+            if is_multi_transfer:
+                # Multi-transfer mode: process all transfer items
+                amendment_result = process_multi_transfer_amendment(doc_name, virement_type, budget, target_budget, context)
+            else:
+                # Single-transfer mode: use existing logic
+                if virement_type == "Intra-Budget":
+                    amendment_result = process_intra_budget_amendment(budget, expense_account, to_expense_account, amount_requested, context)
+                elif virement_type == "Inter-Budget":
+                    if not target_budget:
+                        return {
+                            'success': False,
+                            'message': 'Target budget is required for Inter-Budget transfers'
+                        }
+                    amendment_result = process_inter_budget_amendment(budget, target_budget, expense_account, to_expense_account, amount_requested, context)
+                else:
+                    return {
                         'success': False,
-                        'message': 'Target budget is required for Inter-Budget transfers'
+                        'message': 'Invalid virement type: ' + str(virement_type)
                     }
-                    return
-                amendment_result = process_inter_budget_amendment(budget, target_budget, expense_account, to_expense_account, amount_requested)
-            else:
-                frappe.response['message'] = {
-                    'success': False,
-                'message': 'Invalid virement type: ' + str(virement_type)
-            }
-            return
 
-        # STEP 3: Check for linked documents that need to be cancelled (after budget amendments)
-        linked_docs = check_budget_linked_documents(budget)
-        cancelled_docs = []
+            # STEP 3: Check for linked documents that need to be cancelled (after budget amendments)
+            linked_docs = check_budget_linked_documents(budget)
+            cancelled_docs = []
 
-        if linked_docs:
-            # Cancel linked documents
-            cancelled_docs = cancel_linked_documents(linked_docs)
+            if linked_docs:
+                # Cancel linked documents
+                cancelled_docs = cancel_linked_documents(linked_docs)
 
-        # STEP 4: Budget Request amendment details are tracked via Budget.amended_from field
-        # No need to update Budget Request - the amended budgets can be found via SQL query
+            # STEP 4: Budget Request amendment details are tracked via the Budget Amendment Chain
+            # No need to update Budget Request - the amended budgets can be found from the chain
 
-        frappe.db.commit()
+            # Commit while still holding the locks so the next approval sees the new chain head
+            frappe.db.commit()
 
-        frappe.response['message'] = {
+        return {
             'success': True,
             'message': 'Budget request approved and budget amended successfully',
             'original_budget': amendment_result.get('original_budget_name'),
@@ -649,11 +791,129 @@ def process_approval_with_amendment(doc_name, virement_type, budget, target_budg
         }
 
     except Exception as e:
-        frappe.response['message'] = {
+        # Never leave a half-applied amendment (cancelled budget without its replacement). Nothing
+        # is written before the commit under the locks, so this only undoes the approval's own work.
+        frappe.db.rollback()
+        return {
             'success': False,
             'message': 'Error processing approval: ' + str(e)
         }
 
+@virement_actions.action(
+    doc_name=Param(str, required=True),
+    virement_type=Param(str),
+    budget=Param(str),
+    target_budget=Param(str)
+)
+def preview_amendment(doc_name, virement_type=None, budget=None, target_budget=None):
+    """Dry run of process_approval_with_amendment: return the full change plan without writing anything"""
+    try:
+        if not doc_name:
+            return {
+                'success': False,
+                'message': 'Document name is required'
+            }
+
+        budget_request = load_budget_request(doc_name)
+        virement_type = virement_type or budget_request.virement_type
+        budget = budget or budget_request.budget
+        target_budget = target_budget or budget_request.target_budget
+
+        if not budget:
+            return {
+                'success': False,
+                'message': 'Source budget is required'
+            }
+        if virement_type == 'Inter-Budget' and not target_budget:
+            return {
+                'success': False,
+                'message': 'Target budget is required for Inter-Budget transfers'
+            }
+
+        plan = plan_virement_amendment(get_transfers_from_doc(budget_request), virement_type, budget, target_budget)
+        plan['doc_name'] = doc_name
+        plan['workflow_state'] = budget_request.get('workflow_state')
+        return plan
+
+    except Exception as e:
+        return {
+            'success': False,
+            'message': 'Error previewing amendment: ' + str(e)
+        }
+
+def plan_virement_amendment(transfers, virement_type, budget, target_budget=None):
+    """Planning phase of the amendment pipeline, read-only and with batched queries.
+
+    Resolves the amendment-chain heads the approval would amend, nets the transfers,
+    and returns before/after amounts per changed account plus the documents the
+    approval would cancel.
+    """
+    is_inter = virement_type == 'Inter-Budget'
+    originals = [budget, target_budget] if is_inter else [budget]
+
+    # Approvals amend the current head of each chain, so plan against it too
+    heads = get_chain_heads(originals)
+    source_head = heads.get(budget, budget)
+    target_head = heads.get(target_budget, target_budget) if is_inter else None
+    involved = [name for name in [source_head, target_head] if name]
+
+    accounts_by_budget = {name: [] for name in involved}
+    for row in frappe.db.sql("""
+        SELECT parent, account, budget_amount
+        FROM `tabBudget Account`
+        WHERE parent IN %(budgets)s
+        ORDER BY parent, idx
+    """, {'budgets': tuple(involved)}, as_dict=True):
+        accounts_by_budget[row.parent].append(row)
+
+    errors = []
+    try:
+        validate_consolidated_transfers(transfers, source_head, accounts_by_budget[source_head])
+    except Exception as e:
+        errors.append(str(e))
+
+    deltas = consolidate_transfers(transfers, source_head, target_head)
+
+    budgets = []
+    for original, head in zip(originals, involved):
+        adjustments = get_budget_adjustments(deltas, head)
+        before = {row.account: flt(row.budget_amount) for row in accounts_by_budget[head]}
+        # Mirrors the batch functions: only the Inter-Budget source never gains accounts
+        add_missing = not (is_inter and head == source_head)
+        after_rows = get_amended_account_rows(accounts_by_budget[head], adjustments, add_missing)
+
+        budgets.append({
+            'original_budget': original,
+            'amends_budget': head,
+            'retargeted_to_chain_head': head != original,
+            'account_count': len(after_rows),
+            'changes': [
+                {
+                    'account': row['account'],
+                    'before': before.get(row['account'], 0.0),
+                    'after': row['budget_amount'],
+                    'delta': adjustments[row['account']],
+                    'is_new_account': row['account'] not in before
+                }
+                for row in after_rows if row['account'] in adjustments
+            ]
+        })
+
+    linked_docs = check_budget_linked_documents(source_head)
+
+    return {
+        'success': not errors,
+        'preview': True,
+        'virement_type': virement_type,
+        'transfer_count': len(transfers),
+        'total_amount': sum(flt(transfer['amount_requested']) for transfer in transfers),
+        'budgets': budgets,
+        'budgets_to_cancel': involved,
+        'linked_documents': [{'doctype': doctype, 'name': name} for doctype, name in linked_docs],
+        'errors': errors,
+        'summary': summarize_consolidated_transfers(virement_type + ' plan', transfers, deltas)
+    }
+
 def check_budget_linked_documents(budget_name):
     """Check for documents linked to the budget that need to be cancelled"""
     linked_docs = []
@@ -701,7 +961,7 @@ def cancel_linked_documents(linked_docs):
                 # Log individual document errors but continue with others
                 frappe.log_error('Error cancelling ' + doc_type + ' ' + doc_name + ': ' + str(doc_error))
 
-        frappe.db.commit()
+        # No commit here: the approval commits the cancellations together with the amendment
 
     except Exception as e:
         # Log error but don't fail the whole process
@@ -709,27 +969,19 @@ def cancel_linked_documents(linked_docs):
 
     return cancelled_docs
 
-def process_intra_budget_amendment(budget_name, from_account, to_account, amount):
+def process_intra_budget_amendment(budget_name, from_account, to_account, amount, context=None):
     """Process amendment for Intra-Budget transfer"""
     try:
-        # Get source budget data (allow cancelled budgets for re-amendment)
-        source_budget_data = frappe.db.sql("""
-            SELECT *
-            FROM `tabBudget`
-            WHERE name = %s AND docstatus IN (1, 2)
-        """, (budget_name,), as_dict=True)
+        context = context or VirementContext()
 
-        if not source_budget_data:
-            raise Exception("Source budget not found or not submitted: " + budget_name)
+        # Get source budget data (allow cancelled budgets for re-amendment and draft chain heads)
+        source_budget = context.get_budget(budget_name)
 
-        source_budget = source_budget_data[0]
+        if not source_budget:
+            raise Exception("Source budget not found or not submitted: " + budget_name)
 
         # Get budget accounts
-        budget_accounts = frappe.db.sql("""
-            SELECT account, budget_amount
-            FROM `tabBudget Account`
-            WHERE parent = %s
-        """, (budget_name,), as_dict=True)
+        budget_accounts = context.get_budget_accounts(budget_name)
 
         # Validate accounts and amounts
         from_account_amount = None
@@ -750,7 +1002,7 @@ def process_intra_budget_amendment(budget_name, from_account, to_account, amount
         # The validation is now informational only, not blocking
 
         # Cancel existing budget using safe method
-        frappe.db.set_value("Budget", budget_name, "docstatus", 2)
+        cancel_budget_for_amendment(budget_name)
 
         # Generate amended budget name
         amended_name = generate_amended_budget_name(budget_name)
@@ -798,38 +1050,23 @@ def process_intra_budget_amendment(budget_name, from_account, to_account, amount
     except Exception as e:
         raise Exception('Intra-Budget amendment error: ' + str(e))
 
-def process_inter_budget_amendment(source_budget_name, target_budget_name, from_account, to_account, amount):
+def process_inter_budget_amendment(source_budget_name, target_budget_name, from_account, to_account, amount, context=None):
     """Process amendment for Inter-Budget transfer"""
     try:
-        # Get source and target budget data (allow cancelled budgets for re-amendment)
-        source_budget_data = frappe.db.sql("""
-            SELECT *
-            FROM `tabBudget`
-            WHERE name = %s AND docstatus IN (1, 2)
-        """, (source_budget_name,), as_dict=True)
-
-        target_budget_data = frappe.db.sql("""
-            SELECT *
-            FROM `tabBudget`
-            WHERE name = %s AND docstatus IN (1, 2)
-        """, (target_budget_name,), as_dict=True)
-
-        if not source_budget_data:
+        context = context or VirementContext()
+
+        # Get source and target budget data (allow cancelled budgets for re-amendment and draft chain heads)
+        source_budget = context.get_budget(source_budget_name)
+        target_budget = context.get_budget(target_budget_name)
+
+        if not source_budget:
             raise Exception("Source budget not found: " + source_budget_name)
-        if not target_budget_data:
+        if not target_budget:
             raise Exception("Target budget not found: " + target_budget_name)
 
-        source_budget = source_budget_data[0]
-        target_budget = target_budget_data[0]
-
         # Get budget accounts
-        source_accounts = frappe.db.sql("""
-            SELECT account, budget_amount FROM `tabBudget Account` WHERE parent = %s
-        """, (source_budget_name,), as_dict=True)
-
-        target_accounts = frappe.db.sql("""
-            SELECT account, budget_amount FROM `tabBudget Account` WHERE parent = %s
-        """, (target_budget_name,), as_dict=True)
+        source_accounts = context.get_budget_accounts(source_budget_name)
+        target_accounts = context.get_budget_accounts(target_budget_name)
 
         # Validate FROM account in source budget
         from_account_amount = None
@@ -848,8 +1085,8 @@ def process_inter_budget_amendment(source_budget_name, target_budget_name, from_
         to_account_exists = any(account['account'] == to_account for account in target_accounts)
 
         # Cancel existing budgets using safe method
-        frappe.db.set_value("Budget", source_budget_name, "docstatus", 2)
-        frappe.db.set_value("Budget", target_budget_name, "docstatus", 2)
+        cancel_budget_for_amendment(source_budget_name)
+        cancel_budget_for_amendment(target_budget_name)
 
         # Create amended budgets
         amended_source_name = generate_amended_budget_name(source_budget_name)
@@ -876,198 +1113,151 @@ def process_inter_budget_amendment(source_budget_name, target_budget_name, from_
     except Exception as e:
         raise Exception('Inter-Budget amendment error: ' + str(e))
 
-def process_multi_transfer_amendment(doc_name, virement_type, budget, target_budget):
+def process_multi_transfer_amendment(doc_name, virement_type, budget, target_budget, context=None):
     """Process amendment for multiple transfers using batch processing"""
     try:
+        context = context or VirementContext()
+
         # Get all transfer items from Budget Request
-        transfers = get_transfer_data(doc_name)
+        transfers = get_transfers_from_doc(context.get_budget_request(doc_name))
 
         if not transfers:
             raise Exception("No transfer items found in Budget Request")
 
-        # Group transfers by budget type
-        intra_transfers = []
-        inter_transfers = []
-
-        for transfer in transfers:
-            # Determine if this is intra or inter budget transfer
-            # For now, assume all transfers follow the same virement_type
-            # In future, could determine per transfer based on account budgets
-            if virement_type == "Intra-Budget":
-                intra_transfers.append(transfer)
-            else:
-                inter_transfers.append(transfer)
-
-        # Process intra-budget transfers AS A BATCH
-        intra_results = []
-        if intra_transfers:
-            result = process_intra_budget_amendment_batch(
-                budget,
-                intra_transfers
-            )
-            intra_results.append(result)
-
-        # Process inter-budget transfers AS A BATCH
-        inter_results = []
-        if inter_transfers:
+        # All transfers of a Budget Request follow its virement_type
+        results = []
+        if virement_type == "Intra-Budget":
+            # Process intra-budget transfers AS A BATCH
+            results.append(process_intra_budget_amendment_batch(budget, transfers, context))
+        else:
+            # Process inter-budget transfers AS A BATCH
             if not target_budget:
                 raise Exception('Target budget is required for Inter-Budget transfers')
-            result = process_inter_budget_amendment_batch(
-                budget,
-                target_budget,
-                inter_transfers
-            )
-            inter_results.append(result)
+            results.append(process_inter_budget_amendment_batch(budget, target_budget, transfers, context))
 
-        # Combine results
-        all_results = intra_results + inter_results
-        total_amount = sum(transfer['amount_requested'] for transfer in transfers)
-
-        # Create summary
-        transfer_summaries = []
-        for transfer in transfers:
-            transfer_summaries.append(f"{transfer['amount_requested']} from {transfer['from_account']} to {transfer['to_account']}")
+        amended_budget_names = [result.get('amended_budget_name', '') for result in results if result.get('success')]
 
         return {
             'success': True,
-            'amended_budget_names': [result.get('amended_budget_name', '') for result in all_results if result.get('success')],
+            'amended_budget_name': ', '.join(amended_budget_names),
+            'amended_budget_names': amended_budget_names,
             'original_budget_name': budget + (f', {target_budget}' if target_budget else ''),
-            'summary': f'Multi-transfer batch: {"; ".join(transfer_summaries)} (Total: {total_amount})',
+            'summary': '; '.join(result['summary'] for result in results),
             'transfer_count': len(transfers),
-            'individual_results': all_results
+            'individual_results': results
         }
 
     except Exception as e:
         raise Exception('Multi-transfer amendment error: ' + str(e))
 
-def process_intra_budget_amendment_batch(budget_name, transfers):
-    """Process amendment for multiple Intra-Budget transfers in one batch"""
-    try:
-        # Get budget data (allow cancelled budgets for re-amendment)
-        budget_data = frappe.db.sql("""
-            SELECT * FROM `tabBudget`
-            WHERE name = %s AND docstatus IN (1, 2)
-        """, (budget_name,), as_dict=True)
+def consolidate_transfers(transfers, source_budget, target_budget=None):
+    """Net all transfers into one {(budget, account): delta} map.
 
-        if not budget_data:
-            raise Exception("Budget not found: " + budget_name)
+    FROM accounts always belong to the source budget; TO accounts belong to the
+    target budget for Inter-Budget transfers and to the source budget otherwise.
+    """
+    to_budget = target_budget or source_budget
+    deltas = {}
 
-        budget = budget_data[0]
+    for transfer in transfers:
+        amount = flt(transfer['amount_requested'])
 
-        # Get budget accounts
-        accounts = frappe.db.sql("""
-            SELECT account, budget_amount FROM `tabBudget Account` WHERE parent = %s
-        """, (budget_name,), as_dict=True)
+        from_key = (source_budget, transfer['from_account'])
+        deltas[from_key] = deltas.get(from_key, 0.0) - amount
+
+        to_key = (to_budget, transfer['to_account'])
+        deltas[to_key] = deltas.get(to_key, 0.0) + amount
 
-        # Calculate TOTAL adjustments per account
-        adjustments = {}  # {account: total_net_adjustment}
+    return deltas
 
-        for transfer in transfers:
-            from_account = transfer['from_account']
-            to_account = transfer['to_account']
-            amount = transfer['amount_requested']
+def validate_consolidated_transfers(transfers, source_budget, source_accounts):
+    """Validate a whole batch in one pass: every FROM account must exist in the source budget"""
+    existing_accounts = {account['account'] for account in source_accounts}
+    missing_accounts = sorted({transfer['from_account'] for transfer in transfers} - existing_accounts)
 
-            # Subtract from source account
-            if from_account not in adjustments:
-                adjustments[from_account] = 0
-            adjustments[from_account] -= amount
+    if missing_accounts:
+        raise Exception("FROM account(s) not found in budget " + source_budget + ": " + ', '.join(missing_accounts))
 
-            # Add to target account
-            if to_account not in adjustments:
-                adjustments[to_account] = 0
-            adjustments[to_account] += amount
+def get_budget_adjustments(deltas, budget_name):
+    """Extract the {account: net_delta} adjustments of one budget from a consolidated delta map"""
+    return {account: delta for (budget, account), delta in deltas.items() if budget == budget_name}
+
+def summarize_consolidated_transfers(label, transfers, deltas):
+    """Compact audit summary: transfer count, total moved and the net change per budget account"""
+    total_amount = sum(flt(transfer['amount_requested']) for transfer in transfers)
+    net_changes = ', '.join(
+        f"{budget}/{account} {delta:+,.2f}"
+        for (budget, account), delta in sorted(deltas.items())
+        if delta
+    )
+    return f'{label}: {len(transfers)} transfer(s) totalling {total_amount:,.2f}; net: {net_changes or "no change"}'
+
+def process_intra_budget_amendment_batch(budget_name, transfers, context=None):
+    """Process amendment for multiple Intra-Budget transfers in one batch"""
+    try:
+        context = context or VirementContext()
 
-        # Validate all FROM accounts exist
-        for transfer in transfers:
-            from_account = transfer['from_account']
-            from_account_exists = any(account['account'] == from_account for account in accounts)
-            if not from_account_exists:
-                raise Exception("FROM account not found in budget: " + from_account)
+        # Get budget data (allow cancelled budgets for re-amendment and draft chain heads)
+        budget = context.get_budget(budget_name)
+
+        if not budget:
+            raise Exception("Budget not found: " + budget_name)
+
+        # Get budget accounts
+        accounts = context.get_budget_accounts(budget_name)
+
+        # Consolidate ALL transfers into net adjustments per account and validate the batch once
+        deltas = consolidate_transfers(transfers, budget_name)
+        validate_consolidated_transfers(transfers, budget_name, accounts)
+        adjustments = get_budget_adjustments(deltas, budget_name)
 
         # Cancel existing budget ONCE
-        frappe.db.set_value("Budget", budget_name, "docstatus", 2)
+        cancel_budget_for_amendment(budget_name)
 
         # Create amended budget ONCE with ALL adjustments
         amended_name = generate_amended_budget_name(budget_name)
         amended_budget = create_amended_budget(budget, amended_name, budget_name)
         copy_budget_accounts_with_multiple_adjustments(accounts, amended_budget, adjustments, add_missing=True)
-        amended_budget.insert()
-
-        # Create summary
-        transfer_summaries = []
-        for transfer in transfers:
-            transfer_summaries.append(f"{transfer['amount_requested']} from {transfer['from_account']} to {transfer['to_account']}")
+        insert_amended_budget(amended_budget)
 
         return {
             'success': True,
-            'amended_budget_name': amended_name,
+            'amended_budget_name': amended_budget.name,
             'original_budget_name': budget_name,
-            'summary': f'Intra-Budget batch: {"; ".join(transfer_summaries)}'
+            'net_adjustments': adjustments,
+            'summary': summarize_consolidated_transfers('Intra-Budget batch', transfers, deltas)
         }
 
     except Exception as e:
         raise Exception('Intra-Budget batch amendment error: ' + str(e))
 
-def process_inter_budget_amendment_batch(source_budget_name, target_budget_name, transfers):
+def process_inter_budget_amendment_batch(source_budget_name, target_budget_name, transfers, context=None):
     """Process amendment for multiple Inter-Budget transfers in one batch"""
     try:
-        # Get source and target budget data
-        source_budget_data = frappe.db.sql("""
-            SELECT * FROM `tabBudget`
-            WHERE name = %s AND docstatus IN (1, 2)
-        """, (source_budget_name,), as_dict=True)
-
-        target_budget_data = frappe.db.sql("""
-            SELECT * FROM `tabBudget`
-            WHERE name = %s AND docstatus IN (1, 2)
-        """, (target_budget_name,), as_dict=True)
-
-        if not source_budget_data:
+        context = context or VirementContext()
+
+        # Get source and target budget data (allow cancelled budgets and draft chain heads)
+        source_budget = context.get_budget(source_budget_name)
+        target_budget = context.get_budget(target_budget_name)
+
+        if not source_budget:
             raise Exception("Source budget not found: " + source_budget_name)
-        if not target_budget_data:
+        if not target_budget:
             raise Exception("Target budget not found: " + target_budget_name)
 
-        source_budget = source_budget_data[0]
-        target_budget = target_budget_data[0]
-
         # Get budget accounts
-        source_accounts = frappe.db.sql("""
-            SELECT account, budget_amount FROM `tabBudget Account` WHERE parent = %s
-        """, (source_budget_name,), as_dict=True)
-
-        target_accounts = frappe.db.sql("""
-            SELECT account, budget_amount FROM `tabBudget Account` WHERE parent = %s
-        """, (target_budget_name,), as_dict=True)
-
-        # Calculate TOTAL adjustments per account
-        source_adjustments = {}  # {account: total_amount_to_subtract}
-        target_adjustments = {}  # {account: total_amount_to_add}
-
-        for transfer in transfers:
-            from_account = transfer['from_account']
-            to_account = transfer['to_account']
-            amount = transfer['amount_requested']
-
-            # Accumulate source account adjustments (subtract)
-            if from_account not in source_adjustments:
-                source_adjustments[from_account] = 0
-            source_adjustments[from_account] -= amount
-
-            # Accumulate target account adjustments (add)
-            if to_account not in target_adjustments:
-                target_adjustments[to_account] = 0
-            target_adjustments[to_account] += amount
-
-        # Validate all FROM accounts exist in source budget
-        for transfer in transfers:
-            from_account = transfer['from_account']
-            from_account_exists = any(account['account'] == from_account for account in source_accounts)
-            if not from_account_exists:
-                raise Exception("FROM account not found in source budget: " + from_account)
+        source_accounts = context.get_budget_accounts(source_budget_name)
+        target_accounts = context.get_budget_accounts(target_budget_name)
+
+        # Consolidate ALL transfers into net adjustments per (budget, account) and validate the batch once
+        deltas = consolidate_transfers(transfers, source_budget_name, target_budget_name)
+        validate_consolidated_transfers(transfers, source_budget_name, source_accounts)
+        source_adjustments = get_budget_adjustments(deltas, source_budget_name)
+        target_adjustments = get_budget_adjustments(deltas, target_budget_name)
 
         # Cancel existing budgets ONCE
-        frappe.db.set_value("Budget", source_budget_name, "docstatus", 2)
-        frappe.db.set_value("Budget", target_budget_name, "docstatus", 2)
+        cancel_budget_for_amendment(source_budget_name)
+        cancel_budget_for_amendment(target_budget_name)
 
         # Create amended budgets ONCE with ALL adjustments
         amended_source_name = generate_amended_budget_name(source_budget_name)
@@ -1076,28 +1266,35 @@ def process_inter_budget_amendment_batch(source_budget_name, target_budget_name,
         # Create amended source budget
         amended_source_budget = create_amended_budget(source_budget, amended_source_name, source_budget_name)
         copy_budget_accounts_with_multiple_adjustments(source_accounts, amended_source_budget, source_adjustments, add_missing=False)
-        amended_source_budget.insert()
+        insert_amended_budget(amended_source_budget)
 
         # Create amended target budget
         amended_target_budget = create_amended_budget(target_budget, amended_target_name, target_budget_name)
         copy_budget_accounts_with_multiple_adjustments(target_accounts, amended_target_budget, target_adjustments, add_missing=True)
-        amended_target_budget.insert()
-
-        # Create summary
-        transfer_summaries = []
-        for transfer in transfers:
-            transfer_summaries.append(f"{transfer['amount_requested']} from {transfer['from_account']} to {transfer['to_account']}")
+        insert_amended_budget(amended_target_budget)
 
         return {
             'success': True,
-            'amended_budget_name': amended_source_name + ', ' + amended_target_name,
+            'amended_budget_name': amended_source_budget.name + ', ' + amended_target_budget.name,
             'original_budget_name': source_budget_name + ', ' + target_budget_name,
-            'summary': f'Inter-Budget batch: {"; ".join(transfer_summaries)}'
+            'net_adjustments': {
+                source_budget_name: source_adjustments,
+                target_budget_name: target_adjustments
+            },
+            'summary': summarize_consolidated_transfers('Inter-Budget batch', transfers, deltas)
         }
 
     except Exception as e:
         raise Exception('Inter-Budget batch amendment error: ' + str(e))
 
+def cancel_budget_for_amendment(budget_name):
+    """Cancel a budget that is being replaced by an amendment and record it in the amendment chain"""
+    frappe.db.set_value("Budget", budget_name, "docstatus", 2)
+    mark_cancelled(budget_name)
+    # set_value skips the Budget on_cancel hook, so drop the cached picker lists and summaries here
+    clear_budget_picker_cache()
+    clear_summary_cache()
+
 def generate_amended_budget_name(original_name):
     """Generate unique amended budget name"""
     amended_name = original_name + "-1"
@@ -1164,8 +1361,9 @@ def copy_budget_accounts_with_adjustment(accounts, budget_doc, adjust_account, a
         })
 
 
-def copy_budget_accounts_with_multiple_adjustments(accounts, budget_doc, adjustments, add_missing=False):
-    """Copy budget accounts with multiple adjustments applied at once"""
+def get_amended_account_rows(accounts, adjustments, add_missing=False):
+    """Return the Budget Account rows of an amended budget with net adjustments applied"""
+    rows = []
     processed_accounts = set()
 
     # Process existing accounts
@@ -1178,7 +1376,7 @@ def copy_budget_accounts_with_multiple_adjustments(accounts, budget_doc, adjustm
             new_amount += adjustments[account_name]
             processed_accounts.add(account_name)
 
-        budget_doc.append('accounts', {
+        rows.append({
             'account': account_name,
             'budget_amount': new_amount
         })
@@ -1187,55 +1385,98 @@ def copy_budget_accounts_with_multiple_adjustments(accounts, budget_doc, adjustm
     if add_missing:
         for account_name, adjustment in adjustments.items():
             if account_name not in processed_accounts:
-                budget_doc.append('accounts', {
+                rows.append({
                     'account': account_name,
                     'budget_amount': adjustment
                 })
 
+    return rows
 
-def get_amended_budgets(source_budget, target_budget=None, virement_type=None):
-    """Get amended budget names for a Budget Request - safe server method"""
+
+def copy_budget_accounts_with_multiple_adjustments(accounts, budget_doc, adjustments, add_missing=False):
+    """Copy budget accounts with multiple adjustments applied at once"""
+    for row in get_amended_account_rows(accounts, adjustments, add_missing):
+        budget_doc.append('accounts', row)
+
+
+def insert_amended_budget(budget_doc):
+    """Fast-path insert of an amended Budget carrying hundreds of accounts.
+
+    `insert()` validates and INSERTs every Budget Account row on its own. Here the
+    Budget is validated once with all rows in memory, the parent is inserted alone
+    and the child rows are written with one multi-row INSERT.
+    """
+    budget_doc.set_new_name()
+    budget_doc.set_parent_in_children()
+
+    # Budget-level validation, once, with every account row present
+    budget_doc._validate_mandatory()
+    budget_doc.run_method("validate")
+
+    accounts = budget_doc.get('accounts')
+    budget_doc.set('accounts', [])
+
+    budget_doc.flags.ignore_validate = True
+    budget_doc.flags.ignore_mandatory = True
     try:
-        amended_budgets = []
+        budget_doc.insert()
+    finally:
+        budget_doc.flags.ignore_validate = False
+        budget_doc.flags.ignore_mandatory = False
+
+    bulk_insert_child_rows(budget_doc, 'accounts', accounts)
+    return budget_doc
+
+
+def bulk_insert_child_rows(parent_doc, parentfield, rows):
+    """Write the child rows of an inserted document with a single multi-row INSERT"""
+    values = []
+    for idx, row in enumerate(rows, start=1):
+        # Same parent linkage and timestamps Document.insert() gives its children
+        row.update({
+            'parent': parent_doc.name,
+            'parentfield': parentfield,
+            'parenttype': parent_doc.doctype,
+            'idx': idx,
+            'docstatus': parent_doc.docstatus,
+            'owner': parent_doc.owner,
+            'creation': parent_doc.creation,
+            'modified': parent_doc.modified,
+            'modified_by': parent_doc.modified_by
+        })
+        values.append(row.get_valid_dict(convert_dates_to_str=True))
 
-        # For Intra-Budget: only check source budget
-        if virement_type == 'Intra-Budget' and source_budget:
-            rows = frappe.db.sql(
-                """
-                SELECT name FROM `tabBudget`
-                WHERE amended_from = %s
-                ORDER BY creation DESC
-                """,
-                (source_budget,),
-                as_dict=True,
-            )
-            amended_budgets.extend([r.name for r in rows])
+    if values:
+        fields = list(values[0])
+        frappe.db.bulk_insert(
+            rows[0].doctype,
+            fields,
+            [tuple(value[field] for field in fields) for value in values]
+        )
 
-        # For Inter-Budget: check both source and target budgets
+    parent_doc.set(parentfield, rows)
+
+
+@virement_actions.action(
+    source_budget=Param(str, required=True),
+    target_budget=Param(str),
+    virement_type=Param(str)
+)
+def get_amended_budgets(source_budget, target_budget=None, virement_type=None):
+    """Get amended budget names for a Budget Request (newest first) from the amendment chain"""
+    try:
+        if virement_type == 'Intra-Budget':
+            originals = [source_budget]
         elif virement_type == 'Inter-Budget':
-            if source_budget:
-                rows = frappe.db.sql(
-                    """
-                    SELECT name FROM `tabBudget`
-                    WHERE amended_from = %s
-                    ORDER BY creation DESC
-                    """,
-                    (source_budget,),
-                    as_dict=True,
-                )
-                amended_budgets.extend([r.name for r in rows])
+            originals = [source_budget, target_budget]
+        else:
+            originals = []
 
-            if target_budget:
-                rows = frappe.db.sql(
-                    """
-                    SELECT name FROM `tabBudget`
-                    WHERE amended_from = %s
-                    ORDER BY creation DESC
-                    """,
-                    (target_budget,),
-                    as_dict=True,
-                )
-                amended_budgets.extend([r.name for r in rows])
+        amended_budgets = []
+        for original in originals:
+            if original:
+                history = get_chain_history(original, newer_only=True)
+                amended_budgets.extend(row.budget for row in reversed(history))
 
         return amended_budgets
 
@@ -1244,21 +1485,14 @@ def get_amended_budgets(source_budget, target_budget=None, virement_type=None):
         return []
 
 
-def calculate_progressive_transfer_amounts(transfer_items, source_budget, target_budget, virement_type):
-    """Calculate progressive before/after amounts for each transfer showing step-by-step changes"""
+def calculate_progressive_transfer_amounts(transfer_items, source_budget, target_budget, virement_type, opening_deltas=None):
+    """Calculate progressive before/after amounts for each transfer showing step-by-step changes.
+
+    `opening_deltas` ({(budget, account): delta}) are the net changes of the rows
+    before `transfer_items`, for summaries that start part-way through a request.
+    """
     try:
-        def get_amount(budget_name, account_name):
-            if not budget_name or not account_name:
-                return 0.0
-            row = frappe.db.sql(
-                """
-                SELECT budget_amount FROM `tabBudget Account`
-                WHERE parent = %s AND account = %s
-                """,
-                (budget_name, account_name),
-                as_dict=True,
-            )
-            return float(row[0].budget_amount) if row else 0.0
+        opening_deltas = opening_deltas or {}
 
         # Initialize running balances with original budget amounts
         running_balances = {}
@@ -1272,9 +1506,12 @@ def calculate_progressive_transfer_amounts(transfer_items, source_budget, target
             else:
                 all_accounts.add((item.to_account, source_budget))
 
-        # Initialize running balances
+        # Initialize running balances, reading every involved account in one query
+        budget_amounts = get_budget_amounts([(budget, account) for account, budget in all_accounts])
         for account, budget in all_accounts:
-            running_balances[(account, budget)] = get_amount(budget, account)
+            running_balances[(account, budget)] = (
+                budget_amounts.get((budget, account), 0.0) + opening_deltas.get((budget, account), 0.0)
+            )
 
         # Calculate progressive amounts for each transfer
         progressive_amounts = []
@@ -1320,141 +1557,174 @@ def calculate_progressive_transfer_amounts(transfer_items, source_budget, target
         return [{'from_before': 0, 'from_after': 0, 'to_before': 0, 'to_after': 0} for _ in transfer_items]
 
 
-def get_summary_details(source_budget, target_budget=None, virement_type=None, from_account=None, to_account=None, doc_name=None):
-    """Return before/after amounts for involved accounts and latest amended budgets"""
+@virement_actions.action(
+    source_budget=Param(str),
+    target_budget=Param(str),
+    virement_type=Param(str),
+    from_account=Param(str, aliases=('expense_account',)),
+    to_account=Param(str, aliases=('to_expense_account',)),
+    doc_name=Param(str),
+    start=Param(int, default=0),
+    page_len=Param(int)
+)
+def get_summary_details(source_budget, target_budget=None, virement_type=None, from_account=None, to_account=None, doc_name=None,
+                        start=0, page_len=None):
+    """Return before/after amounts for involved accounts and latest amended budgets.
+
+    With page_len, a multi-transfer summary covers only that page of transfer
+    items; its amounts still include the effect of the rows before it.
+    Summaries of saved requests are cached until the request or the amendment
+    chains of its budgets change.
+    """
+    args = (source_budget, target_budget, virement_type, from_account, to_account, doc_name, start, page_len)
     try:
-        def get_amount(budget_name, account_name):
-            if not budget_name or not account_name:
-                return None
-            row = frappe.db.sql(
-                """
-                SELECT budget_amount FROM `tabBudget Account`
-                WHERE parent = %s AND account = %s
-                """,
-                (budget_name, account_name),
-                as_dict=True,
-            )
-            return float(row[0].budget_amount) if row else 0.0
-
-        def latest_amended(original_name):
-            rows = frappe.db.sql(
-                """
-                SELECT name FROM `tabBudget`
-                WHERE amended_from = %s
-                ORDER BY creation DESC
-                LIMIT 1
-                """,
-                (original_name,),
-                as_dict=True,
+        if doc_name:
+            return get_cached_summary(
+                doc_name, [source_budget, target_budget], args, lambda: build_summary_details(*args)
             )
-            return rows[0].name if rows else None
+        return build_summary_details(*args)
 
-        # Check if this is multi-transfer mode
-        is_multi_transfer = doc_name and is_multi_transfer_mode(doc_name)
-
-        if is_multi_transfer:
-            # Get transfer items for multi-transfer mode
-            budget_request = frappe.get_doc("Budget Request", doc_name)
-            transfer_items = budget_request.transfer_items or []
-
-            # Build result for multi-transfer mode
-            result = {
-                'amended_budgets': [],
-                'multi_transfer': True,
-                'transfer_items': []
-            }
+    except Exception as e:
+        frappe.log_error(f"Error getting summary details: {str(e)}")
+        return {
+            'amended_budgets': [],
+            'from': {'budget': source_budget, 'account': from_account, 'before': None, 'after': None},
+            'to': {'budget': target_budget or source_budget, 'account': to_account, 'before': None, 'after': None},
+        }
 
-            # Get amended budgets
-            if virement_type == 'Intra-Budget':
-                amended = latest_amended(source_budget)
-                result['amended_budgets'] = [amended] if amended else []
-            elif virement_type == 'Inter-Budget':
-                amended_source = latest_amended(source_budget)
-                amended_target = latest_amended(target_budget) if target_budget else None
-                result['amended_budgets'] = [n for n in [amended_source, amended_target] if n]
-
-            # Calculate progressive amounts for each transfer
-            progressive_amounts = calculate_progressive_transfer_amounts(
-                transfer_items, source_budget, target_budget, virement_type
+def build_summary_details(source_budget, target_budget=None, virement_type=None, from_account=None, to_account=None, doc_name=None,
+                          start=0, page_len=None):
+    """Summary for get_summary_details, computed from the database"""
+    def get_amount(budget_name, account_name):
+        if not budget_name or not account_name:
+            return None
+        row = frappe.db.sql(
+            """
+            SELECT budget_amount FROM `tabBudget Account`
+            WHERE parent = %s AND account = %s
+            """,
+            (budget_name, account_name),
+            as_dict=True,
+        )
+        return float(row[0].budget_amount) if row else 0.0
+
+    def latest_amended(original_name):
+        head = get_chain_head(original_name, raise_if_cancelled=False)
+        return head if head and head != original_name else None
+
+    # Check if this is multi-transfer mode; a paged summary reads only its page of rows
+    opening_deltas = None
+    if doc_name and page_len:
+        transfer_items, total_items = get_transfer_item_page(doc_name, start, page_len)
+        is_multi_transfer = total_items > 0
+        if transfer_items and start:
+            # Rows above the page are folded into opening balances by the database
+            opening_deltas = get_net_deltas(
+                doc_name, source_budget, target_budget if virement_type == 'Inter-Budget' else None,
+                before_idx=transfer_items[0].idx
             )
+    else:
+        is_multi_transfer = doc_name and is_multi_transfer_mode(doc_name)
 
-            # Process each transfer item with progressive amounts
-            for i, item in enumerate(transfer_items):
-                from_acc = item.from_account
-                to_acc = item.to_account
-                amount = item.amount_requested
-
-                # Get progressive amounts for this transfer
-                prog_amounts = progressive_amounts[i]
-
-                # Determine which budgets to use based on virement type
-                if virement_type == "Inter-Budget":
-                    from_budget = source_budget
-                    to_budget = target_budget
-                else:
-                    # Intra-Budget: both accounts in same budget
-                    from_budget = source_budget
-                    to_budget = source_budget
-
-                transfer_summary = {
-                    'amount': amount,
-                    'from': {
-                        'budget': from_budget,
-                        'account': from_acc,
-                        'before': prog_amounts['from_before'],
-                        'after': prog_amounts['from_after']
-                    },
-                    'to': {
-                        'budget': to_budget,
-                        'account': to_acc,
-                        'before': prog_amounts['to_before'],
-                        'after': prog_amounts['to_after']
-                    }
-                }
-                result['transfer_items'].append(transfer_summary)
-
-            return result
+    if is_multi_transfer:
+        # Get transfer items for multi-transfer mode
+        if not page_len:
+            budget_request = load_budget_request(doc_name)
+            transfer_items = budget_request.transfer_items or []
+            total_items = len(transfer_items)
 
-        else:
-            # Legacy single-transfer mode
-            result = {
-                'amended_budgets': [],
-                'multi_transfer': False,
-                'from': {'budget': source_budget, 'account': from_account, 'before': None, 'after': None},
-                'to': {'budget': target_budget or source_budget, 'account': to_account, 'before': None, 'after': None},
-            }
+        # Build result for multi-transfer mode
+        result = {
+            'amended_budgets': [],
+            'multi_transfer': True,
+            'transfer_items': [],
+            'start': start if page_len else 0,
+            'total_items': total_items
+        }
 
+        # Get amended budgets
         if virement_type == 'Intra-Budget':
             amended = latest_amended(source_budget)
             result['amended_budgets'] = [amended] if amended else []
-
-            result['from']['before'] = get_amount(source_budget, from_account)
-            result['to']['before'] = get_amount(source_budget, to_account)
-
-            if amended:
-                result['from']['after'] = get_amount(amended, from_account)
-                result['to']['after'] = get_amount(amended, to_account)
-
         elif virement_type == 'Inter-Budget':
             amended_source = latest_amended(source_budget)
             amended_target = latest_amended(target_budget) if target_budget else None
             result['amended_budgets'] = [n for n in [amended_source, amended_target] if n]
 
-            result['from']['before'] = get_amount(source_budget, from_account)
-            result['from']['after'] = get_amount(amended_source, from_account) if amended_source else None
+        # Calculate progressive amounts for each transfer
+        progressive_amounts = calculate_progressive_transfer_amounts(
+            transfer_items, source_budget, target_budget, virement_type, opening_deltas
+        )
+
+        # Process each transfer item with progressive amounts
+        for i, item in enumerate(transfer_items):
+            from_acc = item.from_account
+            to_acc = item.to_account
+            amount = item.amount_requested
+
+            # Get progressive amounts for this transfer
+            prog_amounts = progressive_amounts[i]
 
-            result['to']['budget'] = target_budget
-            result['to']['before'] = get_amount(target_budget, to_account) if target_budget else None
-            result['to']['after'] = get_amount(amended_target, to_account) if amended_target else None
+            # Determine which budgets to use based on virement type
+            if virement_type == "Inter-Budget":
+                from_budget = source_budget
+                to_budget = target_budget
+            else:
+                # Intra-Budget: both accounts in same budget
+                from_budget = source_budget
+                to_budget = source_budget
+
+            transfer_summary = {
+                'amount': amount,
+                'from': {
+                    'budget': from_budget,
+                    'account': from_acc,
+                    'before': prog_amounts['from_before'],
+                    'after': prog_amounts['from_after']
+                },
+                'to': {
+                    'budget': to_budget,
+                    'account': to_acc,
+                    'before': prog_amounts['to_before'],
+                    'after': prog_amounts['to_after']
+                }
+            }
+            result['transfer_items'].append(transfer_summary)
 
         return result
 
-    except Exception as e:
-        frappe.log_error(f"Error getting summary details: {str(e)}")
-        return {
+    else:
+        # Legacy single-transfer mode
+        result = {
             'amended_budgets': [],
+            'multi_transfer': False,
             'from': {'budget': source_budget, 'account': from_account, 'before': None, 'after': None},
             'to': {'budget': target_budget or source_budget, 'account': to_account, 'before': None, 'after': None},
         }
 
+    if virement_type == 'Intra-Budget':
+        amended = latest_amended(source_budget)
+        result['amended_budgets'] = [amended] if amended else []
+
+        result['from']['before'] = get_amount(source_budget, from_account)
+        result['to']['before'] = get_amount(source_budget, to_account)
+
+        if amended:
+            result['from']['after'] = get_amount(amended, from_account)
+            result['to']['after'] = get_amount(amended, to_account)
+
+    elif virement_type == 'Inter-Budget':
+        amended_source = latest_amended(source_budget)
+        amended_target = latest_amended(target_budget) if target_budget else None
+        result['amended_budgets'] = [n for n in [amended_source, amended_target] if n]
+
+        result['from']['before'] = get_amount(source_budget, from_account)
+        result['from']['after'] = get_amount(amended_source, from_account) if amended_source else None
+
+        result['to']['budget'] = target_budget
+        result['to']['before'] = get_amount(target_budget, to_account) if target_budget else None
+        result['to']['after'] = get_amount(amended_target, to_account) if amended_target else None
+
+    return result
+
 
@@ -0,0 +1,139 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Call count, latency and SQL usage of the whitelisted budget APIs.
+
+Endpoints decorated with `instrumented` record, per call, the wall time, the
+number of SQL queries and the time spent in them. Counters go into one Redis
+hash per hour, kept for `STATS_WINDOW_HOURS`, so the statistics cover a
+rolling window and all workers report into the same place. The hashes are
+kept with the `redis_stats` helpers shared with the action router; wall time
+is a histogram over their buckets, from which
+`get_endpoint_stats` estimates p50/p95/p99.
+
+A call that runs the same SQL statement `n_plus_one_threshold` times or more
+(site config `wcfcb_n_plus_one_threshold`, default 10) is flagged as a likely
+N+1 pattern, and the statement is kept for inspection. Nested instrumented
+calls are counted as part of the outermost endpoint only.
+"""
+
+import functools
+import time
+from collections import Counter
+from datetime import timedelta
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+from wcfcb_zm.api.redis_stats import HISTOGRAM_BUCKETS_MS, delete_stats, full_histogram, read_stats, record_call
+from wcfcb_zm.api.sql_listener import sql_listener
+
+STATS_WINDOW_HOURS = 24
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+
+
+def instrumented(fn):
+    """Record timing and SQL usage of each call of fn under its dotted path"""
+    endpoint = f'{fn.__module__}.{fn.__qualname__}'
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if getattr(frappe.local, 'wcfcb_instrumented_call', None):
+            return fn(*args, **kwargs)
+
+        call = frappe.local.wcfcb_instrumented_call = frappe._dict(sql_count=0, sql_ms=0.0, statements=Counter())
+
+        def on_query(query, values, elapsed_ms):
+            call.sql_count += 1
+            call.sql_ms += elapsed_ms
+            call.statements[query] += 1
+
+        start = time.perf_counter()
+        try:
+            with sql_listener(on_query):
+                return fn(*args, **kwargs)
+        finally:
+            frappe.local.wcfcb_instrumented_call = None
+            record_endpoint_call(endpoint, (time.perf_counter() - start) * 1000, call)
+
+    return wrapper
+
+
+def get_n_plus_one_threshold():
+    return cint(frappe.conf.get('wcfcb_n_plus_one_threshold')) or DEFAULT_N_PLUS_ONE_THRESHOLD
+
+
+def get_hour_key(hour):
+    return frappe.cache().make_key(f'wcfcb_endpoint_stats:{hour:%Y%m%d%H}')
+
+
+def record_endpoint_call(endpoint, elapsed_ms, call):
+    """Add one call to the endpoint's counters for the current hour"""
+    counters = {'sql_count': call.sql_count}
+    values = {}
+    if call.statements:
+        statement, repeats = call.statements.most_common(1)[0]
+        if repeats >= get_n_plus_one_threshold():
+            counters['n_plus_one'] = 1
+            values['n_plus_one_query'] = f'{repeats}x {" ".join(statement.split())[:500]}'
+
+    record_call(
+        get_hour_key(now_datetime()), endpoint, elapsed_ms,
+        counters=counters, totals={'sql_ms': call.sql_ms}, values=values,
+        expire=STATS_WINDOW_HOURS * 3600,
+    )
+
+
+def estimate_percentile(histogram, count, quantile):
+    """Upper bound (ms) of the bucket holding the quantile; None when it falls in the open-ended bucket"""
+    if not count:
+        return 0
+    seen = 0
+    for bound in HISTOGRAM_BUCKETS_MS:
+        seen += histogram.get(f'le_{bound}', 0)
+        if seen >= quantile * count:
+            return bound
+    return None
+
+
+@frappe.whitelist()
+def get_endpoint_stats(hours=STATS_WINDOW_HOURS):
+    """Per-endpoint counts, latency percentiles and SQL usage over the last `hours`, busiest first"""
+    frappe.only_for('System Manager')
+
+    hours = min(max(cint(hours), 1), STATS_WINDOW_HOURS)
+    now = now_datetime()
+    endpoints = {}
+    # Hours are read newest first, so the most recent N+1 statement is kept
+    for raw in read_stats([get_hour_key(now - timedelta(hours=offset)) for offset in range(hours)]):
+        for endpoint, metrics in raw.items():
+            stats = endpoints.setdefault(endpoint, {
+                'endpoint': endpoint, 'count': 0, 'total_ms': 0.0, 'sql_count': 0, 'sql_ms': 0.0,
+                'n_plus_one': 0, 'n_plus_one_query': None, 'histogram': Counter(),
+            })
+            for metric in ('count', 'sql_count', 'n_plus_one'):
+                stats[metric] += int(metrics.get(metric, 0))
+            for metric in ('total_ms', 'sql_ms'):
+                stats[metric] += float(metrics.get(metric, 0))
+            stats['n_plus_one_query'] = stats['n_plus_one_query'] or metrics.get('n_plus_one_query')
+            stats['histogram'].update(metrics['histogram'])
+
+    for stats in endpoints.values():
+        count = stats['count']
+        stats['avg_ms'] = stats['total_ms'] / count if count else 0
+        stats['avg_sql_count'] = stats['sql_count'] / count if count else 0
+        stats['avg_sql_ms'] = stats['sql_ms'] / count if count else 0
+        for name, quantile in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            stats[name] = estimate_percentile(stats['histogram'], count, quantile)
+        stats['histogram'] = full_histogram(stats['histogram'])
+
+    return sorted(endpoints.values(), key=lambda stats: stats['total_ms'], reverse=True)
+
+
+@frappe.whitelist()
+def reset_endpoint_stats():
+    """Clear the counters of the whole window"""
+    frappe.only_for('System Manager')
+    now = now_datetime()
+    delete_stats([get_hour_key(now - timedelta(hours=offset)) for offset in range(STATS_WINDOW_HOURS)])
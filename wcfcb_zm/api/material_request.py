@@ -3,6 +3,9 @@ from frappe import _
 from frappe.utils import nowdate, add_days, getdate, get_first_day, get_last_day, flt
 import calendar
 
+from wcfcb_zm.api.budget_math import apply_budget_status, available_amount, monthly_budget_amount, shortage
+from wcfcb_zm.api.instrumentation import instrumented
+
 
 
 def get_budget_details(expense_account, cost_center=None, project=None, transaction_date=None):
@@ -54,27 +57,19 @@ def get_budget_details(expense_account, cost_center=None, project=None, transact
               {gl_against_condition}
         ), 0) AS actual_expenses,
         IFNULL((
-            SELECT SUM(mri.amount)
-            FROM `tabMaterial Request Item` mri
-            JOIN `tabMaterial Request` mr ON mr.name = mri.parent
-            WHERE mri.expense_account = %(expense_account)s
-              AND mr.docstatus = 1
-              AND mr.status NOT IN ('Cancelled', 'Stopped')
-              AND mr.transaction_date BETWEEN %(year_start_date)s AND %(year_end_date)s
-              {mr_against_condition}
-              -- Exclude Material Request items that are already linked to Purchase Orders
-              AND NOT EXISTS (
-                  SELECT 1
-                  FROM `tabPurchase Order Item` poi
-                  JOIN `tabPurchase Order` po ON po.name = poi.parent
-                  WHERE poi.material_request = mr.name
-                    AND poi.material_request_item = mri.name
-                    AND po.docstatus = 1
-                    AND po.status NOT IN ('Completed', 'Cancelled', 'Closed')
-              )
+            -- Reservations still held by Material Request items (see wcfcb_zm.budget_reservation)
+            SELECT SUM(re.amount)
+            FROM `tabBudget Reservation Entry` re
+            JOIN `tabMaterial Request` mr ON mr.name = re.material_request
+            WHERE re.expense_account = %(expense_account)s
+              AND re.is_cancelled = 0
+              AND mr.status != 'Stopped'
+              AND re.transaction_date BETWEEN %(year_start_date)s AND %(year_end_date)s
+              {reservation_against_condition}
         ), 0) AS material_request_committed,
         IFNULL((
-            SELECT SUM(poi.base_amount)
+            -- Only the part not yet billed; billed amounts are already in GL as actuals
+            SELECT SUM(GREATEST(poi.base_amount - IFNULL(poi.billed_amt, 0) * IFNULL(po.conversion_rate, 1), 0))
             FROM `tabPurchase Order Item` poi
             JOIN `tabPurchase Order` po ON po.name = poi.parent
             WHERE poi.expense_account = %(expense_account)s
@@ -111,7 +106,7 @@ def get_budget_details(expense_account, cost_center=None, project=None, transact
         query = query.replace("{budget_against_field}", "b.cost_center")
         query = query.replace("{budget_against_name_field}", "COALESCE(cc.cost_center_name, b.cost_center)")
         query = query.replace("{gl_against_condition}", "AND gl.cost_center = %(cost_center)s")
-        query = query.replace("{mr_against_condition}", "AND mri.cost_center = %(cost_center)s")
+        query = query.replace("{reservation_against_condition}", "AND re.cost_center = %(cost_center)s")
         query = query.replace("{po_against_condition}", "AND poi.cost_center = %(cost_center)s")
         query = query.replace("{budget_where_condition}", "AND b.cost_center = %(cost_center)s")
 
@@ -126,7 +121,7 @@ def get_budget_details(expense_account, cost_center=None, project=None, transact
         query = query.replace("{budget_against_field}", "b.project")
         query = query.replace("{budget_against_name_field}", "COALESCE(p.project_name, b.project)")
         query = query.replace("{gl_against_condition}", "AND gl.project = %(project)s")
-        query = query.replace("{mr_against_condition}", "AND mri.project = %(project)s")
+        query = query.replace("{reservation_against_condition}", "AND re.project = %(project)s")
         query = query.replace("{po_against_condition}", "AND poi.project = %(project)s")
         query = query.replace("{budget_where_condition}", "AND b.project = %(project)s")
 
@@ -148,10 +143,10 @@ def get_budget_details(expense_account, cost_center=None, project=None, transact
     #                  - Purchase Order Commitments (includes linked POs)
     # Note: MR commitments are excluded if they're already linked to POs to avoid double-counting
     for result in results:
-        result['available_budget'] = (
-            result['budget_amount'] -
-            result['actual_expenses'] -
-            result['material_request_committed'] -
+        result['available_budget'] = available_amount(
+            result['budget_amount'],
+            result['actual_expenses'],
+            result['material_request_committed'],
             result['purchase_order_committed']
         )
 
@@ -194,7 +189,7 @@ def get_monthly_distribution_info(monthly_distribution, annual_budget, check_dat
                 monthly_percentage = percentage_value
 
         # Calculate monthly budget amount
-        monthly_budget_amount = (annual_budget * monthly_percentage) / 100
+        monthly_budget = monthly_budget_amount(annual_budget, monthly_percentage)
 
         # Get monthly expenses and commitments for the current month
         month_start = get_first_day(check_date_obj)
@@ -213,27 +208,19 @@ def get_monthly_distribution_info(monthly_distribution, annual_budget, check_dat
                   {gl_against_condition}
             ), 0) AS monthly_actual_expenses,
             IFNULL((
-                SELECT SUM(mri.amount)
-                FROM `tabMaterial Request Item` mri
-                JOIN `tabMaterial Request` mr ON mr.name = mri.parent
-                WHERE mri.expense_account = %(expense_account)s
-                  AND mr.docstatus = 1
-                  AND mr.status NOT IN ('Cancelled', 'Stopped')
-                  AND mr.transaction_date BETWEEN %(month_start)s AND %(month_end)s
-                  {mr_against_condition}
-                  -- Exclude Material Request items that are already linked to Purchase Orders
-                  AND NOT EXISTS (
-                      SELECT 1
-                      FROM `tabPurchase Order Item` poi
-                      JOIN `tabPurchase Order` po ON po.name = poi.parent
-                      WHERE poi.material_request = mr.name
-                        AND poi.material_request_item = mri.name
-                        AND po.docstatus = 1
-                        AND po.status NOT IN ('Completed', 'Cancelled', 'Closed')
-                  )
+                -- Reservations still held by Material Request items (see wcfcb_zm.budget_reservation)
+                SELECT SUM(re.amount)
+                FROM `tabBudget Reservation Entry` re
+                JOIN `tabMaterial Request` mr ON mr.name = re.material_request
+                WHERE re.expense_account = %(expense_account)s
+                  AND re.is_cancelled = 0
+                  AND mr.status != 'Stopped'
+                  AND re.transaction_date BETWEEN %(month_start)s AND %(month_end)s
+                  {reservation_against_condition}
             ), 0) AS monthly_mr_committed,
             IFNULL((
-                SELECT SUM(poi.base_amount)
+                -- Only the part not yet billed; billed amounts are already in GL as actuals
+                SELECT SUM(GREATEST(poi.base_amount - IFNULL(poi.billed_amt, 0) * IFNULL(po.conversion_rate, 1), 0))
                 FROM `tabPurchase Order Item` poi
                 JOIN `tabPurchase Order` po ON po.name = poi.parent
                 WHERE poi.expense_account = %(expense_account)s
@@ -247,7 +234,7 @@ def get_monthly_distribution_info(monthly_distribution, annual_budget, check_dat
         # Replace placeholders based on cost_center or project
         if cost_center:
             monthly_query = monthly_query.replace("{gl_against_condition}", "AND gl.cost_center = %(cost_center)s")
-            monthly_query = monthly_query.replace("{mr_against_condition}", "AND mri.cost_center = %(cost_center)s")
+            monthly_query = monthly_query.replace("{reservation_against_condition}", "AND re.cost_center = %(cost_center)s")
             monthly_query = monthly_query.replace("{po_against_condition}", "AND poi.cost_center = %(cost_center)s")
             monthly_args = {
                 'expense_account': expense_account,
@@ -257,7 +244,7 @@ def get_monthly_distribution_info(monthly_distribution, annual_budget, check_dat
             }
         else:
             monthly_query = monthly_query.replace("{gl_against_condition}", "AND gl.project = %(project)s")
-            monthly_query = monthly_query.replace("{mr_against_condition}", "AND mri.project = %(project)s")
+            monthly_query = monthly_query.replace("{reservation_against_condition}", "AND re.project = %(project)s")
             monthly_query = monthly_query.replace("{po_against_condition}", "AND poi.project = %(project)s")
             monthly_args = {
                 'expense_account': expense_account,
@@ -271,10 +258,10 @@ def get_monthly_distribution_info(monthly_distribution, annual_budget, check_dat
 
         if monthly_result:
             monthly_data = monthly_result[0]
-            monthly_available = (
-                monthly_budget_amount -
-                monthly_data['monthly_actual_expenses'] -
-                monthly_data['monthly_mr_committed'] -
+            monthly_available = available_amount(
+                monthly_budget,
+                monthly_data['monthly_actual_expenses'],
+                monthly_data['monthly_mr_committed'],
                 monthly_data['monthly_po_committed']
             )
         else:
@@ -283,14 +270,14 @@ def get_monthly_distribution_info(monthly_distribution, annual_budget, check_dat
                 'monthly_mr_committed': 0,
                 'monthly_po_committed': 0
             }
-            monthly_available = monthly_budget_amount
+            monthly_available = monthly_budget
 
         return {
             'has_monthly_distribution': True,
             'monthly_distribution_id': monthly_dist.distribution_id,
             'current_month': current_month_name,
             'monthly_percentage': monthly_percentage,
-            'monthly_budget_amount': monthly_budget_amount,
+            'monthly_budget_amount': monthly_budget,
             'monthly_actual_expenses': monthly_data['monthly_actual_expenses'],
             'monthly_mr_committed': monthly_data['monthly_mr_committed'],
             'monthly_po_committed': monthly_data['monthly_po_committed'],
@@ -307,6 +294,7 @@ def get_monthly_distribution_info(monthly_distribution, annual_budget, check_dat
 
 
 @frappe.whitelist()
+@instrumented
 def check_budget(expense_account, cost_center=None, project=None, requested_amount=0, transaction_date=None):
     """
     Check budget details for a specific expense account and cost center or project.
@@ -324,31 +312,8 @@ def check_budget(expense_account, cost_center=None, project=None, requested_amou
 
         budget_data = get_budget_details(expense_account, cost_center, project, transaction_date)
 
-        # Add requested amount validation for each budget
-        requested_amount = flt(requested_amount)
-        for budget in budget_data:
-            # Annual budget status
-            budget['within_annual_budget'] = requested_amount <= budget['available_budget']
-            budget['annual_budget_status'] = 'WITHIN BUDGET' if budget['within_annual_budget'] else 'EXCEEDS BUDGET'
-
-            # Monthly budget status (if applicable)
-            if budget.get('has_monthly_distribution'):
-                budget['within_monthly_budget'] = requested_amount <= budget['monthly_available_budget']
-                budget['monthly_budget_status'] = 'WITHIN MONTHLY BUDGET' if budget['within_monthly_budget'] else 'EXCEEDS MONTHLY BUDGET'
-
-                # Overall status considers both annual and monthly
-                if budget['within_annual_budget'] and budget['within_monthly_budget']:
-                    budget['overall_status'] = 'WITHIN BUDGET'
-                elif not budget['within_monthly_budget']:
-                    budget['overall_status'] = 'EXCEEDS MONTHLY BUDGET'
-                else:
-                    budget['overall_status'] = 'EXCEEDS ANNUAL BUDGET'
-            else:
-                budget['within_monthly_budget'] = True  # No monthly restriction
-                budget['monthly_budget_status'] = 'NO MONTHLY DISTRIBUTION'
-                budget['overall_status'] = budget['annual_budget_status']
-
-        return budget_data
+        # Add requested amount validation for each budget (annual and, if distributed, monthly)
+        return apply_budget_status(budget_data, flt(requested_amount))
 
     except Exception as e:
         frappe.log_error(message=str(e), title="Budget Check Error")
@@ -356,6 +321,7 @@ def check_budget(expense_account, cost_center=None, project=None, requested_amou
 
 
 @frappe.whitelist()
+@instrumented
 def check_monthly_budget_simple(expense_account, cost_center=None, project=None, requested_amount=0):
     """
     Check monthly budget distribution for a specific expense account and cost center or project.
@@ -435,8 +401,7 @@ def check_monthly_budget_simple(expense_account, cost_center=None, project=None,
                 month_number = get_month_number(month_name)
                 if month_number == current_month:
                     # Calculate actual monthly budget amount
-                    monthly_percentage = flt(result.monthly_budget_amount)
-                    current_month_budget = (monthly_percentage / 100.0) * total_budget_amount
+                    current_month_budget = monthly_budget_amount(total_budget_amount, result.monthly_budget_amount)
                     break
 
         if not current_month_budget or current_month_budget <= 0:
@@ -458,17 +423,19 @@ def check_monthly_budget_simple(expense_account, cost_center=None, project=None,
                   {gl_against_condition}
             ), 0) AS monthly_actual_expenses,
             IFNULL((
-                SELECT SUM(mri.amount)
-                FROM `tabMaterial Request Item` mri
-                JOIN `tabMaterial Request` mr ON mr.name = mri.parent
-                WHERE mri.expense_account = %(expense_account)s
-                  AND mr.docstatus = 1
-                  AND mr.status NOT IN ('Cancelled', 'Stopped')
-                  AND mr.transaction_date BETWEEN %(month_start)s AND %(month_end)s
-                  {mr_against_condition}
+                -- Reservations still held by Material Request items (see wcfcb_zm.budget_reservation)
+                SELECT SUM(re.amount)
+                FROM `tabBudget Reservation Entry` re
+                JOIN `tabMaterial Request` mr ON mr.name = re.material_request
+                WHERE re.expense_account = %(expense_account)s
+                  AND re.is_cancelled = 0
+                  AND mr.status != 'Stopped'
+                  AND re.transaction_date BETWEEN %(month_start)s AND %(month_end)s
+                  {reservation_against_condition}
             ), 0) AS monthly_mr_committed,
             IFNULL((
-                SELECT SUM(poi.base_amount)
+                -- Only the part not yet billed; billed amounts are already in GL as actuals
+                SELECT SUM(GREATEST(poi.base_amount - IFNULL(poi.billed_amt, 0) * IFNULL(po.conversion_rate, 1), 0))
                 FROM `tabPurchase Order Item` poi
                 JOIN `tabPurchase Order` po ON po.name = poi.parent
                 WHERE poi.expense_account = %(expense_account)s
@@ -481,7 +448,7 @@ def check_monthly_budget_simple(expense_account, cost_center=None, project=None,
 
         if cost_center:
             monthly_expenses_query = monthly_expenses_query.replace("{gl_against_condition}", "AND gl.cost_center = %(cost_center)s")
-            monthly_expenses_query = monthly_expenses_query.replace("{mr_against_condition}", "AND mri.cost_center = %(cost_center)s")
+            monthly_expenses_query = monthly_expenses_query.replace("{reservation_against_condition}", "AND re.cost_center = %(cost_center)s")
             monthly_expenses_query = monthly_expenses_query.replace("{po_against_condition}", "AND poi.cost_center = %(cost_center)s")
             monthly_args = {
                 'expense_account': expense_account,
@@ -491,7 +458,7 @@ def check_monthly_budget_simple(expense_account, cost_center=None, project=None,
             }
         else:
             monthly_expenses_query = monthly_expenses_query.replace("{gl_against_condition}", "AND gl.project = %(project)s")
-            monthly_expenses_query = monthly_expenses_query.replace("{mr_against_condition}", "AND mri.project = %(project)s")
+            monthly_expenses_query = monthly_expenses_query.replace("{reservation_against_condition}", "AND re.project = %(project)s")
             monthly_expenses_query = monthly_expenses_query.replace("{po_against_condition}", "AND poi.project = %(project)s")
             monthly_args = {
                 'expense_account': expense_account,
@@ -506,10 +473,10 @@ def check_monthly_budget_simple(expense_account, cost_center=None, project=None,
             return {"monthly_exceeded": False, "message": None}
 
         monthly_data = monthly_result[0]
-        available_monthly_budget = (
-            current_month_budget -
-            monthly_data.monthly_actual_expenses -
-            monthly_data.monthly_mr_committed -
+        available_monthly_budget = available_amount(
+            current_month_budget,
+            monthly_data.monthly_actual_expenses,
+            monthly_data.monthly_mr_committed,
             monthly_data.monthly_po_committed
         )
 
@@ -531,7 +498,7 @@ def check_monthly_budget_simple(expense_account, cost_center=None, project=None,
                 month_name,
                 frappe.format_value(requested_amount, {"fieldtype": "Currency"}),
                 frappe.format_value(available_monthly_budget, {"fieldtype": "Currency"}),
-                frappe.format_value(requested_amount - available_monthly_budget, {"fieldtype": "Currency"})
+                frappe.format_value(shortage(requested_amount, available_monthly_budget), {"fieldtype": "Currency"})
             )
         else:
             message = None
@@ -3,14 +3,22 @@ from frappe import _
 from frappe.utils import flt
 
 # Reuse the robust budget computation from Material Request API
+from wcfcb_zm.api.budget_math import apply_budget_status
 from wcfcb_zm.api.material_request import get_budget_details
+from wcfcb_zm.api.instrumentation import instrumented
+from wcfcb_zm.budget_reservation import get_reservation_coverage
 
 
 @frappe.whitelist()
-def check_budget(expense_account, cost_center=None, project=None, requested_amount=0, transaction_date=None):
+@instrumented
+def check_budget(expense_account, cost_center=None, project=None, requested_amount=0, transaction_date=None,
+                 material_request_item=None, purchase_order=None):
     """Budget check for Purchase Orders with monthly distribution awareness.
     - Uses the same logic and double-counting prevention as Material Request
     - Returns annual + monthly (if configured) budget info and non-blocking statuses
+    - Lines from a Material Request item are covered by its reservation first; only
+      the excess goes through the budget computation, and a fully covered line
+      returns a single 'COVERED BY RESERVATION' entry without touching GL
     """
     try:
         if not expense_account:
@@ -20,38 +28,38 @@ def check_budget(expense_account, cost_center=None, project=None, requested_amou
         if cost_center and project:
             frappe.throw(_("Please specify either Cost Center OR Project, not both"))
 
+        coverage = None
+        if material_request_item:
+            coverage = get_reservation_coverage(
+                [frappe._dict(material_request_item=material_request_item, amount=requested_amount)],
+                purchase_order,
+            )[0]
+            if coverage.covered:
+                return [{
+                    'covered_by_reservation': True,
+                    'material_request_item': material_request_item,
+                    'reserved_amount': coverage.reserved_amount,
+                    'covered_amount': coverage.covered_amount,
+                    'excess_amount': 0,
+                    'within_annual_budget': True,
+                    'within_monthly_budget': True,
+                    'annual_budget_status': 'COVERED BY RESERVATION',
+                    'monthly_budget_status': 'COVERED BY RESERVATION',
+                    'overall_status': 'COVERED BY RESERVATION',
+                }]
+
         # Compute budget details (annual + monthly breakdowns if any)
         budget_data = get_budget_details(expense_account, cost_center, project, transaction_date)
 
+        if coverage:
+            for budget in budget_data:
+                budget['covered_by_reservation'] = False
+                budget['reserved_amount'] = coverage.reserved_amount
+                budget['covered_amount'] = coverage.covered_amount
+                budget['excess_amount'] = coverage.excess_amount
+
         # Add requested amount validation (warning-only semantics are handled client-side)
-        requested_amount = flt(requested_amount)
-        for budget in budget_data:
-            # Annual budget status
-            budget['within_annual_budget'] = requested_amount <= budget['available_budget']
-            budget['annual_budget_status'] = (
-                'WITHIN BUDGET' if budget['within_annual_budget'] else 'EXCEEDS BUDGET'
-            )
-
-            # Monthly budget status (if applicable)
-            if budget.get('has_monthly_distribution'):
-                monthly_available = budget.get('monthly_available_budget', 0)
-                budget['within_monthly_budget'] = requested_amount <= monthly_available
-                budget['monthly_budget_status'] = (
-                    'WITHIN MONTHLY BUDGET' if budget['within_monthly_budget'] else 'EXCEEDS MONTHLY BUDGET'
-                )
-
-                if budget['within_annual_budget'] and budget['within_monthly_budget']:
-                    budget['overall_status'] = 'WITHIN BUDGET'
-                elif not budget['within_monthly_budget']:
-                    budget['overall_status'] = 'EXCEEDS MONTHLY BUDGET'
-                else:
-                    budget['overall_status'] = 'EXCEEDS ANNUAL BUDGET'
-            else:
-                budget['within_monthly_budget'] = True
-                budget['monthly_budget_status'] = 'NO MONTHLY DISTRIBUTION'
-                budget['overall_status'] = budget['annual_budget_status']
-
-        return budget_data
+        return apply_budget_status(budget_data, flt(coverage.excess_amount if coverage else requested_amount))
 
     except Exception as e:
         frappe.log_error(message=str(e), title="PO Budget Check Error")
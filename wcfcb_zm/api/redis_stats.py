@@ -0,0 +1,86 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Timing counters kept in Redis hashes, shared by the action router and the
+endpoint instrumentation.
+
+Each hash holds, per name (an action or an endpoint), fields `name|metric`:
+a call count, the total wall time and a histogram with one counter per
+bucket of `HISTOGRAM_BUCKETS_MS`, plus any extra counters the caller adds.
+Fields are written with raw HINCRBY on a key already passed through
+`make_key`, so all workers add to the same counters. They are read back with
+the raw client as well: the cache wrapper's hgetall would prefix the key a
+second time and try to unpickle the plain numbers.
+"""
+
+import frappe
+
+# Upper bounds (ms) of the timing histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+HISTOGRAM_LABELS = tuple(f'le_{bound}' for bound in HISTOGRAM_BUCKETS_MS) + ('le_inf',)
+
+
+def get_bucket_label(elapsed_ms):
+    for bound in HISTOGRAM_BUCKETS_MS:
+        if elapsed_ms <= bound:
+            return f'le_{bound}'
+    return 'le_inf'
+
+
+def record_call(key, name, elapsed_ms, counters=None, totals=None, values=None, expire=None):
+    """Add one call of `name` to the hash at key; statistics never break the request.
+
+    `counters` and `totals` are added to integer and float fields, `values`
+    overwrite string fields. With `expire` (seconds) the whole hash expires.
+    """
+    try:
+        pipeline = frappe.cache().pipeline()
+        pipeline.hincrby(key, f'{name}|count', 1)
+        pipeline.hincrbyfloat(key, f'{name}|total_ms', elapsed_ms)
+        pipeline.hincrby(key, f'{name}|{get_bucket_label(elapsed_ms)}', 1)
+        for metric, amount in (counters or {}).items():
+            pipeline.hincrby(key, f'{name}|{metric}', amount)
+        for metric, amount in (totals or {}).items():
+            pipeline.hincrbyfloat(key, f'{name}|{metric}', amount)
+        for metric, value in (values or {}).items():
+            pipeline.hset(key, f'{name}|{metric}', value)
+        if expire:
+            pipeline.expire(key, expire)
+        pipeline.execute()
+    except Exception:
+        pass
+
+
+def read_stats(keys):
+    """Fields of the hashes at keys, one {name: {metric: value}} per key and in key order.
+
+    Values are decoded strings; histogram buckets are collected under
+    'histogram' as integers.
+    """
+    pipeline = frappe.cache().pipeline()
+    for key in keys:
+        pipeline.hgetall(key)
+
+    hashes = []
+    for raw in pipeline.execute():
+        names = {}
+        for field, value in (raw or {}).items():
+            name, metric = frappe.safe_decode(field).rsplit('|', 1)
+            metrics = names.setdefault(name, {'histogram': {}})
+            if metric in HISTOGRAM_LABELS:
+                metrics['histogram'][metric] = int(value)
+            else:
+                metrics[metric] = frappe.safe_decode(value)
+        hashes.append(names)
+    return hashes
+
+
+def full_histogram(histogram):
+    """Histogram with every bucket present, in bucket order"""
+    return {label: histogram.get(label, 0) for label in HISTOGRAM_LABELS}
+
+
+def delete_stats(keys):
+    if keys:
+        frappe.cache().delete(*keys)
@@ -0,0 +1,174 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Opt-in sampler for slow SQL issued from wcfcb_zm code.
+
+Set `wcfcb_slow_query_threshold_ms` in site config to enable it. For the rest
+of each request or background job every query then passes through the shared
+SQL listener; a query slower than the threshold whose caller is a wcfcb_zm
+module is kept with its normalized text, the shape of its parameters, its
+duration and an EXPLAIN taken on the same connection. Afterwards the samples
+are written to Budget Slow Query, one record per query fingerprint, so repeats
+only raise the counters. The log is capped at `wcfcb_slow_query_log_limit`
+records (default 500); the least recently seen are dropped first.
+"""
+
+import hashlib
+import re
+import sys
+
+import frappe
+from frappe.utils import cint, flt, now_datetime
+
+from wcfcb_zm.api.sql_listener import add_sql_listener, remove_sql_listener
+
+SLOW_QUERY_DOCTYPE = 'Budget Slow Query'
+DEFAULT_LOG_LIMIT = 500
+
+# Modules that only observe queries; their frames never count as the caller
+OBSERVER_MODULES = ('wcfcb_zm.api.sql_listener', 'wcfcb_zm.api.slow_query', 'wcfcb_zm.api.instrumentation')
+
+NORMALIZE_PATTERNS = (
+    (re.compile(r"'(?:[^'\\]|\\.)*'"), '?'),
+    (re.compile(r'"(?:[^"\\]|\\.)*"'), '?'),
+    (re.compile(r'%\(\w+\)s|%s'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def get_threshold_ms():
+    return flt(frappe.conf.get('wcfcb_slow_query_threshold_ms'))
+
+
+def get_log_limit():
+    return cint(frappe.conf.get('wcfcb_slow_query_log_limit')) or DEFAULT_LOG_LIMIT
+
+
+def before_request():
+    """Request and job hook: start sampling when a threshold is configured"""
+    if get_threshold_ms() > 0:
+        frappe.local.wcfcb_slow_queries = {}
+        add_sql_listener(sample_query)
+
+
+def after_request(response=None, request=None):
+    """Request and job hook: stop sampling and write what was caught"""
+    remove_sql_listener(sample_query)
+    samples = getattr(frappe.local, 'wcfcb_slow_queries', None)
+    frappe.local.wcfcb_slow_queries = None
+    if samples:
+        try:
+            save_samples(samples.values())
+        except Exception:
+            frappe.db.rollback()
+            frappe.log_error(title='Budget slow query log failed')
+
+
+def sample_query(query, values, elapsed_ms):
+    samples = getattr(frappe.local, 'wcfcb_slow_queries', None)
+    # The EXPLAIN below runs through the listener too
+    if samples is None or getattr(frappe.local, 'wcfcb_sampling', False) or elapsed_ms < get_threshold_ms():
+        return
+
+    caller = get_caller()
+    if not caller:
+        return
+
+    frappe.local.wcfcb_sampling = True
+    try:
+        normalized = normalize_query(query)
+        fingerprint = hashlib.md5(normalized.encode()).hexdigest()
+        sample = samples.get(fingerprint)
+        if sample:
+            sample.occurrences += 1
+            sample.max_duration_ms = max(sample.max_duration_ms, elapsed_ms)
+            sample.last_duration_ms = elapsed_ms
+            return
+
+        samples[fingerprint] = frappe._dict(
+            fingerprint=fingerprint,
+            caller=caller,
+            normalized_query=normalized,
+            params_shape=get_params_shape(values),
+            occurrences=1,
+            max_duration_ms=elapsed_ms,
+            last_duration_ms=elapsed_ms,
+            explain=explain_query(query, values),
+        )
+    finally:
+        frappe.local.wcfcb_sampling = False
+
+
+def get_caller():
+    """'module.function:line' of the innermost wcfcb_zm frame that issued the query, if any"""
+    frame = sys._getframe(1)
+    while frame:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith('wcfcb_zm.') and module not in OBSERVER_MODULES:
+            return f'{module}.{frame.f_code.co_name}:{frame.f_lineno}'
+        frame = frame.f_back
+    return None
+
+
+def normalize_query(query):
+    """Query text with literals and placeholders replaced by ?, IN lists collapsed and whitespace squeezed"""
+    query = str(query)
+    for pattern, replacement in NORMALIZE_PATTERNS:
+        query = pattern.sub(replacement, query)
+    return query.strip()
+
+
+def get_params_shape(values):
+    """Parameter names and types without their values, e.g. 'account: str, items: tuple[12]'"""
+    def shape(value):
+        if isinstance(value, (list, tuple, set)):
+            return f'{type(value).__name__}[{len(value)}]'
+        return type(value).__name__
+
+    if isinstance(values, dict):
+        return ', '.join(f'{key}: {shape(value)}' for key, value in sorted(values.items()))
+    if isinstance(values, (list, tuple)):
+        return ', '.join(shape(value) for value in values)
+    return '' if values is None else shape(values)
+
+
+def explain_query(query, values):
+    if not str(query).lstrip().lower().startswith(('select', 'with')):
+        return None
+    try:
+        return frappe.as_json(frappe.db.sql('EXPLAIN ' + query, values, as_dict=True))
+    except Exception as e:
+        return frappe.as_json({'error': str(e)})
+
+
+def save_samples(samples):
+    """Insert or update one record per fingerprint, then trim the log to its limit"""
+    now = now_datetime()
+    for sample in samples:
+        existing = frappe.db.get_value(
+            SLOW_QUERY_DOCTYPE, sample.fingerprint, ['occurrences', 'max_duration_ms'], as_dict=True
+        )
+        if existing:
+            frappe.db.set_value(SLOW_QUERY_DOCTYPE, sample.fingerprint, {
+                'caller': sample.caller,
+                'occurrences': cint(existing.occurrences) + sample.occurrences,
+                'max_duration_ms': max(flt(existing.max_duration_ms), sample.max_duration_ms),
+                'last_duration_ms': sample.last_duration_ms,
+                'last_seen': now,
+                'explain': sample.explain,
+            }, update_modified=False)
+        else:
+            frappe.get_doc(dict(sample, doctype=SLOW_QUERY_DOCTYPE, last_seen=now)).insert(ignore_permissions=True)
+
+    excess = frappe.db.count(SLOW_QUERY_DOCTYPE) - get_log_limit()
+    if excess > 0:
+        frappe.db.sql("""
+            DELETE FROM `tabBudget Slow Query`
+            ORDER BY last_seen
+            LIMIT %s
+        """, excess)
+
+    frappe.db.commit()
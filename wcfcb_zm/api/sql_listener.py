@@ -0,0 +1,77 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+One shared wrapper around `frappe.db.sql` for code that needs to observe queries.
+
+`sql_listener(callback)` is a context manager; `add_sql_listener` and
+`remove_sql_listener` do the same for listeners that span a request. While at
+least one listener is active, every query on the current connection is timed
+and handed to each listener as callback(query, values, elapsed_ms). The
+wrapper is installed on the first listener and removed with the last, so
+requests without listeners run the plain method. Listener errors are
+swallowed; observing must never break the query.
+"""
+
+import contextlib
+import time
+
+import frappe
+
+
+@contextlib.contextmanager
+def sql_listener(callback):
+    add_sql_listener(callback)
+    try:
+        yield
+    finally:
+        remove_sql_listener(callback)
+
+
+def add_sql_listener(callback):
+    """Start passing queries to callback; for listeners that span a whole request"""
+    listeners = getattr(frappe.local, 'wcfcb_sql_listeners', None)
+    if not listeners:
+        listeners = frappe.local.wcfcb_sql_listeners = []
+        install_wrapper(listeners)
+
+    listeners.append(callback)
+
+
+def remove_sql_listener(callback):
+    listeners = getattr(frappe.local, 'wcfcb_sql_listeners', None) or []
+    if callback in listeners:
+        listeners.remove(callback)
+        if not listeners:
+            remove_wrapper()
+
+
+def install_wrapper(listeners):
+    db = frappe.db
+    original = db.sql
+
+    def sql(query, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(query, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            values = args[0] if args else kwargs.get('values')
+            for listener in list(listeners):
+                try:
+                    listener(query, values, elapsed_ms)
+                except Exception:
+                    pass
+
+    # Remember whether sql was already shadowed on the instance, e.g. by the recorder
+    frappe.local.wcfcb_sql_wrapped = (db, vars(db).get('sql'))
+    db.sql = sql
+
+
+def remove_wrapper():
+    db, shadowed = frappe.local.wcfcb_sql_wrapped
+    if shadowed is None:
+        del db.sql
+    else:
+        db.sql = shadowed
+    frappe.local.wcfcb_sql_wrapped = None
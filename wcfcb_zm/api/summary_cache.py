@@ -0,0 +1,66 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Cached Budget Request summaries for the approval dialogs.
+
+A summary depends on the request itself, on the latest amendment of each
+budget it touches and on the arguments it was built with (account filters,
+page). Each request has its own Redis hash with one entry per argument set,
+stored together with a version made of the request's `modified` timestamp and
+the amendment chain heads of its budgets, so an edit or a new amendment makes
+the stored summaries stale without any explicit bookkeeping. Request and
+Budget events also clear entries so stale summaries do not linger.
+"""
+
+import hashlib
+
+import frappe
+
+from wcfcb_zm.exn.doctype.budget_amendment_chain.budget_amendment_chain import get_chain_heads
+
+SUMMARY_CACHE_KEY = 'wcfcb_virement_summary'
+
+
+def get_summary_cache_key(doc_name):
+    return f'{SUMMARY_CACHE_KEY}:{doc_name}'
+
+
+def get_args_key(args):
+    """Stable field name for an argument set"""
+    return hashlib.sha1(frappe.as_json(list(args)).encode()).hexdigest()
+
+
+def get_summary_version(doc_name, budgets):
+    """Version string of a request summary, or None when the request does not exist"""
+    modified = frappe.db.get_value('Budget Request', doc_name, 'modified')
+    if not modified:
+        return None
+
+    heads = get_chain_heads(budgets, raise_if_cancelled=False)
+    return '|'.join([str(modified)] + [f'{name}>{heads[name]}' for name in sorted(heads)])
+
+
+def get_cached_summary(doc_name, budgets, args, generator):
+    """Summary of a request from the cache, rebuilt with generator when its version has changed"""
+    version = get_summary_version(doc_name, budgets)
+    if version is None:
+        return generator()
+
+    cache = frappe.cache()
+    key, field = get_summary_cache_key(doc_name), get_args_key(args)
+    cached = cache.hget(key, field)
+    if cached and cached.get('version') == version:
+        return cached['summary']
+
+    summary = generator()
+    cache.hset(key, field, {'version': version, 'summary': summary})
+    return summary
+
+
+def clear_summary_cache(doc=None, method=None):
+    """Budget Request and Budget hook: drop the request's summaries, or all of them for a Budget"""
+    if doc is not None and doc.doctype == 'Budget Request':
+        frappe.cache().delete_value(get_summary_cache_key(doc.name))
+    else:
+        frappe.cache().delete_keys(SUMMARY_CACHE_KEY)
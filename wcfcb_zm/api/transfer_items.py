@@ -0,0 +1,135 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Paged and aggregated reads of a Budget Request's transfer items.
+
+Year-end reallocations can carry thousands of transfer items. These helpers
+read one page of rows at a time, and fold the items into net changes per
+budget account with GROUP BY in the database, so neither the server nor the
+form has to load the whole child table for a single view.
+
+FROM accounts belong to the source budget; TO accounts belong to the target
+budget for Inter-Budget requests and to the source budget otherwise, as in
+`consolidate_transfers`.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+DEFAULT_ITEM_PAGE_LENGTH = 50
+
+# Identifying fields first, then the amounts (returned as floats like the document values)
+ITEM_FIELDS = (
+    'name', 'idx', 'from_account', 'to_account', 'amount_requested',
+    'from_available', 'from_remaining', 'to_available', 'to_new_amount',
+)
+
+
+def get_transfer_item_page(doc_name, start=0, page_len=DEFAULT_ITEM_PAGE_LENGTH):
+    """One page of transfer items in row order, and the total number of items"""
+    total = frappe.db.count('Budget Request Item', {'parent': doc_name, 'parenttype': 'Budget Request'})
+    rows = frappe.db.sql("""
+        SELECT {fields}
+        FROM `tabBudget Request Item`
+        WHERE parent = %(doc_name)s AND parenttype = 'Budget Request'
+        ORDER BY idx
+        LIMIT %(start)s, %(page_len)s
+    """.format(fields=', '.join(ITEM_FIELDS)), {
+        'doc_name': doc_name,
+        'start': cint(start),
+        'page_len': cint(page_len) or DEFAULT_ITEM_PAGE_LENGTH,
+    }, as_dict=True)
+
+    for row in rows:
+        for field in ITEM_FIELDS[4:]:
+            row[field] = flt(row[field])
+
+    return rows, total
+
+
+def get_account_movements(doc_name, source_budget, target_budget=None, before_idx=None):
+    """Debits, credits and transfer count per (budget, account), aggregated in SQL.
+
+    With `before_idx`, only items above that row are counted - the opening
+    position for a page that starts at that row.
+    """
+    idx_condition = 'AND idx < %(before_idx)s' if before_idx else ''
+    rows = frappe.db.sql("""
+        SELECT 'from' AS side, from_account AS account, SUM(amount_requested) AS amount, COUNT(*) AS transfer_count
+        FROM `tabBudget Request Item`
+        WHERE parent = %(doc_name)s AND parenttype = 'Budget Request' {idx_condition}
+        GROUP BY from_account
+        UNION ALL
+        SELECT 'to' AS side, to_account AS account, SUM(amount_requested) AS amount, COUNT(*) AS transfer_count
+        FROM `tabBudget Request Item`
+        WHERE parent = %(doc_name)s AND parenttype = 'Budget Request' {idx_condition}
+        GROUP BY to_account
+    """.format(idx_condition=idx_condition), {'doc_name': doc_name, 'before_idx': cint(before_idx)}, as_dict=True)
+
+    to_budget = target_budget or source_budget
+    movements = {}
+    for row in rows:
+        key = (source_budget, row.account) if row.side == 'from' else (to_budget, row.account)
+        movement = movements.setdefault(key, frappe._dict(
+            budget=key[0], account=key[1], debited=0.0, credited=0.0, transfer_count=0
+        ))
+        if row.side == 'from':
+            movement.debited += flt(row.amount)
+        else:
+            movement.credited += flt(row.amount)
+        movement.transfer_count += cint(row.transfer_count)
+
+    for movement in movements.values():
+        movement.net_delta = movement.credited - movement.debited
+
+    return movements
+
+
+def get_net_deltas(doc_name, source_budget, target_budget=None, before_idx=None):
+    """{(budget, account): net delta} of a request's transfer items, the same shape as `consolidate_transfers`"""
+    return {
+        key: movement.net_delta
+        for key, movement in get_account_movements(doc_name, source_budget, target_budget, before_idx).items()
+    }
+
+
+def get_budget_amounts(keys):
+    """{(budget, account): budget_amount} for many budget accounts in one query"""
+    budgets = tuple({budget for budget, _ in keys if budget})
+    accounts = tuple({account for _, account in keys if account})
+    if not budgets or not accounts:
+        return {}
+
+    rows = frappe.db.sql("""
+        SELECT parent, account, budget_amount
+        FROM `tabBudget Account`
+        WHERE parent IN %(budgets)s AND account IN %(accounts)s
+    """, {'budgets': budgets, 'accounts': accounts})
+
+    return {(parent, account): flt(budget_amount) for parent, account, budget_amount in rows}
+
+
+def get_net_delta_page(doc_name, start=0, page_len=DEFAULT_ITEM_PAGE_LENGTH):
+    """Net change per budget account of a request, one page at a time, with before and after amounts"""
+    request = frappe.db.get_value(
+        'Budget Request', doc_name, ['budget', 'target_budget', 'virement_type'], as_dict=True
+    )
+    if not request:
+        frappe.throw(_('Budget Request {0} not found').format(doc_name))
+
+    target_budget = request.target_budget if request.virement_type == 'Inter-Budget' else None
+    movements = sorted(
+        get_account_movements(doc_name, request.budget, target_budget).values(),
+        key=lambda movement: (movement.budget or '', movement.account or ''),
+    )
+
+    start = cint(start)
+    page = movements[start:start + (cint(page_len) or DEFAULT_ITEM_PAGE_LENGTH)]
+    amounts = get_budget_amounts([(movement.budget, movement.account) for movement in page])
+    for movement in page:
+        movement.before = amounts.get((movement.budget, movement.account), 0.0)
+        movement.after = movement.before + movement.net_delta
+
+    return page, len(movements)
@@ -0,0 +1,72 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Per-approval store of the documents a virement works on.
+
+An approval reads the Budget Request, then the source and target Budgets and
+their accounts, from several helper functions. A VirementContext is created
+once per approval and passed down the pipeline, so each document is read from
+the database once however many steps need it. Reads are counted in `loads`.
+
+Inside an action batch the context keeps its documents in the batch cache,
+under the keys of the `shared_cache` loaders below, so batch actions and the
+context share one copy of each document instead of caching it twice.
+"""
+
+from collections import Counter
+
+import frappe
+
+from wcfcb_zm.api.action_router import get_shared_cache_key, in_batch, shared_cache
+
+
+@shared_cache
+def load_budget_request(doc_name):
+    """Budget Request document, loaded once per batch request"""
+    return frappe.get_doc('Budget Request', doc_name)
+
+
+@shared_cache
+def load_budget(budget_name):
+    """Budget row as a dict (any docstatus, so cancelled budgets and draft chain heads qualify), or None"""
+    rows = frappe.db.sql("""
+        SELECT * FROM `tabBudget`
+        WHERE name = %s AND docstatus IN (0, 1, 2)
+    """, (budget_name,), as_dict=True)
+    return rows[0] if rows else None
+
+
+@shared_cache
+def load_budget_accounts(budget_name):
+    """account and budget_amount of every Budget Account row of a budget"""
+    return frappe.db.sql("""
+        SELECT account, budget_amount FROM `tabBudget Account` WHERE parent = %s
+    """, (budget_name,), as_dict=True)
+
+
+class VirementContext:
+    """Budget Requests, Budgets and Budget Account rows loaded for one approval"""
+
+    def __init__(self):
+        self.cache = frappe.local.action_batch_cache if in_batch() else {}
+        self.loads = Counter()
+
+    def load(self, doctype, loader, name):
+        key = get_shared_cache_key(loader, (name,))
+        if key not in self.cache:
+            self.loads[doctype] += 1
+            self.cache[key] = loader.__wrapped__(name)
+        return self.cache[key]
+
+    def get_budget_request(self, doc_name):
+        return self.load('Budget Request', load_budget_request, doc_name)
+
+    def get_budget(self, budget_name):
+        return self.load('Budget', load_budget, budget_name)
+
+    def get_budget_accounts(self, budget_name):
+        return self.load('Budget Account', load_budget_accounts, budget_name)
+
+    def is_multi_transfer(self, doc_name):
+        return len(self.get_budget_request(doc_name).transfer_items) > 0
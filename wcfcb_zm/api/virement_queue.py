@@ -0,0 +1,108 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Concurrency control for budget virement approvals.
+
+Every approval takes a MariaDB advisory lock per budget it amends before reading
+`tabBudget Account`. Approvals that touch the same budget therefore run one after
+the other, while approvals on unrelated budgets take different locks and proceed
+in parallel. Queued approvals run as background jobs and rely on the same locks.
+
+A lock alone does not make reads current: under REPEATABLE READ the transaction
+keeps the snapshot of its first read, so an approval commits and starts a new
+transaction once it holds its locks. Approvals therefore always commit and
+never run inside an action batch.
+"""
+
+import hashlib
+from contextlib import contextmanager
+
+import frappe
+from frappe import _
+
+# Seconds an approval waits for another approval on the same budget to finish
+LOCK_TIMEOUT = 120
+
+
+def get_budget_lock_name(budget_name):
+    """Advisory lock name for a budget (GET_LOCK names are limited to 64 characters)"""
+    digest = hashlib.sha1(f"{frappe.local.site}:{budget_name}".encode()).hexdigest()
+    return "wcfcb_budget_" + digest[:40]
+
+
+@contextmanager
+def budget_locks(budget_names, timeout=LOCK_TIMEOUT):
+    """Hold an advisory lock on every budget for the duration of the block.
+
+    Locks are taken in sorted order so two approvals touching the same pair of
+    budgets can never deadlock, and are always released on exit.
+    """
+    acquired = []
+    try:
+        for budget_name in sorted({name for name in budget_names if name}):
+            lock_name = get_budget_lock_name(budget_name)
+            got_lock = frappe.db.sql("SELECT GET_LOCK(%s, %s)", (lock_name, timeout))[0][0]
+            if got_lock != 1:
+                frappe.throw(
+                    _("Budget {0} is being amended by another approval. Please try again shortly.").format(budget_name),
+                    title=_("Budget Locked"),
+                )
+            acquired.append(lock_name)
+
+        yield
+
+    finally:
+        for lock_name in reversed(acquired):
+            frappe.db.sql("SELECT RELEASE_LOCK(%s)", (lock_name,))
+
+
+def enqueue_approval_with_amendment(doc_name, virement_type, budget, target_budget=None, **kwargs):
+    """Queue the amendment of an approved Budget Request as a background job.
+
+    Jobs for the same Budget Request are deduplicated; jobs that amend the same
+    budget serialize on the budget locks inside process_approval_with_amendment.
+    """
+    job_id = f"budget_virement::{doc_name}"
+    frappe.enqueue(
+        "wcfcb_zm.api.virement_queue.run_queued_approval",
+        queue="long",
+        job_id=job_id,
+        deduplicate=True,
+        doc_name=doc_name,
+        virement_type=virement_type,
+        budget=budget,
+        target_budget=target_budget,
+        expense_account=kwargs.get('expense_account'),
+        to_expense_account=kwargs.get('to_expense_account'),
+        amount_requested=kwargs.get('amount_requested'),
+        user=frappe.session.user,
+    )
+
+    return {
+        'success': True,
+        'queued': True,
+        'job_id': job_id,
+        'message': 'Budget amendment queued. You will be notified when it completes.'
+    }
+
+
+def run_queued_approval(doc_name, virement_type, budget, target_budget=None, expense_account=None,
+                        to_expense_account=None, amount_requested=None, user=None):
+    """Background job: run the amendment pipeline and notify the approver"""
+    from wcfcb_zm.api.budget_request import process_approval_with_amendment
+
+    result = process_approval_with_amendment(
+        doc_name, virement_type, budget, target_budget,
+        expense_account, to_expense_account, amount_requested
+    )
+
+    frappe.publish_realtime(
+        "budget_virement_processed",
+        dict(result, doc_name=doc_name),
+        user=user or frappe.session.user,
+        doctype="Budget Request",
+        docname=doc_name,
+    )
+
+    return result
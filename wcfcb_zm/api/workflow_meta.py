@@ -0,0 +1,62 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Cached workflow metadata for the Budget Request external-approval checks.
+
+The states of the active workflow and the external approval threshold are
+loaded once into Redis and shared by all workers; saving or deleting a Workflow
+clears the entry. The threshold comes from site config
+(`budget_external_approval_threshold`) and defaults to 250,000.
+
+With the metadata in hand, `requires_external_approval` is a pure comparison,
+and the form receives the same metadata once so it can check amounts on every
+keystroke without a server call.
+"""
+
+import frappe
+from frappe.utils import flt
+
+EXTERNAL_APPROVAL_STATE = 'External Approval'
+DEFAULT_EXTERNAL_APPROVAL_THRESHOLD = 250000
+
+WORKFLOW_META_CACHE_KEY = 'wcfcb_workflow_meta'
+
+
+def get_workflow_meta(doctype='Budget Request'):
+    """States of the doctype's active workflow plus the external approval threshold"""
+    return frappe.cache().hget(
+        WORKFLOW_META_CACHE_KEY, doctype, generator=lambda: load_workflow_meta(doctype)
+    )
+
+
+def load_workflow_meta(doctype):
+    workflow = frappe.db.get_value('Workflow', {'document_type': doctype, 'is_active': 1}, 'name')
+    states = frappe.get_all(
+        'Workflow Document State',
+        filters={'parent': workflow, 'parenttype': 'Workflow'},
+        pluck='state',
+        order_by='idx',
+    ) if workflow else []
+
+    return {
+        'workflow': workflow,
+        'states': states,
+        'external_approval_state': EXTERNAL_APPROVAL_STATE,
+        'has_external_approval_state': EXTERNAL_APPROVAL_STATE in states,
+        'external_approval_threshold': get_external_approval_threshold(),
+    }
+
+
+def get_external_approval_threshold():
+    return flt(frappe.conf.get('budget_external_approval_threshold') or DEFAULT_EXTERNAL_APPROVAL_THRESHOLD)
+
+
+def requires_external_approval(amount, threshold):
+    """Whether a transfer amount exceeds the external approval threshold"""
+    return abs(flt(amount)) > flt(threshold)
+
+
+def clear_workflow_meta(doc=None, method=None):
+    """Workflow on_update/on_trash hook: drop the cached metadata for every doctype"""
+    frappe.cache().delete_value(WORKFLOW_META_CACHE_KEY)
@@ -3,17 +3,19 @@
 
 import frappe
 
+from wcfcb_zm.api.workflow_meta import get_workflow_meta, requires_external_approval
+
 
 @frappe.whitelist(allow_guest=False)
 def budget_virement_handler(action, **kwargs):
     """Main API function for all budget virement operations"""
     if action == 'validate_amount_approval':
         amount = kwargs.get('amount', 0)
-        # Simple validation - amounts > 250000 require external approval
-        requires_external = amount > 250000
+        # Amounts above the configured threshold require external approval
+        threshold = get_workflow_meta()['external_approval_threshold']
         return {
-            "requires_external_approval": requires_external,
-            "threshold": 250000,
+            "requires_external_approval": requires_external_approval(amount, threshold),
+            "threshold": threshold,
             "amount": amount
         }
     else:
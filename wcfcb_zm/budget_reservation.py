@@ -0,0 +1,448 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+"""
+Budget reservations of Material Requests, kept in the Budget Reservation Entry ledger.
+
+    Material Request submitted   -> +amount per item (the item reserves budget)
+    Purchase Order submitted     -> -remaining reservation of every MR item it takes over
+    Purchase Order cancelled     -> its entries are cancelled, the MR items reserve again
+    Material Request cancelled   -> all entries of the request are cancelled
+
+The Material Request commitment of an account is therefore the sum of its
+uncancelled ledger entries, read through an index, instead of an anti-join
+against Purchase Order Items on every budget check. As in `get_budget_details`,
+a Material Request item stops counting as soon as a Purchase Order takes it
+over; the Purchase Order then carries the commitment.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+LEDGER_DOCTYPE = 'Budget Reservation Entry'
+
+STATUS_RESERVED_FROM_MR = 'Reserved from MR'
+STATUS_TRANSFERRED_FROM_MR = 'Transferred from MR'
+STATUS_RESERVED_INDEPENDENTLY = 'Reserved Independently'
+
+# Purchase Orders in these states no longer hold Material Request items
+CLOSED_PO_STATUSES = ('Completed', 'Cancelled', 'Closed')
+
+
+class BudgetReservationManager:
+    """Entry points used by the Material Request and Purchase Order hooks"""
+
+    @staticmethod
+    def auto_link_po_to_mr(po):
+        """Record on the Purchase Order which Material Request its items come from.
+
+        A draft without any Material Request links is first matched to open
+        Material Request items (see `link_material_request_items`), unless
+        `custom_skip_mr_auto_link` is set; the user is told which lines were
+        linked. Then sets the linked Material Request and the amount that request
+        put on the linked items. Never raises: a Purchase Order that cannot be
+        linked is simply left as independent.
+        """
+        try:
+            if not po.get('docstatus') and not po.get('custom_skip_mr_auto_link'):
+                linked = link_material_request_items(po)
+                if linked:
+                    frappe.msgprint(
+                        _("Linked to open Material Requests: {0}. Tick 'Do Not Link Material Requests Automatically' to keep these lines independent.").format(
+                            ", ".join(_("row {0} ({1}) to {2}").format(row.idx, row.item_code, row.material_request) for row in linked)
+                        ),
+                        alert=True,
+                    )
+
+            linked_rows = [row for row in po.get('items') or [] if row.get('material_request_item')]
+            if not linked_rows:
+                if po.get('items'):
+                    po.custom_budget_reservation_status = STATUS_RESERVED_INDEPENDENTLY
+                return
+
+            if not po.get('custom_budget_transferred_from_mr'):
+                po.custom_linked_material_request = linked_rows[0].material_request
+                po.custom_budget_reservation_status = STATUS_RESERVED_FROM_MR
+                po.custom_original_mr_budget_amount = flt(frappe.db.sql("""
+                    SELECT SUM(amount) FROM `tabMaterial Request Item` WHERE name IN %(items)s
+                """, {'items': tuple({row.material_request_item for row in linked_rows})})[0][0])
+
+        except Exception as e:
+            frappe.log_error(f"Error linking Purchase Order to Material Request: {str(e)}")
+
+    @staticmethod
+    def transfer_budget_from_mr_to_po(po):
+        """Move the reservation of every linked Material Request item onto the Purchase Order.
+
+        Items whose reservation was already taken over by another Purchase Order
+        are skipped, so calling this twice, or for a second order against the same
+        request, is harmless.
+        """
+        linked_rows = [row for row in po.get('items') or [] if row.get('material_request_item')]
+        if not linked_rows:
+            return
+
+        insert_ledger_entries(make_consumption_entries(po.doctype, po.name, linked_rows))
+
+        set_values(po, {
+            'custom_linked_material_request': po.get('custom_linked_material_request') or linked_rows[0].material_request,
+            'custom_budget_transferred_from_mr': 1,
+            'custom_budget_reservation_status': STATUS_TRANSFERRED_FROM_MR,
+        })
+        update_material_request_status({row.material_request for row in linked_rows if row.material_request}, po.name)
+
+    @staticmethod
+    def should_skip_budget_validation(po):
+        """Whether the Purchase Order's budget was already checked through its Material Request.
+
+        True once the reservation has been transferred, or when every line comes
+        from a Material Request item whose reservation covers the line amount.
+        """
+        try:
+            if po.get('custom_linked_material_request') and po.get('custom_budget_transferred_from_mr'):
+                return True
+
+            rows = po.get('items') or []
+            if not rows or not all(row.get('material_request_item') for row in rows):
+                return False
+
+            coverage = get_reservation_coverage(rows, po.get('name'))
+            return all(line.covered for line in coverage)
+        except Exception:
+            return False
+
+    @staticmethod
+    def validate_mr_budget_status(mr_name):
+        """Reservation state of a Material Request"""
+        if not mr_name or not frappe.db.exists('Material Request', mr_name):
+            return {
+                'valid': False,
+                'message': _('Material Request {0} not found').format(mr_name)
+            }
+
+        mr = frappe.db.get_value(
+            'Material Request', mr_name,
+            ['docstatus', 'status', 'custom_budget_reservation_cleared', 'custom_linked_purchase_orders'],
+            as_dict=True,
+        )
+        total_amount = flt(frappe.db.sql("""
+            SELECT SUM(amount) FROM `tabMaterial Request Item` WHERE parent = %s
+        """, mr_name)[0][0])
+        reserved_amount = flt(frappe.db.sql("""
+            SELECT SUM(amount) FROM `tabBudget Reservation Entry`
+            WHERE material_request = %s AND is_cancelled = 0
+        """, mr_name)[0][0])
+
+        return {
+            'valid': True,
+            'docstatus': mr.docstatus,
+            'status': mr.status,
+            'total_amount': total_amount,
+            'reserved_amount': reserved_amount,
+            'budget_cleared': bool(mr.custom_budget_reservation_cleared),
+            'linked_purchase_orders': split_names(mr.custom_linked_purchase_orders),
+        }
+
+
+def get_reservations(material_request_items):
+    """{material_request_item: reservation} with the remaining amount and the
+    account, dimensions and date the item reserved under, in one query"""
+    material_request_items = tuple({name for name in material_request_items if name})
+    if not material_request_items:
+        return {}
+
+    rows = frappe.db.sql("""
+        SELECT
+            material_request_item,
+            MAX(material_request) AS material_request,
+            MAX(company) AS company,
+            MAX(expense_account) AS expense_account,
+            MAX(cost_center) AS cost_center,
+            MAX(project) AS project,
+            MAX(transaction_date) AS transaction_date,
+            SUM(amount) AS amount
+        FROM `tabBudget Reservation Entry`
+        WHERE material_request_item IN %(items)s AND is_cancelled = 0
+        GROUP BY material_request_item
+    """, {'items': material_request_items}, as_dict=True)
+
+    for row in rows:
+        row.amount = flt(row.amount)
+    return {row.material_request_item: row for row in rows}
+
+
+def link_material_request_items(po):
+    """Point the lines of a Purchase Order without Material Request links at open Material Request items.
+
+    A Purchase Order that already has a linked line was linked by hand and is
+    left alone. A line matches an item of a submitted, unstopped Purchase request
+    of the same company with the same item code, expense account, cost center
+    and project that is not fully ordered yet. Candidates for all lines come from
+    one query on the indexed item code; the oldest request wins and each Material
+    Request item is used by at most one line. Returns the lines linked.
+    """
+    rows = po.get('items') or []
+    if any(row.get('material_request_item') for row in rows):
+        return []
+
+    unlinked = [row for row in rows if row.get('item_code')]
+    if not unlinked:
+        return []
+
+    candidates = frappe.db.sql("""
+        SELECT
+            mri.name, mri.parent, mri.item_code,
+            IFNULL(mri.expense_account, '') AS expense_account,
+            IFNULL(mri.cost_center, '') AS cost_center,
+            IFNULL(mri.project, '') AS project
+        FROM `tabMaterial Request Item` mri
+        JOIN `tabMaterial Request` mr ON mr.name = mri.parent
+        WHERE mri.item_code IN %(item_codes)s
+          AND mr.docstatus = 1
+          AND mr.company = %(company)s
+          AND mr.material_request_type = 'Purchase'
+          AND mr.status NOT IN ('Stopped', 'Cancelled')
+          AND mri.ordered_qty < mri.qty
+        ORDER BY mr.transaction_date, mr.creation, mri.idx
+    """, {'item_codes': tuple({row.item_code for row in unlinked}), 'company': po.get('company')}, as_dict=True)
+
+    by_key = {}
+    for item in candidates:
+        key = (item.item_code, item.expense_account, item.cost_center, item.project)
+        by_key.setdefault(key, []).append(item)
+
+    linked = []
+    for row in unlinked:
+        key = (row.item_code, row.get('expense_account') or '', row.get('cost_center') or '', row.get('project') or '')
+        matches = by_key.get(key)
+        if matches:
+            item = matches.pop(0)
+            row.material_request = item.parent
+            row.material_request_item = item.name
+            linked.append(row)
+
+    return linked
+
+
+def get_reserved_for(material_request_items, purchase_order=None):
+    """{material_request_item: amount} a Purchase Order can draw on: what the item
+    still reserves plus what `purchase_order` itself already took over"""
+    material_request_items = tuple({name for name in material_request_items if name})
+    if not material_request_items:
+        return {}
+
+    return {
+        item: flt(amount)
+        for item, amount in frappe.db.sql("""
+            SELECT
+                material_request_item,
+                SUM(IF(voucher_type = 'Purchase Order' AND voucher_no = %(po)s, 0, amount))
+            FROM `tabBudget Reservation Entry`
+            WHERE material_request_item IN %(items)s AND is_cancelled = 0
+            GROUP BY material_request_item
+        """, {'items': material_request_items, 'po': purchase_order or ''})
+    }
+
+
+def get_reservation_coverage(rows, purchase_order=None):
+    """Coverage of each Purchase Order line by its Material Request item's reservation, in row order.
+
+    Lines drawing on the same MR item share its reservation. Each coverage has
+    reserved_amount, covered_amount, excess_amount and covered.
+    """
+    available = get_reserved_for((row.get('material_request_item') for row in rows), purchase_order)
+
+    coverage = []
+    for row in rows:
+        amount = flt(row.get('base_amount') or row.get('amount'))
+        reserved = available.get(row.get('material_request_item'), 0.0)
+        covered = min(amount, max(reserved, 0.0))
+        if row.get('material_request_item') in available:
+            available[row.material_request_item] = reserved - covered
+
+        coverage.append(frappe._dict({
+            'material_request_item': row.get('material_request_item'),
+            'reserved_amount': reserved,
+            'covered_amount': covered,
+            'excess_amount': amount - covered,
+            'covered': bool(row.get('material_request_item')) and amount <= covered,
+        }))
+
+    return coverage
+
+
+def make_ledger_entry(reservation, voucher_type, voucher_no, voucher_detail_no, amount):
+    """Ledger row values; every entry of an MR item shares the item's account, dimensions and date"""
+    return (
+        frappe.generate_hash(length=10), reservation.material_request, reservation.material_request_item,
+        voucher_type, voucher_no, voucher_detail_no,
+        reservation.company, reservation.expense_account, reservation.cost_center, reservation.project,
+        reservation.transaction_date, flt(amount), 0,
+    )
+
+
+def make_consumption_entries(voucher_type, voucher_no, rows):
+    """Entries taking over the remaining reservation of each MR item the rows point at, once per item"""
+    reservations = get_reservations(row.material_request_item for row in rows)
+    entries = []
+    for row in rows:
+        reservation = reservations.pop(row.material_request_item, None)
+        if reservation and reservation.amount > 0:
+            entries.append(make_ledger_entry(reservation, voucher_type, voucher_no, row.name, -reservation.amount))
+    return entries
+
+
+LEDGER_FIELDS = (
+    'name', 'material_request', 'material_request_item',
+    'voucher_type', 'voucher_no', 'voucher_detail_no',
+    'company', 'expense_account', 'cost_center', 'project',
+    'transaction_date', 'amount', 'is_cancelled',
+)
+
+
+def insert_ledger_entries(entries):
+    """Write ledger rows in one statement; they carry no child rows or hooks"""
+    if not entries:
+        return
+
+    now = frappe.utils.now()
+    user = frappe.session.user
+    frappe.db.bulk_insert(
+        LEDGER_DOCTYPE,
+        LEDGER_FIELDS + ('creation', 'modified', 'owner', 'modified_by'),
+        [entry + (now, now, user, user) for entry in entries],
+    )
+
+
+def cancel_ledger_entries(**filters):
+    frappe.db.set_value(LEDGER_DOCTYPE, filters, 'is_cancelled', 1, update_modified=False)
+
+
+def reserve_material_request(mr):
+    """Post a reservation for every costed item of a submitted Material Request"""
+    insert_ledger_entries([
+        make_ledger_entry(
+            frappe._dict(
+                material_request=mr.name, material_request_item=row.name, company=mr.company,
+                expense_account=row.expense_account, cost_center=row.get('cost_center'),
+                project=row.get('project'), transaction_date=mr.transaction_date,
+            ),
+            mr.doctype, mr.name, row.name, row.amount,
+        )
+        for row in mr.get('items') or []
+        if row.get('expense_account') and flt(row.amount)
+    ])
+
+
+def release_purchase_order(po):
+    """Cancel a Purchase Order's consumption; MR items still held by another open PO move to that PO"""
+    consumed_items = frappe.get_all(
+        LEDGER_DOCTYPE,
+        filters={'voucher_type': po.doctype, 'voucher_no': po.name, 'is_cancelled': 0},
+        pluck='material_request_item',
+    )
+    cancel_ledger_entries(voucher_type=po.doctype, voucher_no=po.name)
+    if not consumed_items:
+        return
+
+    holders = frappe.db.sql("""
+        SELECT poi.parent, poi.name, poi.material_request_item
+        FROM `tabPurchase Order Item` poi
+        JOIN `tabPurchase Order` po ON po.name = poi.parent
+        WHERE poi.material_request_item IN %(items)s
+          AND po.name != %(po)s
+          AND po.docstatus = 1
+          AND po.status NOT IN %(closed)s
+        ORDER BY po.creation
+    """, {'items': tuple(consumed_items), 'po': po.name, 'closed': CLOSED_PO_STATUSES}, as_dict=True)
+
+    entries = []
+    for parent in dict.fromkeys(row.parent for row in holders):
+        rows = [row for row in holders if row.parent == parent]
+        entries += make_consumption_entries(po.doctype, parent, rows)
+        # Items taken over by this order are no longer available to later ones
+        consumed = {row.material_request_item for row in rows}
+        holders = [row for row in holders if row.material_request_item not in consumed]
+    insert_ledger_entries(entries)
+
+
+def update_material_request_status(material_requests, po_name):
+    """Record the Purchase Order on its Material Requests and flag fully consumed reservations"""
+    for mr_name in material_requests:
+        linked = split_names(frappe.db.get_value('Material Request', mr_name, 'custom_linked_purchase_orders'))
+        if po_name not in linked:
+            linked.append(po_name)
+
+        remaining = flt(frappe.db.sql("""
+            SELECT SUM(amount) FROM `tabBudget Reservation Entry`
+            WHERE material_request = %s AND is_cancelled = 0
+        """, mr_name)[0][0])
+
+        frappe.db.set_value('Material Request', mr_name, {
+            'custom_linked_purchase_orders': '\n'.join(linked),
+            'custom_budget_reservation_cleared': 1 if remaining <= 0 else 0,
+        }, update_modified=False)
+
+
+def set_values(doc, values):
+    """Set fields on the document and, when it is already saved, in the database"""
+    doc.update(values)
+    if not doc.is_new():
+        frappe.db.set_value(doc.doctype, doc.name, values, update_modified=False)
+
+
+def split_names(value):
+    return [name.strip() for name in (value or '').replace(',', '\n').split('\n') if name.strip()]
+
+
+# doc_events hooks
+
+def on_material_request_submit(doc, method=None):
+    reserve_material_request(doc)
+
+
+def on_material_request_cancel(doc, method=None):
+    cancel_ledger_entries(material_request=doc.name)
+
+
+def on_purchase_order_validate(doc, method=None):
+    BudgetReservationManager.auto_link_po_to_mr(doc)
+
+
+def on_purchase_order_submit(doc, method=None):
+    BudgetReservationManager.transfer_budget_from_mr_to_po(doc)
+
+
+def on_purchase_order_cancel(doc, method=None):
+    release_purchase_order(doc)
+    if doc.get('custom_budget_transferred_from_mr'):
+        set_values(doc, {
+            'custom_budget_transferred_from_mr': 0,
+            'custom_budget_reservation_status': STATUS_RESERVED_FROM_MR,
+        })
+
+
+@frappe.whitelist()
+def check_po_mr_linkage(po_name):
+    """Reservation link of a Purchase Order to its Material Request"""
+    frappe.has_permission('Purchase Order', doc=po_name, throw=True)
+    po = frappe.db.get_value(
+        'Purchase Order', po_name,
+        ['custom_linked_material_request', 'custom_budget_reservation_status',
+         'custom_original_mr_budget_amount', 'custom_budget_transferred_from_mr'],
+        as_dict=True,
+    )
+    if not po:
+        return {
+            'valid': False,
+            'message': _('Purchase Order {0} not found').format(po_name)
+        }
+
+    return {
+        'valid': True,
+        'linked_mr': po.custom_linked_material_request,
+        'budget_status': po.custom_budget_reservation_status,
+        'original_mr_budget_amount': flt(po.custom_original_mr_budget_amount),
+        'budget_transferred': bool(po.custom_budget_transferred_from_mr),
+    }
@@ -0,0 +1,183 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+
+class BudgetAmendmentChain(Document):
+	"""One row per Budget recording its root budget, version and whether it is the chain head"""
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Budget Amendment Chain", ["root_budget", "is_head"])
+	frappe.db.add_index("Budget Amendment Chain", ["root_budget", "version"])
+
+
+def on_budget_insert(doc, method=None):
+	"""doc_events hook: every new Budget becomes the head of its amendment chain"""
+	register_budget(doc.name, doc.amended_from)
+
+
+def on_budget_cancel(doc, method=None):
+	"""doc_events hook: keep the cancelled flag of the chain entry in sync"""
+	mark_cancelled(doc.name)
+
+
+def on_budget_trash(doc, method=None):
+	"""doc_events hook: drop the chain entry and hand the head back to the previous version"""
+	entry = frappe.db.get_value(
+		"Budget Amendment Chain", doc.name, ["root_budget", "is_head"], as_dict=True
+	)
+	if not entry:
+		return
+
+	frappe.db.delete("Budget Amendment Chain", {"name": doc.name})
+
+	if entry.is_head:
+		frappe.db.sql(
+			"""
+			UPDATE `tabBudget Amendment Chain`
+			SET is_head = 1
+			WHERE root_budget = %(root)s
+			ORDER BY version DESC
+			LIMIT 1
+			""",
+			{"root": entry.root_budget},
+		)
+
+
+def register_budget(budget_name, amended_from=None):
+	"""Add a Budget to its amendment chain and make it the chain head"""
+	if frappe.db.exists("Budget Amendment Chain", budget_name):
+		return
+
+	root_budget = None
+	if amended_from:
+		ensure_registered(amended_from)
+		root_budget = frappe.db.get_value("Budget Amendment Chain", amended_from, "root_budget")
+
+	if root_budget:
+		last_version = frappe.db.sql(
+			"""
+			SELECT MAX(version) FROM `tabBudget Amendment Chain`
+			WHERE root_budget = %s
+			""",
+			(root_budget,),
+		)[0][0]
+		version = (last_version or 0) + 1
+	else:
+		root_budget = budget_name
+		version = 0
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabBudget Amendment Chain`
+		SET is_head = 0
+		WHERE root_budget = %s AND is_head = 1
+		""",
+		(root_budget,),
+	)
+
+	frappe.get_doc({
+		"doctype": "Budget Amendment Chain",
+		"budget": budget_name,
+		"root_budget": root_budget,
+		"amended_from": amended_from,
+		"version": version,
+		"is_head": 1,
+		"is_cancelled": 1 if frappe.db.get_value("Budget", budget_name, "docstatus") == 2 else 0,
+	}).insert(ignore_permissions=True)
+
+
+def ensure_registered(budget_name):
+	"""Register a Budget (and its ancestors) that predates the chain table"""
+	if not budget_name or frappe.db.exists("Budget Amendment Chain", budget_name):
+		return
+
+	amended_from = frappe.db.get_value("Budget", budget_name, "amended_from")
+	if amended_from is None and not frappe.db.exists("Budget", budget_name):
+		return
+
+	register_budget(budget_name, amended_from)
+
+
+def mark_cancelled(budget_name):
+	"""Flag a chain entry as cancelled (used for hook-less cancels such as db.set_value)"""
+	ensure_registered(budget_name)
+	frappe.db.set_value("Budget Amendment Chain", budget_name, "is_cancelled", 1, update_modified=False)
+
+
+def get_chain_head(budget_name, raise_if_cancelled=True):
+	"""Return the latest version of the chain budget_name belongs to that is not cancelled.
+
+	See get_chain_heads; read-only, a Budget missing from the chain table is its own head.
+	"""
+	if not budget_name:
+		return None
+
+	return get_chain_heads([budget_name], raise_if_cancelled)[budget_name]
+
+
+def get_chain_heads(budget_names, raise_if_cancelled=True):
+	"""Return {budget: head} for many budgets in one lookup.
+
+	The head is the chain head, or the newest version that is not cancelled when
+	the head is. When every version of a chain is cancelled there is nothing to
+	amend: raises, or with raise_if_cancelled=False (for read-only callers)
+	returns the budget itself. Budgets are only registered by the doc_events
+	hooks and the backfill patch; one missing from the chain table is its own head.
+	"""
+	budget_names = tuple({name for name in budget_names if name})
+	if not budget_names:
+		return {}
+
+	rows = frappe.db.sql(
+		"""
+		SELECT c.budget, h.budget AS head
+		FROM `tabBudget Amendment Chain` c
+		LEFT JOIN `tabBudget Amendment Chain` h
+			ON h.root_budget = c.root_budget AND h.is_cancelled = 0
+		WHERE c.name IN %(names)s
+		ORDER BY h.is_head DESC, h.version DESC
+		""",
+		{"names": budget_names},
+		as_dict=True,
+	)
+	heads = {}
+	for row in rows:
+		heads.setdefault(row.budget, row.head)
+
+	cancelled = sorted(name for name, head in heads.items() if not head)
+	if cancelled and raise_if_cancelled:
+		frappe.throw(
+			_("Every version of Budget {0} is cancelled, so there is no budget to amend.").format(", ".join(cancelled)),
+			title=_("Budget Cancelled"),
+		)
+
+	return {name: heads.get(name) or name for name in budget_names}
+
+
+def get_chain_history(budget_name, newer_only=False):
+	"""Return the versions in the chain of budget_name, oldest first.
+
+	With newer_only, only the amendments made after budget_name are returned.
+	Read-only: a Budget missing from the chain table has no history.
+	"""
+	if not budget_name:
+		return []
+
+	return frappe.db.sql(
+		"""
+		SELECT h.budget, h.amended_from, h.version, h.is_head, h.is_cancelled
+		FROM `tabBudget Amendment Chain` c
+		INNER JOIN `tabBudget Amendment Chain` h ON h.root_budget = c.root_budget
+		WHERE c.name = %(budget)s
+			{newer_condition}
+		ORDER BY h.version
+		""".format(newer_condition="AND h.version > c.version" if newer_only else ""),
+		{"budget": budget_name},
+		as_dict=True,
+	)
@@ -4,9 +4,36 @@
 import frappe
 from frappe.model.document import Document
 
+from wcfcb_zm.api.budget_balance import check_transfer_sufficiency
+
+# Once decided, the balances recorded on the transfer items are kept as they were
+FINAL_WORKFLOW_STATES = ('Approved', 'Rejected')
+
 
 class BudgetRequest(Document):
     """Budget Request DocType Controller"""
-    pass
 
+    def validate(self):
+        self.set_transfer_item_balances()
+
+    def set_transfer_item_balances(self):
+        """Fill from_available, to_available, from_remaining and to_new_amount of all transfer items.
+
+        Availability is loaded once per budget, and rows are applied in order so
+        each row starts from what the rows above it left behind.
+        """
+        if self.docstatus != 0 or self.get('workflow_state') in FINAL_WORKFLOW_STATES:
+            return
+
+        target_budget = self.target_budget if self.virement_type == 'Inter-Budget' else None
+        if not self.transfer_items or not self.budget or (self.virement_type == 'Inter-Budget' and not target_budget):
+            return
 
+        rows = check_transfer_sufficiency(
+            [item.as_dict() for item in self.transfer_items], self.budget, target_budget
+        )
+        for item, row in zip(self.transfer_items, rows):
+            item.from_available = row.from_available
+            item.to_available = row.to_available
+            item.from_remaining = row.from_remaining
+            item.to_new_amount = row.to_new_amount
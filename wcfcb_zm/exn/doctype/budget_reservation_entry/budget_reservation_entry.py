@@ -0,0 +1,23 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class BudgetReservationEntry(Document):
+	"""One movement of a Material Request item's budget reservation.
+
+	A submitted Material Request posts a positive entry per item; a Purchase Order
+	that takes the item over posts a negative entry against the same item. The
+	reserved amount of an account is the sum of its uncancelled entries.
+	"""
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Budget Reservation Entry", ["expense_account", "cost_center", "is_cancelled", "transaction_date"])
+	frappe.db.add_index("Budget Reservation Entry", ["expense_account", "project", "is_cancelled", "transaction_date"])
+	frappe.db.add_index("Budget Reservation Entry", ["material_request", "is_cancelled"])
+	frappe.db.add_index("Budget Reservation Entry", ["material_request_item"])
+	frappe.db.add_index("Budget Reservation Entry", ["voucher_type", "voucher_no"])
@@ -0,0 +1,14 @@
+# Copyright (c) 2024, elius mgani and contributors
+# For license information, please see license.txt
+
+# import frappe
+from frappe.model.document import Document
+
+
+class BudgetSlowQuery(Document):
+	"""A slow SQL statement issued from wcfcb_zm code, one record per query fingerprint.
+
+	Written by `wcfcb_zm.api.slow_query`; repeated occurrences update the counters
+	and the latest EXPLAIN of the existing record.
+	"""
+	pass
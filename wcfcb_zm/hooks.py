@@ -1,5 +1,3 @@
-import frappe
-
 app_name = "wcfcb_zm"
 app_title = "WCFCB ZM"
 app_publisher = "elius mgani"
@@ -93,6 +91,7 @@ doctype_js = {
 after_migrate = [
     "wcfcb_zm.patches.create_custom_fields.execute",
     "wcfcb_zm.patches.create_property_setters.execute",
+    "wcfcb_zm.patches.create_indexes.execute",
 ]
 
 
@@ -156,6 +155,44 @@ after_migrate = [
 # 	}
 # }
 
+doc_events = {
+	"Budget": {
+		"after_insert": "wcfcb_zm.exn.doctype.budget_amendment_chain.budget_amendment_chain.on_budget_insert",
+		"on_submit": [
+			"wcfcb_zm.api.budget_picker.clear_budget_picker_cache",
+			"wcfcb_zm.api.summary_cache.clear_summary_cache",
+		],
+		"on_cancel": [
+			"wcfcb_zm.exn.doctype.budget_amendment_chain.budget_amendment_chain.on_budget_cancel",
+			"wcfcb_zm.api.budget_picker.clear_budget_picker_cache",
+			"wcfcb_zm.api.summary_cache.clear_summary_cache",
+		],
+		"on_trash": [
+			"wcfcb_zm.exn.doctype.budget_amendment_chain.budget_amendment_chain.on_budget_trash",
+			"wcfcb_zm.api.budget_picker.clear_budget_picker_cache",
+			"wcfcb_zm.api.summary_cache.clear_summary_cache",
+		],
+	},
+	"Budget Request": {
+		"on_update": "wcfcb_zm.api.summary_cache.clear_summary_cache",
+		"on_cancel": "wcfcb_zm.api.summary_cache.clear_summary_cache",
+		"on_trash": "wcfcb_zm.api.summary_cache.clear_summary_cache",
+	},
+	"Material Request": {
+		"on_submit": "wcfcb_zm.budget_reservation.on_material_request_submit",
+		"on_cancel": "wcfcb_zm.budget_reservation.on_material_request_cancel",
+	},
+	"Purchase Order": {
+		"validate": "wcfcb_zm.budget_reservation.on_purchase_order_validate",
+		"on_submit": "wcfcb_zm.budget_reservation.on_purchase_order_submit",
+		"on_cancel": "wcfcb_zm.budget_reservation.on_purchase_order_cancel",
+	},
+	"Workflow": {
+		"on_update": "wcfcb_zm.api.workflow_meta.clear_workflow_meta",
+		"on_trash": "wcfcb_zm.api.workflow_meta.clear_workflow_meta",
+	},
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -187,7 +224,10 @@ after_migrate = [
 #
 # Override theme switching to support custom theme
 override_whitelisted_methods = {
-	"frappe.core.doctype.user.user.switch_theme": "wcfcb_zm.overrides.switch_theme.switch_theme"
+	"frappe.core.doctype.user.user.switch_theme": "wcfcb_zm.overrides.switch_theme.switch_theme",
+	# Older client scripts still call the virement handler through hooks.*
+	"wcfcb_zm.hooks.budget_virement_handler": "wcfcb_zm.api.budget_request.budget_virement_handler",
+	"wcfcb_zm.hooks.simple_budget_handler": "wcfcb_zm.api.budget_request.budget_virement_handler",
 }
 #
 # each overriding function accepts a `data` argument;
@@ -205,6 +245,7 @@ override_whitelisted_methods = {
 # -----------------------------------------------------------
 
 # ignore_links_on_delete = ["Communication", "ToDo"]
+ignore_links_on_delete = ["Budget Amendment Chain"]
 
 # Request Events
 # ----------------
@@ -216,6 +257,12 @@ override_whitelisted_methods = {
 # before_job = ["wcfcb_zm.utils.before_job"]
 # after_job = ["wcfcb_zm.utils.after_job"]
 
+# Opt-in slow query sampling (site config wcfcb_slow_query_threshold_ms)
+before_request = ["wcfcb_zm.api.slow_query.before_request"]
+after_request = ["wcfcb_zm.api.slow_query.after_request"]
+before_job = ["wcfcb_zm.api.slow_query.before_request"]
+after_job = ["wcfcb_zm.api.slow_query.after_request"]
+
 # User Data Protection
 # --------------------
 
@@ -254,28 +301,3 @@ override_whitelisted_methods = {
 # 	"Logging DocType Name": 30  # days to retain logs
 # }
 
-
-# Simple whitelisted method for testing - defined directly in hooks.py
-# Note: frappe.whitelist decorator will be applied when frappe is fully loaded
-
-
-
-
-
-
-
-
-
-
-# Backward-compatibility wrappers for older client scripts calling hooks.*
-@frappe.whitelist(allow_guest=False)
-def budget_virement_handler(action, **kwargs):
-    """Proxy to the real API handler in wcfcb_zm.api.budget_request"""
-    from wcfcb_zm.api.budget_request import budget_virement_handler as real_handler
-    return real_handler(action, **kwargs)
-
-@frappe.whitelist(allow_guest=False)
-def simple_budget_handler(action, **kwargs):
-    """Proxy to the real API handler in wcfcb_zm.api.budget_request"""
-    from wcfcb_zm.api.budget_request import budget_virement_handler as real_handler
-    return real_handler(action, **kwargs)
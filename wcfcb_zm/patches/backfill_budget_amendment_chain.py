@@ -0,0 +1,18 @@
+import frappe
+
+from wcfcb_zm.exn.doctype.budget_amendment_chain.budget_amendment_chain import register_budget
+
+
+def execute():
+    """Build the Budget Amendment Chain for budgets created before the chain existed"""
+    frappe.reload_doc("exn", "doctype", "budget_amendment_chain")
+
+    budgets = frappe.db.sql("""
+        SELECT name, amended_from
+        FROM `tabBudget`
+        ORDER BY creation, name
+    """, as_dict=True)
+
+    # Creation order guarantees every amended_from is registered before its amendments
+    for budget in budgets:
+        register_budget(budget.name, budget.amended_from)
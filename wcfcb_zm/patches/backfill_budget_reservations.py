@@ -0,0 +1,42 @@
+import frappe
+
+from wcfcb_zm.budget_reservation import (
+    LEDGER_DOCTYPE,
+    insert_ledger_entries,
+    make_consumption_entries,
+    reserve_material_request,
+)
+
+
+def execute():
+    """Post the reservation ledger for Material Requests and Purchase Orders submitted before it existed"""
+    frappe.reload_doc("exn", "doctype", "budget_reservation_entry")
+
+    posted = set(frappe.get_all(LEDGER_DOCTYPE, filters={"is_cancelled": 0}, pluck="voucher_no", distinct=True))
+
+    material_requests = frappe.get_all(
+        "Material Request",
+        filters={"docstatus": 1, "status": ["!=", "Cancelled"]},
+        pluck="name",
+        order_by="creation",
+    )
+    for name in material_requests:
+        if name not in posted:
+            reserve_material_request(frappe.get_doc("Material Request", name))
+
+    # Submitted orders take over the items they hold, oldest order first; as with
+    # live postings, completing or closing an order does not hand the items back
+    rows = frappe.db.sql("""
+        SELECT poi.parent, poi.name, poi.material_request_item
+        FROM `tabPurchase Order Item` poi
+        JOIN `tabPurchase Order` po ON po.name = poi.parent
+        WHERE po.docstatus = 1
+          AND IFNULL(poi.material_request_item, '') != ''
+        ORDER BY po.creation, poi.idx
+    """, as_dict=True)
+
+    for parent in dict.fromkeys(row.parent for row in rows):
+        if parent not in posted:
+            insert_ledger_entries(
+                make_consumption_entries("Purchase Order", parent, [row for row in rows if row.parent == parent])
+            )
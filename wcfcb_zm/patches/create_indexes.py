@@ -0,0 +1,110 @@
+import frappe
+
+# (doctype, index name, columns) of the composite indexes the budget queries rely on
+BUDGET_INDEXES = [
+    ("GL Entry", "wcfcb_account_cost_center_date", ["account", "cost_center", "posting_date", "is_cancelled"]),
+    ("GL Entry", "wcfcb_account_project_date", ["account", "project", "posting_date", "is_cancelled"]),
+    ("Purchase Order Item", "wcfcb_expense_account_cost_center", ["expense_account", "cost_center"]),
+    ("Purchase Order Item", "wcfcb_expense_account_project", ["expense_account", "project"]),
+    ("Purchase Order Item", "wcfcb_material_request_item", ["material_request_item"]),
+    ("Budget Account", "wcfcb_parent_account", ["parent", "account"]),
+    ("Budget", "wcfcb_company_fiscal_year_docstatus", ["company", "fiscal_year", "docstatus"]),
+]
+
+# Representative shapes of the budget queries, used to compare plans
+BUDGET_QUERIES = {
+    "actual_expenses": """
+        SELECT SUM(gl.debit - gl.credit)
+        FROM `tabGL Entry` gl
+        WHERE gl.account = %(account)s
+          AND gl.docstatus = 1
+          AND gl.is_cancelled = 0
+          AND gl.posting_date BETWEEN %(from_date)s AND %(to_date)s
+          AND gl.cost_center = %(cost_center)s
+    """,
+    "material_request_committed": """
+        SELECT SUM(re.amount)
+        FROM `tabBudget Reservation Entry` re
+        JOIN `tabMaterial Request` mr ON mr.name = re.material_request
+        WHERE re.expense_account = %(account)s
+          AND re.is_cancelled = 0
+          AND mr.status != 'Stopped'
+          AND re.transaction_date BETWEEN %(from_date)s AND %(to_date)s
+          AND re.cost_center = %(cost_center)s
+    """,
+    "purchase_order_committed": """
+        SELECT SUM(GREATEST(poi.base_amount - IFNULL(poi.billed_amt, 0) * IFNULL(po.conversion_rate, 1), 0))
+        FROM `tabPurchase Order Item` poi
+        JOIN `tabPurchase Order` po ON po.name = poi.parent
+        WHERE poi.expense_account = %(account)s
+          AND po.docstatus = 1
+          AND po.status NOT IN ('Completed', 'Cancelled', 'Closed')
+          AND po.transaction_date BETWEEN %(from_date)s AND %(to_date)s
+          AND poi.cost_center = %(cost_center)s
+    """,
+    "budget_accounts": """
+        SELECT ba.budget_amount
+        FROM `tabBudget Account` ba
+        JOIN `tabBudget` b ON b.name = ba.parent
+        WHERE ba.account = %(account)s
+          AND b.company = %(company)s
+          AND b.fiscal_year = %(fiscal_year)s
+          AND b.docstatus = 1
+    """,
+}
+
+
+def get_missing_indexes():
+    return [
+        (doctype, index_name, columns)
+        for doctype, index_name, columns in BUDGET_INDEXES
+        if frappe.db.table_exists(doctype) and not frappe.db.has_index(f"tab{doctype}", index_name)
+    ]
+
+
+def get_sample_args():
+    """Values of an existing budget so the plans reflect real data; any values will do"""
+    sample = frappe.db.sql("""
+        SELECT ba.account, b.cost_center, b.company, b.fiscal_year
+        FROM `tabBudget Account` ba
+        JOIN `tabBudget` b ON b.name = ba.parent
+        LIMIT 1
+    """, as_dict=True)
+    args = sample[0] if sample else frappe._dict(account="", cost_center="", company="", fiscal_year="")
+    args.update(from_date="2000-01-01", to_date="2099-12-31")
+    return args
+
+
+def explain_budget_queries():
+    """{query name: EXPLAIN rows} for the representative budget queries"""
+    args = get_sample_args()
+    return {name: frappe.db.sql("EXPLAIN " + query, args, as_dict=True) for name, query in BUDGET_QUERIES.items()}
+
+
+def format_plan(plans):
+    lines = []
+    for name, rows in plans.items():
+        lines.append(f"  {name}:")
+        for row in rows:
+            lines.append(
+                "    {table}: type={type} key={key} rows={rows}".format(
+                    table=row.get("table"), type=row.get("type"), key=row.get("key"), rows=row.get("rows")
+                )
+            )
+    return "\n".join(lines)
+
+
+def execute():
+    """Add any missing budget indexes; prints the query plans before and after when something changed"""
+    missing = get_missing_indexes()
+    if not missing:
+        return
+
+    before = explain_budget_queries()
+    for doctype, index_name, columns in missing:
+        frappe.db.add_index(doctype, columns, index_name)
+    after = explain_budget_queries()
+
+    print("Added budget indexes: " + ", ".join(f"{doctype}.{index_name}" for doctype, index_name, _ in missing))
+    print("Query plans before:\n" + format_plan(before))
+    print("Query plans after:\n" + format_plan(after))
@@ -3,45 +3,49 @@
 
 frappe.ui.form.on('Budget Request', {
     refresh: function(frm) {
-        setup_field_dependencies(frm);
+        // Add View Summary button for approved requests
+        add_view_summary_button(frm);
+        add_preview_amendment_button(frm);
 
-        // Set up account filters for transfer items
-        setup_transfer_item_filters(frm);
+        // Everything the form needs from the server arrives in one batch request
+        load_form_context(frm, function(context) {
+            // Handle amended documents - copy field values from original
+            if (context.amended_from) {
+                copy_fields_from_amended_doc(frm, context.amended_from);
+            }
 
-        // ALWAYS force multi-transfer mode (remove legacy mode completely)
-        force_multi_transfer_mode(frm);
+            setup_field_dependencies(frm);
 
-        // Add View Summary button for approved requests
-        add_view_summary_button(frm);
+            // Set up account filters for transfer items
+            setup_transfer_item_filters(frm);
 
-        // Initialize modern card-based transfer items interface ONLY if budget is selected
-        // But only allow editing for draft documents
-        if (frm.doc.budget) {
-            initialize_modern_transfer_interface(frm);
+            // ALWAYS force multi-transfer mode (remove legacy mode completely)
+            force_multi_transfer_mode(frm);
 
-            // Ensure cards interface is maintained on refresh
-            setTimeout(() => {
-                if ($('.modern-transfer-cards-container').length === 0) {
-                    initialize_modern_transfer_interface(frm);
-                }
-            }, 100);
+            // Initialize modern card-based transfer items interface ONLY if budget is selected
+            // But only allow editing for draft documents
+            if (frm.doc.budget) {
+                initialize_modern_transfer_interface(frm);
 
-            // Add accordion-style progressive summary (for multi-transfer mode)
-            if (is_multi_transfer_mode(frm)) {
-                add_accordion_progressive_summary(frm);
+                // Ensure cards interface is maintained on refresh
+                setTimeout(() => {
+                    if ($('.modern-transfer-cards-container').length === 0) {
+                        initialize_modern_transfer_interface(frm);
+                    }
+                }, 100);
+
+                // Add accordion-style progressive summary (for multi-transfer mode)
+                if (is_multi_transfer_mode(frm)) {
+                    add_accordion_progressive_summary(frm);
+                }
+            } else {
+                // Hide transfer cards container if no budget is selected
+                hide_transfer_cards_container();
             }
-        } else {
-            // Hide transfer cards container if no budget is selected
-            hide_transfer_cards_container();
-        }
+        });
     },
 
     onload_post_render: function(frm) {
-        // Handle amended documents - copy field values from original
-        if (frm.doc.amended_from && frm.is_new()) {
-            copy_fields_from_amended_doc(frm);
-        }
-
         // Ensure field properties are set correctly after render
         setTimeout(function() {
             force_multi_transfer_mode(frm);
@@ -381,48 +385,49 @@ frappe.ui.form.on('Budget Request Item', {
 });
 
 function fetch_account_balance(frm, account, target_field, cdt, cdn) {
-    if (!account || !frm.doc.budget) return;
-
-    // Call server to get account balance from budget
-    frappe.call({
-        method: 'wcfcb_zm.api.budget_request.get_account_balance_from_budget',
-        args: {
-            budget_name: frm.doc.budget,
-            account: account
-        },
-        callback: function(r) {
-            if (r.message && r.message.success) {
-                frappe.model.set_value(cdt, cdn, target_field, r.message.available_balance);
-                // Recalculate balances after setting available balance
-                calculate_transfer_item_balances(frm, cdt, cdn);
-            } else {
-                frappe.model.set_value(cdt, cdn, target_field, 0);
-            }
-        }
-    });
+    fetch_account_balance_from_budget(frm, account, target_field, cdt, cdn, frm.doc.budget);
 }
 
 function fetch_account_balance_from_budget(frm, account, target_field, cdt, cdn, budget_name) {
+    // Balances are a preview only; the server recomputes every row on save
     if (!account || !budget_name) return;
+    if (set_available_balance_from_context(frm, account, target_field, cdt, cdn, budget_name)) return;
+
+    // Budget not in the form context yet (e.g. just selected): load all of its accounts once
+    load_available_balances(frm, budget_name, function() {
+        if (!set_available_balance_from_context(frm, account, target_field, cdt, cdn, budget_name)) {
+            frappe.model.set_value(cdt, cdn, target_field, 0);
+        }
+    });
+}
 
+function load_available_balances(frm, budget_name, callback) {
     frappe.call({
-        method: 'wcfcb_zm.api.budget_request.get_account_balance_from_budget',
+        method: 'wcfcb_zm.api.budget_request.budget_virement_handler',
         args: {
-            budget_name: budget_name,
-            account: account
+            'action': 'get_budget_balances',
+            'budget': budget_name
         },
         callback: function(r) {
+            frm._available_balances = frm._available_balances || {};
             if (r.message && r.message.success) {
-                frappe.model.set_value(cdt, cdn, target_field, r.message.available_balance);
-                // Recalculate balances after setting available balance
-                calculate_transfer_item_balances(frm, cdt, cdn);
-            } else {
-                frappe.model.set_value(cdt, cdn, target_field, 0);
+                r.message.data.forEach(b => { frm._available_balances[`${b.account}|${budget_name}`] = flt(b.available_balance); });
             }
+            callback();
         }
     });
 }
 
+function set_available_balance_from_context(frm, account, target_field, cdt, cdn, budget_name) {
+    // Use the availability loaded with the form context instead of a call per account
+    const key = `${account}|${budget_name}`;
+    if (!frm._available_balances || frm._available_balances[key] === undefined) return false;
+
+    frappe.model.set_value(cdt, cdn, target_field, frm._available_balances[key]);
+    calculate_transfer_item_balances(frm, cdt, cdn);
+    return true;
+}
+
 function calculate_transfer_item_balances(frm, cdt, cdn) {
     let row = locals[cdt][cdn];
 
@@ -521,6 +526,159 @@ function setup_transfer_item_filters(frm) {
     });
 }
 
+function call_virement_batch(calls, callback) {
+    // Run several budget_virement_handler actions in one request.
+    // `calls` maps a result name to {action, kwargs}; the callback receives results by the same names.
+    const names = Object.keys(calls);
+    if (!names.length) {
+        callback({});
+        return;
+    }
+
+    frappe.call({
+        method: 'wcfcb_zm.api.budget_request.budget_virement_handler',
+        args: {
+            action: 'batch',
+            calls: names.map(name => calls[name])
+        },
+        callback: function(r) {
+            const results = {};
+            if (r.message && r.message.success) {
+                names.forEach((name, i) => { results[name] = r.message.results[i]; });
+            }
+            callback(results);
+        },
+        error: function() {
+            callback({});
+        }
+    });
+}
+
+function load_form_context(frm, callback) {
+    // Collect the server data needed to render the form; anything missing from the
+    // context is fetched on demand by the individual handlers
+    const calls = {};
+    const is_amended_doc = frm.doc.amended_from && frm.is_new();
+
+    if (is_amended_doc) {
+        calls.amended_from = { action: 'get_budget_request', kwargs: { doc_name: frm.doc.amended_from } };
+    }
+    if (frm.doc.budget) {
+        calls.source_accounts = { action: 'get_budget_accounts', kwargs: { budget: frm.doc.budget } };
+        calls.source_balances = { action: 'get_budget_balances', kwargs: { budget: frm.doc.budget } };
+    }
+    if (frm.doc.virement_type === 'Inter-Budget' && frm.doc.target_budget) {
+        calls.target_accounts = { action: 'get_budget_accounts', kwargs: { budget: frm.doc.target_budget } };
+        calls.target_balances = { action: 'get_budget_balances', kwargs: { budget: frm.doc.target_budget } };
+    }
+
+    // Workflow states and the external approval threshold, for in-memory amount checks
+    calls.workflow_meta = { action: 'get_workflow_meta' };
+
+    call_virement_batch(calls, function(results) {
+        const context = {};
+        Object.keys(results).forEach(function(name) {
+            const result = results[name];
+            if (result && result.success) {
+                context[name] = result.data;
+            }
+        });
+
+        if (context.workflow_meta) {
+            frm._workflow_meta = context.workflow_meta;
+        }
+
+        // Budget allocations feed the transfer card dropdowns and balance displays
+        frm._balance_cache = {};
+        frm._budget_accounts = {};
+        [[frm.doc.budget, context.source_accounts], [frm.doc.target_budget, context.target_accounts]].forEach(function([budget, accounts]) {
+            if (!budget || !accounts) return;
+            frm._budget_accounts[budget] = accounts;
+            accounts.forEach(a => { frm._balance_cache[`${a.value}|${budget}`] = flt(a.budget_amount); });
+        });
+
+        // Real availability (budget - actuals - commitments) for the transfer item balances
+        frm._available_balances = {};
+        [[frm.doc.budget, context.source_balances], [frm.doc.target_budget, context.target_balances]].forEach(function([budget, balances]) {
+            if (!budget || !balances) return;
+            balances.forEach(b => { frm._available_balances[`${b.account}|${budget}`] = flt(b.available_balance); });
+        });
+
+        callback(context);
+    });
+}
+
+function check_external_approval(frm, amount) {
+    // Same result as the validate_amount_approval action, computed from the cached workflow metadata.
+    // Returns null until the metadata has been loaded with the form context.
+    const meta = frm._workflow_meta;
+    if (!meta) return null;
+
+    const requires_external_approval = Math.abs(flt(amount)) > flt(meta.external_approval_threshold);
+    return {
+        success: true,
+        requires_external_approval: requires_external_approval,
+        amount: Math.abs(flt(amount)),
+        threshold: flt(meta.external_approval_threshold),
+        external_state_available: meta.has_external_approval_state,
+        recommended_workflow_state: requires_external_approval && meta.has_external_approval_state ? meta.external_approval_state : 'Draft'
+    };
+}
+
+function show_external_approval_check(frm, amount) {
+    // Show or clear the external approval message for an amount, asking the server only
+    // when the workflow metadata is not available on the form
+    const check = check_external_approval(frm, amount);
+    if (check) {
+        if (check.requires_external_approval) {
+            show_external_approval_message(frm, check);
+        } else {
+            clear_external_approval_message(frm);
+        }
+        return;
+    }
+
+    frappe.call({
+        method: 'wcfcb_zm.api.budget_request.budget_virement_handler',
+        args: {
+            'action': 'validate_amount_approval',
+            'amount': amount
+        },
+        callback: function(r) {
+            if (r.message && r.message.success && r.message.requires_external_approval) {
+                show_external_approval_message(frm, r.message);
+            } else {
+                clear_external_approval_message(frm);
+            }
+        }
+    });
+}
+
+function set_budget_picker_query(frm, fieldname, filters) {
+    // Submitted budgets from the cached, server-side searched and paged picker list.
+    // filters: multi_account (only budgets with more than one account), exclude (budget name)
+    frm.set_query(fieldname, function() {
+        return {
+            query: 'wcfcb_zm.api.budget_picker.budget_picker_query',
+            filters: typeof filters === 'function' ? filters() : (filters || {})
+        };
+    });
+    frm.refresh_field(fieldname);
+}
+
+function render_account_options(frm, select, budget, selected_account, progressive_balances, exclude_account) {
+    // Fill a transfer card dropdown from the preloaded budget accounts
+    select.empty().append('<option value="">Select account...</option>');
+    frm._budget_accounts[budget].forEach(function(account) {
+        if (exclude_account && account.value === exclude_account) return;
+
+        let current_amount = flt(account.budget_amount) + (progressive_balances[`${account.value}|${budget}`] || 0);
+        let description = `${account.account_name} (K ${current_amount.toLocaleString('en-US', { maximumFractionDigits: 0 })})`;
+        let selected = account.value === selected_account ? 'selected' : '';
+        select.append(`<option value="${account.value}" ${selected}>${frappe.utils.escape_html(description)}</option>`);
+    });
+}
+
 function is_multi_transfer_mode(frm) {
     return frm.doc.transfer_items && frm.doc.transfer_items.length > 0;
 }
@@ -1263,6 +1421,11 @@ function populate_from_account_dropdown(frm, item, index) {
 
     let progressive_balances = calculate_client_side_progressive_balances(frm, index);
 
+    if (frm._budget_accounts && frm._budget_accounts[frm.doc.budget]) {
+        render_account_options(frm, $(`.from-account-select[data-idx="${item.idx}"]`), frm.doc.budget, item.from_account, progressive_balances);
+        return;
+    }
+
     frappe.call({
         method: 'wcfcb_zm.api.budget_request.get_budget_accounts_with_progressive',
         args: {
@@ -1291,6 +1454,12 @@ function populate_to_account_dropdown(frm, item, index) {
 
     let progressive_balances = calculate_client_side_progressive_balances(frm, index, target_budget);
 
+    if (frm._budget_accounts && frm._budget_accounts[target_budget]) {
+        let exclude_account = frm.doc.virement_type === 'Intra-Budget' ? item.from_account : null;
+        render_account_options(frm, $(`.to-account-select[data-idx="${item.idx}"]`), target_budget, item.to_account, progressive_balances, exclude_account);
+        return;
+    }
+
     frappe.call({
         method: 'wcfcb_zm.api.budget_request.get_budget_accounts_with_progressive',
         args: {
@@ -1600,22 +1769,10 @@ function handle_virement_type_change(frm) {
         frm.set_df_property('budget', 'read_only', 0);
 
         // Filter source budget to show all budgets
-        frm.set_query('budget', function() {
-            return {
-                filters: {
-                    'docstatus': 1
-                }
-            };
-        });
+        set_budget_picker_query(frm, 'budget');
 
-        // Clear target budget query initially
-        frm.set_query('target_budget', function() {
-            return {
-                filters: {
-                    'docstatus': 1
-                }
-            };
-        });
+        // Target budget excludes the source budget once one is selected
+        set_budget_picker_query(frm, 'target_budget', () => ({ exclude: frm.doc.budget }));
 
     } else if (frm.doc.virement_type === 'Intra-Budget') {
         // Intra-Budget: Hide target_budget field, not required
@@ -1627,26 +1784,7 @@ function handle_virement_type_change(frm) {
         frm.set_df_property('budget', 'read_only', 0);
 
         // Set source budget query to only show multi-account budgets
-        frappe.call({
-            method: 'wcfcb_zm.api.budget_request.budget_virement_handler',
-            args: {
-                'action': 'get_multi_account_budgets'
-            },
-            callback: function(r) {
-                if (r.message && r.message.success) {
-                    let budget_names = r.message.data.map(b => b.value);
-                    frm.set_query('budget', function() {
-                        return {
-                            filters: [
-                                ['Budget', 'name', 'in', budget_names],
-                                ['Budget', 'docstatus', '=', 1]
-                            ]
-                        };
-                    });
-                    frm.refresh_field('budget');
-                }
-            }
-        });
+        set_budget_picker_query(frm, 'budget', { multi_account: 1 });
     }
 
     // Update field states
@@ -1665,15 +1803,7 @@ function handle_budget_change(frm) {
             frm.set_value('target_budget', frm.doc.budget);
         } else if (frm.doc.virement_type === 'Inter-Budget') {
             // Update target budget query to exclude selected source budget
-            frm.set_query('target_budget', function() {
-                return {
-                    filters: [
-                        ['Budget', 'docstatus', '=', 1],
-                        ['Budget', 'name', '!=', frm.doc.budget]
-                    ]
-                };
-            });
-            frm.refresh_field('target_budget');
+            set_budget_picker_query(frm, 'target_budget', () => ({ exclude: frm.doc.budget }));
         }
 
         // For legacy requests only - set FROM account query based on source budget
@@ -1894,28 +2024,48 @@ function handle_threshold_validation(frm) {
         });
 
         // Check external approval requirement for total amount
-        if (total_amount > 250000) {
-            frappe.call({
-                method: 'wcfcb_zm.api.budget_request.budget_virement_handler',
-                args: {
-                    'action': 'validate_amount_approval',
-                    'amount': total_amount
-                },
-                callback: function(r) {
-                    if (r.message && r.message.success) {
-                        show_external_approval_message(frm, r.message);
-                    }
-                }
-            });
+        if (total_amount) {
+            show_external_approval_check(frm, total_amount);
         } else {
             clear_external_approval_message(frm);
         }
+
+        // Check every row against live availability in one call
+        if (!frm.is_new() && !frm.is_dirty()) {
+            show_transfer_items_sufficiency(frm);
+        }
     } else {
         // Single-transfer mode (legacy) - use existing logic
         handle_amount_change(frm);
     }
 }
 
+function show_transfer_items_sufficiency(frm) {
+    frappe.call({
+        method: 'wcfcb_zm.api.budget_request.budget_virement_handler',
+        args: {
+            'action': 'validate_transfer_items',
+            'doc_name': frm.doc.name
+        },
+        callback: function(r) {
+            if (!r.message || !r.message.success || r.message.sufficient_budget) {
+                frm.dashboard.clear_headline();
+                return;
+            }
+
+            const rows = r.message.rows.filter(row => !row.sufficient).map(row =>
+                `Row ${row.idx}: ${row.from_account} has ${format_currency(row.from_available)} available, ` +
+                `${format_currency(row.amount_requested)} requested` +
+                (row.message ? ` (${row.message})` : '')
+            );
+            frm.dashboard.set_headline_alert(
+                `<strong>${__('Insufficient budget available')}</strong><br>${rows.join('<br>')}`,
+                'red'
+            );
+        }
+    });
+}
+
 function handle_amount_change(frm) {
     // Don't show warnings for final states or cancelled documents
     const final_states = ['Approved', 'Rejected'];
@@ -1943,22 +2093,7 @@ function handle_amount_change(frm) {
                         clear_budget_insufficient_message(frm);
 
                         // Check external approval requirement
-                        if (Math.abs(frm.doc.amount_requested) > 250000) {
-                            frappe.call({
-                                method: 'wcfcb_zm.api.budget_request.budget_virement_handler',
-                                args: {
-                                    'action': 'validate_amount_approval',
-                                    'amount': frm.doc.amount_requested
-                                },
-                                callback: function(r2) {
-                                    if (r2.message && r2.message.success) {
-                                        show_external_approval_message(frm, r2.message);
-                                    }
-                                }
-                            });
-                        } else {
-                            clear_external_approval_message(frm);
-                        }
+                        show_external_approval_check(frm, frm.doc.amount_requested);
                     }
                 } else {
                     clear_budget_insufficient_message(frm);
@@ -2071,10 +2206,11 @@ function handle_external_approval_before_save(frm) {
         total_amount = Math.abs(frm.doc.amount_requested || 0);
     }
 
-    if (total_amount > 250000) {
+    const check = check_external_approval(frm, total_amount);
+    if (check && check.requires_external_approval) {
         if (frm.doc.workflow_state === 'Draft') {
             frappe.show_alert({
-                message: __('Total amount exceeds 250,000 - consider using "Submit for External Approval" action'),
+                message: __('Total amount exceeds {0} - consider using "Submit for External Approval" action', [check.threshold.toLocaleString()]),
                 indicator: 'orange'
             }, 5);
         }
@@ -2421,104 +2557,63 @@ function process_budget_approval(frm) {
     });
 }
 
-function copy_fields_from_amended_doc(frm) {
-    // Copy field values from the original cancelled document
-    if (!frm.doc.amended_from) return;
-
-    frappe.call({
-        method: 'frappe.client.get',
-        args: {
-            doctype: 'Budget Request',
-            name: frm.doc.amended_from
-        },
-        callback: function(r) {
-            if (r.message) {
-                const original_doc = r.message;
-
-                // Mark that we're copying fields to prevent clearing
-                frm._copying_amended_fields = true;
-
-                // Copy all relevant fields from original document
-                const fields_to_copy = [
-                    'virement_type',
-                    'budget',
-                    'target_budget',
-                    'expense_account',
-                    'to_expense_account',
-                    'amount_requested',
-                    'cost_centre',
-                    'motivation',
-                    'remarks'
-                ];
-
-                // Copy fields without triggering change handlers
-                fields_to_copy.forEach(function(field) {
-                    if (original_doc[field] && !frm.doc[field]) {
-                        frm.doc[field] = original_doc[field];
-                        frm.refresh_field(field);
-                    }
-                });
-
-                // Set up field dependencies after copying values
-                setTimeout(function() {
-                    // Clear the copying flag
-                    frm._copying_amended_fields = false;
+function copy_fields_from_amended_doc(frm, original_doc) {
+    // Copy field values from the original cancelled document (loaded with the form context)
+    if (!frm.doc.amended_from || !original_doc) return;
+
+    // Mark that we're copying fields to prevent clearing
+    frm._copying_amended_fields = true;
+
+    // Copy all relevant fields from original document
+    const fields_to_copy = [
+        'virement_type',
+        'budget',
+        'target_budget',
+        'expense_account',
+        'to_expense_account',
+        'amount_requested',
+        'cost_centre',
+        'motivation',
+        'remarks'
+    ];
+
+    // Copy fields without triggering change handlers
+    fields_to_copy.forEach(function(field) {
+        if (original_doc[field] && !frm.doc[field]) {
+            frm.doc[field] = original_doc[field];
+            frm.refresh_field(field);
+        }
+    });
 
-                    // Set up queries and field states based on copied values
-                    disable_dependent_fields(frm);
+    // Set up field dependencies after copying values
+    setTimeout(function() {
+        // Clear the copying flag
+        frm._copying_amended_fields = false;
 
-                    if (frm.doc.virement_type) {
-                        setup_queries_for_existing_doc(frm);
-                    }
+        // Set up queries and field states based on copied values
+        disable_dependent_fields(frm);
 
-                    frappe.show_alert({
-                        message: __('Fields copied from cancelled document'),
-                        indicator: 'green'
-                    }, 3);
-                }, 500);
-            }
+        if (frm.doc.virement_type) {
+            setup_queries_for_existing_doc(frm);
         }
-    });
+
+        frappe.show_alert({
+            message: __('Fields copied from cancelled document'),
+            indicator: 'green'
+        }, 3);
+    }, 500);
 }
 
 function setup_queries_for_existing_doc(frm) {
     // Set up field queries for saved documents without clearing values
     if (frm.doc.virement_type === 'Inter-Budget') {
         // Set up queries for Inter-Budget
-        frm.set_query('budget', function() {
-            return { filters: { 'docstatus': 1 } };
-        });
-
-        if (frm.doc.budget) {
-            frm.set_query('target_budget', function() {
-                return {
-                    filters: [
-                        ['Budget', 'docstatus', '=', 1],
-                        ['Budget', 'name', '!=', frm.doc.budget]
-                    ]
-                };
-            });
-        }
+        set_budget_picker_query(frm, 'budget');
+        set_budget_picker_query(frm, 'target_budget', () => ({ exclude: frm.doc.budget }));
 
     } else if (frm.doc.virement_type === 'Intra-Budget') {
         // Set up queries for Intra-Budget
-        frappe.call({
-            method: 'wcfcb_zm.api.budget_request.budget_virement_handler',
-            args: { 'action': 'get_multi_account_budgets' },
-            callback: function(r) {
-                if (r.message && r.message.success) {
-                    let budget_names = r.message.data.map(b => b.value);
-                    frm.set_query('budget', function() {
-                        return {
-                            filters: [
-                                ['Budget', 'name', 'in', budget_names],
-                                ['Budget', 'docstatus', '=', 1]
-                            ]
-                        };
-                    });
-                }
-            }
-        });
+        set_budget_picker_query(frm, 'budget', { multi_account: 1 });
     }
 }
 
@@ -2573,13 +2668,102 @@ function add_view_summary_button(frm) {
     }
 }
 
-function show_virement_summary_dialog(frm) {
-    // Call server method to get detailed summary (amended budgets + before/after amounts)
+function add_preview_amendment_button(frm) {
+    // Dry run of the approval for submitted requests that have not been approved yet
+    if (frm.doc.docstatus === 1 && frm.doc.budget && frm.doc.workflow_state !== 'Approved') {
+        frm.add_custom_button(__('Preview Amendment'), function() {
+            show_amendment_preview_dialog(frm);
+        });
+    }
+}
+
+function show_amendment_preview_dialog(frm) {
+    // Read-only on the server, so it is safe to call as often as needed
+    frappe.call({
+        method: 'wcfcb_zm.api.budget_request.budget_virement_handler',
+        args: {
+            action: 'preview_amendment',
+            doc_name: frm.doc.name
+        },
+        freeze: true,
+        freeze_message: __('Planning budget amendment...'),
+        callback: function(r) {
+            const plan = r && r.message ? r.message : {};
+            if (!plan.preview) {
+                frappe.msgprint({
+                    title: __('Preview Failed'),
+                    message: plan.message || __('Could not preview the amendment'),
+                    indicator: 'red'
+                });
+                return;
+            }
+            render_amendment_preview(plan);
+        }
+    });
+}
+
+function render_amendment_preview(plan) {
+    const fmt = v => `K ${Number(v || 0).toLocaleString()}`;
+    const esc = v => frappe.utils.escape_html(String(v));
+
+    let html = '';
+    if (plan.errors && plan.errors.length) {
+        html += `<div class="alert alert-danger">${plan.errors.map(esc).join('<br>')}</div>`;
+    }
+
+    (plan.budgets || []).forEach(function(budget) {
+        const retargeted = budget.retargeted_to_chain_head
+            ? ` <span class="text-muted">(${__('latest amendment of')} ${esc(budget.original_budget)})</span>`
+            : '';
+        const rows = budget.changes.map(change => `
+            <tr>
+                <td>${esc(change.account)}${change.is_new_account ? ' <span class="indicator-pill blue">' + __('New') + '</span>' : ''}</td>
+                <td class="text-right">${fmt(change.before)}</td>
+                <td class="text-right" style="color:${change.delta < 0 ? '#dc3545' : '#28a745'};">${change.delta < 0 ? '-' : '+'}${fmt(Math.abs(change.delta))}</td>
+                <td class="text-right">${fmt(change.after)}</td>
+            </tr>`).join('');
+
+        html += `
+            <h5>${__('Amends')} <a href="/app/budget/${encodeURIComponent(budget.amends_budget)}">${esc(budget.amends_budget)}</a>${retargeted}</h5>
+            <table class="table table-bordered table-sm">
+                <thead><tr>
+                    <th>${__('Account')}</th>
+                    <th class="text-right">${__('Before')}</th>
+                    <th class="text-right">${__('Change')}</th>
+                    <th class="text-right">${__('After')}</th>
+                </tr></thead>
+                <tbody>${rows || `<tr><td colspan="4" class="text-muted">${__('No changes')}</td></tr>`}</tbody>
+            </table>`;
+    });
+
+    const linked = plan.linked_documents || [];
+    html += `<h5>${__('Linked documents to cancel')}</h5>`;
+    html += linked.length
+        ? '<ul>' + linked.map(d => `<li>${esc(d.doctype)}: ${esc(d.name)}</li>`).join('') + '</ul>'
+        : `<p class="text-muted">${__('None')}</p>`;
+
+    const d = new frappe.ui.Dialog({
+        title: __('Amendment Preview ({0} transfer(s), {1})', [plan.transfer_count, fmt(plan.total_amount)]),
+        size: 'large',
+        fields: [{ fieldtype: 'HTML', fieldname: 'preview_html' }]
+    });
+    d.fields_dict.preview_html.$wrapper.html(html);
+    d.show();
+}
+
+// Transfer items shown per page of the virement summary dialog
+const SUMMARY_PAGE_LENGTH = 50;
+
+function show_virement_summary_dialog(frm, start = 0) {
+    // Call server method to get detailed summary (amended budgets + before/after amounts),
+    // one page of transfer items at a time so large virements stay responsive
     frappe.call({
         method: 'wcfcb_zm.api.budget_request.budget_virement_handler',
         args: {
             action: 'get_summary_details',
             doc_name: frm.doc.name,
+            start: start,
+            page_len: SUMMARY_PAGE_LENGTH,
             source_budget: frm.doc.budget,
             target_budget: frm.doc.target_budget,
             virement_type: frm.doc.virement_type,
@@ -2624,7 +2808,7 @@ function show_summary_with_amendments(frm, details) {
     let transferDetailsHtml = '';
     if (is_multi_transfer && details.transfer_items && details.transfer_items.length > 0) {
         // Multi-transfer mode: show summary of transfer items
-        const transferCount = details.transfer_items.length;
+        const transferCount = details.total_items || details.transfer_items.length;
         transferDetailsHtml = `
             <div style="background:#f8fafc;border:1px solid #eef2f7;border-radius:8px;padding:12px;">
                 <div style="font-weight:600;margin-bottom:8px;color:#334155;">Transfer Details</div>
@@ -2680,7 +2864,7 @@ function show_summary_with_amendments(frm, details) {
                     // Multi-transfer mode: show each transfer item
                     details.transfer_items.map((item, index) => `
                         <div style="background:#ffffff;border:1px solid #e2e8f0;border-radius:8px;padding:12px;margin-bottom:8px;">
-                            <div style="font-weight:600;margin-bottom:8px;color:#334155;">Transfer ${index + 1} - K ${Number(item.amount).toLocaleString()}</div>
+                            <div style="font-weight:600;margin-bottom:8px;color:#334155;">Transfer ${(details.start || 0) + index + 1} - K ${Number(item.amount).toLocaleString()}</div>
                             <div style="display:grid;grid-template-columns:1fr 1fr;gap:12px;">
                                 <div>
                                     <div style="font-weight:600;margin-bottom:6px;color:#334155;">From Account</div>
@@ -2747,6 +2931,19 @@ function show_summary_with_amendments(frm, details) {
 
     d.$body.html(html);
     d.set_primary_action(__('Close'), () => d.hide());
+
+    // Page through the transfer items of large multi-transfer requests
+    if (is_multi_transfer && details.total_items) {
+        const start = details.start || 0;
+        const next_start = start + details.transfer_items.length;
+        if (next_start < details.total_items) {
+            d.set_secondary_action_label(__('Next {0} of {1}', [Math.min(SUMMARY_PAGE_LENGTH, details.total_items - next_start), details.total_items]));
+            d.set_secondary_action(() => { d.hide(); show_virement_summary_dialog(frm, next_start); });
+        } else if (start > 0) {
+            d.set_secondary_action_label(__('Back to first'));
+            d.set_secondary_action(() => { d.hide(); show_virement_summary_dialog(frm, 0); });
+        }
+    }
     d.show();
 }
 
@@ -63,7 +63,9 @@ function run_po_budget_check(frm, item, opts = {}) {
             cost_center: item.cost_center,
             project: item.project,
             requested_amount: item.amount || 0,
-            transaction_date: frm.doc.transaction_date || frappe.datetime.get_today()
+            transaction_date: frm.doc.transaction_date || frappe.datetime.get_today(),
+            material_request_item: item.material_request_item || null,
+            purchase_order: frm.is_new() ? null : frm.doc.name
         },
         callback: function(r) {
             if (r.exc || !r.message || !r.message.length) {
@@ -74,6 +76,19 @@ function run_po_budget_check(frm, item, opts = {}) {
             }
 
             const budget = r.message[0];
+            // Lines fully backed by their Material Request's reservation need no budget check
+            if (budget.covered_by_reservation) {
+                if (!quiet) {
+                    frappe.show_alert({
+                        message: __('Covered by Material Request reservation. Reserved: {0}', [
+                            format_currency(budget.reserved_amount)
+                        ]),
+                        indicator: 'green'
+                    });
+                }
+                return;
+            }
+
             // Monthly warning (non-blocking)
             if (budget.has_monthly_distribution && !budget.within_monthly_budget) {
                 frappe.show_alert({
@@ -126,6 +141,7 @@ function build_po_budget_html(item, b, all, requested, transaction_date, overAnn
     const isDraft = (typeof cint !== 'undefined' ? cint(docstatus) : docstatus) === 0;
     const linkedFlag = !!linked_mr;
     const infoNotes = `
+        ${b.covered_amount ? `<div class="alert alert-info mb-3"><i class="fa fa-info-circle"></i> ${__('{0} is covered by the Material Request reservation; only the excess of {1} is checked against the budget.', [format_currency(b.covered_amount), format_currency(b.excess_amount)])}</div>` : ''}
         ${isDraft && linkedFlag ? `<div class="alert alert-info mb-3"><i class="fa fa-info-circle"></i> ${__('Info: When a Purchase Order is submitted and approved for a Material Request, the budget commitment is automatically transferred from the Material Request to the Purchase Order.')}</div>` : ''}
     `;
 
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+WCFCB Budget Benchmark
+Times the budget checks and the variance report against synthetic data at several scales
+
+The generator builds, for the current fiscal year of the company:
+
+    cost centers        one budget each, on every benchmark account
+    budgets             submitted, with a monthly distribution
+    GL entries          spread over the budget accounts, cost centers and the year
+    Material Requests   submitted, with reservations in the Budget Reservation Entry ledger
+    Purchase Orders     submitted, part of them from the Material Requests, part partly billed
+
+Budgets, cost centers and the distribution are created as documents; the
+high-volume rows are written with bulk inserts. Everything runs in one
+transaction that is rolled back at the end (unless --keep-data), and the data
+is drawn from a seeded random generator, so two runs at the same scale time
+the same workload.
+
+Results are written as JSON and can be compared with an earlier run:
+
+    python -m wcfcb_zm.tests.budget_benchmark --site wcfcb --scale small --output bench.json
+    python -m wcfcb_zm.tests.budget_benchmark --site wcfcb --scale small --baseline bench.json
+
+Not a test module: the test runner does not pick it up.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import frappe
+from frappe.utils import add_days, flt, getdate, now, nowdate
+
+from wcfcb_zm.api.sql_listener import sql_listener
+from wcfcb_zm.budget_reservation import LEDGER_DOCTYPE, LEDGER_FIELDS, make_ledger_entry
+
+DEFAULT_COMPANY = "Workers Compensation Fund Control Board"
+BATCH_SIZE = 10000
+
+# Row counts per scale; items_per_doc applies to Material Requests and Purchase Orders
+SCALES = {
+    "small": dict(cost_centers=5, accounts=5, gl_entries=20000, material_requests=2000, purchase_orders=2000, items_per_doc=3),
+    "medium": dict(cost_centers=20, accounts=10, gl_entries=250000, material_requests=20000, purchase_orders=20000, items_per_doc=3),
+    "large": dict(cost_centers=50, accounts=20, gl_entries=2000000, material_requests=200000, purchase_orders=200000, items_per_doc=4),
+}
+
+# Share of Purchase Order lines created from a Material Request item, and of lines partly billed
+LINKED_PO_SHARE = 0.5
+BILLED_PO_SHARE = 0.3
+
+# Relative slowdown of the median beyond which a comparison reports a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+class BenchmarkData:
+    """Synthetic budgets and transactions for one scale"""
+
+    def __init__(self, scale, company=DEFAULT_COMPANY, seed=42):
+        self.scale = scale
+        self.size = frappe._dict(SCALES[scale])
+        self.company = company
+        self.random = random.Random(seed)
+        self.prefix = f"BENCH-{scale.upper()}"
+        self.counts = {}
+
+    def generate(self):
+        from erpnext.accounts.utils import get_fiscal_year
+
+        self.fiscal_year, self.year_start, self.year_end = get_fiscal_year(nowdate(), company=self.company)
+        self.days = (getdate(self.year_end) - getdate(self.year_start)).days
+        self.accounts = frappe.get_all(
+            "Account",
+            filters={"company": self.company, "account_type": "Expense Account", "is_group": 0},
+            pluck="name",
+            limit=self.size.accounts,
+        )
+        self.item_code = frappe.db.get_value("Item", {"is_purchase_item": 1, "disabled": 0}, "name")
+        self.supplier = frappe.db.get_value("Supplier", {"disabled": 0}, "name")
+        if not self.accounts or not self.item_code or not self.supplier:
+            frappe.throw("The benchmark needs expense accounts, a purchase item and a supplier")
+
+        self.make_monthly_distribution()
+        self.make_cost_centers()
+        self.make_budgets()
+        self.make_gl_entries()
+        self.make_material_requests()
+        self.make_purchase_orders()
+        return self
+
+    def random_date(self):
+        return add_days(self.year_start, self.random.randint(0, self.days))
+
+    def random_target(self):
+        return self.random.choice(self.accounts), self.random.choice(self.cost_centers)
+
+    def bulk_insert(self, doctype, fields, rows):
+        stamp = now()
+        fields = tuple(fields) + ("creation", "modified", "owner", "modified_by")
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = [tuple(row) + (stamp, stamp, "Administrator", "Administrator") for row in rows[start:start + BATCH_SIZE]]
+            frappe.db.bulk_insert(doctype, fields, batch)
+        self.counts[doctype] = self.counts.get(doctype, 0) + len(rows)
+
+    def make_monthly_distribution(self):
+        distribution = frappe.new_doc("Monthly Distribution")
+        distribution.distribution_id = f"{self.prefix} Distribution"
+        distribution.get_months()
+        distribution.insert(ignore_permissions=True)
+        self.monthly_distribution = distribution.name
+
+    def make_cost_centers(self):
+        root = frappe.get_all(
+            "Cost Center", filters={"company": self.company, "is_group": 1}, pluck="name", order_by="lft", limit=1
+        )[0]
+        self.cost_centers = []
+        for number in range(self.size.cost_centers):
+            cost_center = frappe.get_doc({
+                "doctype": "Cost Center",
+                "cost_center_name": f"{self.prefix} {number:03d}",
+                "parent_cost_center": root,
+                "company": self.company,
+            }).insert(ignore_permissions=True)
+            self.cost_centers.append(cost_center.name)
+
+    def make_budgets(self):
+        self.budgets = []
+        for cost_center in self.cost_centers:
+            budget = frappe.get_doc({
+                "doctype": "Budget",
+                "company": self.company,
+                "fiscal_year": self.fiscal_year,
+                "budget_against": "Cost Center",
+                "cost_center": cost_center,
+                "monthly_distribution": self.monthly_distribution,
+                "applicable_on_booking_actual_expenses": 1,
+                "action_if_annual_budget_exceeded": "Warn",
+                "action_if_accumulated_monthly_budget_exceeded": "Warn",
+                "custom_fund_type": "Pension Fund",
+                "custom_location": "HQ1",
+                "custom_consolidation_group": "OPEX - HQ",
+                "accounts": [
+                    {"account": account, "budget_amount": self.random.randint(1, 50) * 100000}
+                    for account in self.accounts
+                ],
+            })
+            budget.insert(ignore_permissions=True)
+            budget.submit()
+            self.budgets.append(budget.name)
+
+    def make_gl_entries(self):
+        rows = []
+        for number in range(self.size.gl_entries):
+            account, cost_center = self.random_target()
+            amount = flt(self.random.uniform(10, 5000), 2)
+            rows.append((
+                f"{self.prefix}-GL-{number}", self.random_date(), account, cost_center, self.company,
+                self.fiscal_year, amount, 0, amount, 0, "Journal Entry", f"{self.prefix}-JV-{number // 2}", 0, 1,
+            ))
+        self.bulk_insert("GL Entry", (
+            "name", "posting_date", "account", "cost_center", "company", "fiscal_year", "debit", "credit",
+            "debit_in_account_currency", "credit_in_account_currency", "voucher_type", "voucher_no",
+            "is_cancelled", "docstatus",
+        ), rows)
+
+    def make_material_requests(self):
+        requests, items, reservations = [], [], []
+        self.material_request_items = []
+        for number in range(self.size.material_requests):
+            name = f"{self.prefix}-MR-{number}"
+            date = self.random_date()
+            requests.append((name, self.company, date, date, "Purchase", "Pending", 1))
+            for idx in range(1, self.size.items_per_doc + 1):
+                account, cost_center = self.random_target()
+                qty, rate = self.random.randint(1, 20), flt(self.random.uniform(10, 1000), 2)
+                item = frappe._dict(
+                    name=f"{name}-{idx}", parent=name, expense_account=account, cost_center=cost_center,
+                    qty=qty, rate=rate, amount=flt(qty * rate, 2), date=date,
+                )
+                items.append((
+                    item.name, name, "Material Request", "items", idx, self.item_code, self.item_code, self.item_code,
+                    qty, qty, 0, "Nos", "Nos", 1, rate, item.amount, account, cost_center, date, 1,
+                ))
+                reservations.append(make_ledger_entry(
+                    frappe._dict(
+                        material_request=name, material_request_item=item.name, company=self.company,
+                        expense_account=account, cost_center=cost_center, project=None, transaction_date=date,
+                    ),
+                    "Material Request", name, item.name, item.amount,
+                ))
+                self.material_request_items.append(item)
+
+        self.bulk_insert("Material Request", (
+            "name", "company", "transaction_date", "schedule_date", "material_request_type", "status", "docstatus",
+        ), requests)
+        self.bulk_insert("Material Request Item", (
+            "name", "parent", "parenttype", "parentfield", "idx", "item_code", "item_name", "description",
+            "qty", "stock_qty", "ordered_qty", "uom", "stock_uom", "conversion_factor", "rate", "amount",
+            "expense_account", "cost_center", "schedule_date", "docstatus",
+        ), items)
+        self.bulk_insert(LEDGER_DOCTYPE, LEDGER_FIELDS, reservations)
+
+    def make_purchase_orders(self):
+        orders, items, consumptions = [], [], []
+        unlinked = list(self.material_request_items)
+        self.random.shuffle(unlinked)
+        for number in range(self.size.purchase_orders):
+            name = f"{self.prefix}-PO-{number}"
+            date = self.random_date()
+            orders.append((name, self.company, self.supplier, date, date, "To Receive and Bill", 1, 1, 1))
+            for idx in range(1, self.size.items_per_doc + 1):
+                source = unlinked.pop() if unlinked and self.random.random() < LINKED_PO_SHARE else None
+                if source:
+                    account, cost_center, qty, rate = source.expense_account, source.cost_center, source.qty, source.rate
+                else:
+                    account, cost_center = self.random_target()
+                    qty, rate = self.random.randint(1, 20), flt(self.random.uniform(10, 1000), 2)
+                amount = flt(qty * rate, 2)
+                billed = flt(amount * self.random.uniform(0.1, 0.9), 2) if self.random.random() < BILLED_PO_SHARE else 0
+                detail = f"{name}-{idx}"
+                items.append((
+                    detail, name, "Purchase Order", "items", idx, self.item_code, self.item_code, self.item_code,
+                    qty, qty, "Nos", "Nos", 1, rate, amount, rate, amount, billed, account, cost_center,
+                    source.parent if source else None, source.name if source else None, date, 1,
+                ))
+                if source:
+                    consumptions.append(make_ledger_entry(
+                        frappe._dict(
+                            material_request=source.parent, material_request_item=source.name, company=self.company,
+                            expense_account=account, cost_center=cost_center, project=None, transaction_date=source.date,
+                        ),
+                        "Purchase Order", name, detail, -source.amount,
+                    ))
+
+        self.bulk_insert("Purchase Order", (
+            "name", "company", "supplier", "transaction_date", "schedule_date", "status", "conversion_rate",
+            "plc_conversion_rate", "docstatus",
+        ), orders)
+        self.bulk_insert("Purchase Order Item", (
+            "name", "parent", "parenttype", "parentfield", "idx", "item_code", "item_name", "description",
+            "qty", "stock_qty", "uom", "stock_uom", "conversion_factor", "rate", "amount", "base_rate",
+            "base_amount", "billed_amt", "expense_account", "cost_center", "material_request",
+            "material_request_item", "schedule_date", "docstatus",
+        ), items)
+        self.bulk_insert(LEDGER_DOCTYPE, LEDGER_FIELDS, consumptions)
+
+
+def get_benchmarks(data):
+    """Name -> callable of everything that is timed; each call checks one random account and cost center"""
+    from wcfcb_zm.api.material_request import check_monthly_budget_simple, get_budget_details
+    from wcfcb_zm.api.purchase_order import check_budget as check_po_budget
+    from wcfcb_zm.wcfcb_zm.report.wcfcb_budget_variance_report.wcfcb_budget_variance_report import execute
+
+    def target():
+        return data.random_target()
+
+    return {
+        "get_budget_details": lambda: get_budget_details(*target(), transaction_date=nowdate()),
+        "check_monthly_budget_simple": lambda: check_monthly_budget_simple(*target(), requested_amount=1000),
+        "purchase_order.check_budget": lambda: check_po_budget(*target(), requested_amount=1000, transaction_date=nowdate()),
+        "budget_variance_report": lambda: execute(frappe._dict(
+            company=data.company,
+            from_fiscal_year=data.fiscal_year,
+            to_fiscal_year=data.fiscal_year,
+            period="Monthly",
+            budget_against="Cost Center",
+            budget_against_filter=data.cost_centers,
+        )),
+    }
+
+
+def time_call(fn, repeat):
+    """Wall time (ms) and SQL count of each of `repeat` calls, after one warm-up call"""
+    fn()
+    timings, queries = [], []
+    for _ in range(repeat):
+        count = [0]
+        with sql_listener(lambda query, values, elapsed_ms: count.__setitem__(0, count[0] + 1)):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(count[0])
+
+    return {
+        "runs": repeat,
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "sql_count": round(statistics.mean(queries), 1),
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=frappe.get_app_path("wcfcb_zm"), text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(scale, repeat=10, company=DEFAULT_COMPANY, seed=42, keep_data=False):
+    """Generate the data for a scale, time every benchmark and return the result document"""
+    start = time.perf_counter()
+    data = BenchmarkData(scale, company=company, seed=seed).generate()
+    generation_s = time.perf_counter() - start
+
+    try:
+        results = {name: time_call(fn, repeat) for name, fn in get_benchmarks(data).items()}
+    finally:
+        if keep_data:
+            frappe.db.commit()
+        else:
+            frappe.db.rollback()
+
+    return {
+        "commit": get_commit(),
+        "scale": scale,
+        "seed": seed,
+        "rows": data.counts,
+        "generation_s": round(generation_s, 1),
+        "results": results,
+    }
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Benchmarks whose median slowed down by more than `tolerance` (a fraction) against the baseline"""
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before["median_ms"]:
+            continue
+        change = result["median_ms"] / before["median_ms"] - 1
+        if change > tolerance:
+            regressions.append({
+                "benchmark": name,
+                "baseline_ms": before["median_ms"],
+                "current_ms": result["median_ms"],
+                "change": round(change, 3),
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WCFCB budget benchmark")
+    parser.add_argument("--site", default="wcfcb")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--company", default=DEFAULT_COMPANY)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--keep-data", action="store_true", help="commit the synthetic data instead of rolling back")
+    args = parser.parse_args()
+
+    frappe.init(site=args.site)
+    frappe.connect()
+    frappe.set_user("Administrator")
+    try:
+        result = run_benchmark(args.scale, args.repeat, args.company, args.seed, args.keep_data)
+    finally:
+        frappe.destroy()
+
+    output = json.dumps(result, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), result, args.tolerance)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['benchmark']}: {regression['baseline_ms']} ms -> "
+                f"{regression['current_ms']} ms ({regression['change']:+.0%})"
+            )
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+WCFCB Budget Math Micro-Benchmarks
+Times the database-free budget arithmetic; needs no Frappe site
+
+    python -m wcfcb_zm.tests.budget_math_benchmark
+    python -m wcfcb_zm.tests.budget_math_benchmark --lines 10000 --output math.json
+
+Each benchmark runs `--number` calls per sample and reports the time of one
+call in microseconds. The results use the same layout as budget_benchmark.
+
+Not a test module: the test runner does not pick it up.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import timeit
+
+from wcfcb_zm.api.budget_math import (
+    apply_budget_status,
+    available_amount,
+    budget_status,
+    monthly_budget_amount,
+)
+
+
+def get_benchmarks(lines, seed=42):
+    rng = random.Random(seed)
+    rows = [
+        {
+            "available_budget": rng.uniform(-1000, 100000),
+            "has_monthly_distribution": rng.random() < 0.5,
+            "monthly_available_budget": rng.uniform(-1000, 10000),
+        }
+        for _ in range(lines)
+    ]
+
+    return {
+        "available_amount": lambda: available_amount(100000, 25000.5, 1200, 3400.25),
+        "monthly_budget_amount": lambda: monthly_budget_amount(100000, 8.333),
+        "budget_status": lambda: budget_status(1500, 2000, 1000),
+        f"apply_budget_status[{lines}]": lambda: apply_budget_status(rows, 1500),
+    }
+
+
+def time_call(fn, repeat, number):
+    """Microseconds per call over `repeat` samples of `number` calls each"""
+    samples = [t / number * 1e6 for t in timeit.repeat(fn, repeat=repeat, number=number)]
+    return {
+        "runs": repeat * number,
+        "min_us": round(min(samples), 3),
+        "median_us": round(statistics.median(samples), 3),
+        "max_us": round(max(samples), 3),
+    }
+
+
+def run_benchmark(lines=1000, repeat=5, number=100, seed=42):
+    results = {
+        name: time_call(fn, repeat, number if "[" not in name else max(1, number // 10))
+        for name, fn in get_benchmarks(lines, seed).items()
+    }
+    return {"lines": lines, "seed": seed, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WCFCB budget math micro-benchmarks")
+    parser.add_argument("--lines", type=int, default=1000, help="rows in the multi-row benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=100, help="calls per sample (a tenth for the multi-row ones)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    output = json.dumps(run_benchmark(args.lines, args.repeat, args.number, args.seed), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,30 +2,79 @@
 """
 WCFCB Test Runner - Frappe Style
 Comprehensive test runner for all WCFCB customizations using Frappe's official test approach
+
+Every run records how long each test took and prints the slowest ones. With
+--sites the modules are split over several test sites (one database each, all
+with wcfcb_zm installed) and run in parallel, one process per site:
+
+    python -m wcfcb_zm.tests.run_wcfcb_tests --sites wcfcb-test1,wcfcb-test2,wcfcb-test3
+    python -m wcfcb_zm.tests.run_wcfcb_tests --modules wcfcb_zm.tests.test_budget_balance --timings timings.json
+
+Test classes built on wcfcb_zm.tests.utils.TransactionTestCase create their
+fixtures once per class and clean up by rolling back.
 """
 
 import frappe
+import json
 import unittest
+import subprocess
 import sys
 import os
+import tempfile
+import time
 from unittest.mock import patch
 
 
+class TimedTestResult(unittest.TextTestResult):
+    """Test result that records the duration of each test in seconds."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = {}
+
+    def startTest(self, test):
+        self._test_started = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        self.timings[test.id()] = time.perf_counter() - self._test_started
+        super().stopTest(test)
+
+
 class WCFCBTestRunner:
     """Test runner for WCFCB customizations."""
     
-    def __init__(self):
+    def __init__(self, site="wcfcb"):
         """Initialize test runner."""
+        self.site = site
+        self.timings = {}
+        self.module_timings = {}
         self.test_modules = [
             'wcfcb_zm.tests.test_wcfcb_budget_system',
             'wcfcb_zm.tests.test_wcfcb_server_scripts', 
-            'wcfcb_zm.tests.test_wcfcb_custom_doctypes'
+            'wcfcb_zm.tests.test_wcfcb_custom_doctypes',
+            'wcfcb_zm.tests.test_budget_amendment_chain',
+            'wcfcb_zm.tests.test_virement_concurrency',
+            'wcfcb_zm.tests.test_virement_consolidation',
+            'wcfcb_zm.tests.test_amended_budget_builder',
+            'wcfcb_zm.tests.test_amendment_preview',
+            'wcfcb_zm.tests.test_virement_action_router',
+            'wcfcb_zm.tests.test_workflow_meta',
+            'wcfcb_zm.tests.test_budget_picker',
+            'wcfcb_zm.tests.test_budget_balance',
+            'wcfcb_zm.tests.test_summary_cache',
+            'wcfcb_zm.tests.test_virement_context',
+            'wcfcb_zm.tests.test_transfer_items',
+            'wcfcb_zm.tests.test_budget_reservation',
+            'wcfcb_zm.tests.test_instrumentation',
+            'wcfcb_zm.tests.test_slow_query',
+            'wcfcb_zm.tests.test_budget_math'
         ]
         
     def setup_test_environment(self):
         """Set up the test environment."""
         # Initialize Frappe
-        frappe.init(site="wcfcb")
+        frappe.init(site=self.site)
         frappe.connect()
         frappe.set_user("Administrator")
         
@@ -104,9 +153,13 @@ class WCFCBTestRunner:
             # Run tests
             runner = unittest.TextTestRunner(
                 verbosity=2 if verbose else 1,
-                stream=sys.stdout
+                stream=sys.stdout,
+                resultclass=TimedTestResult
             )
+            started = time.perf_counter()
             result = runner.run(suite)
+            self.module_timings[module_name] = time.perf_counter() - started
+            self.timings.update(result.timings)
             
             # Print results
             if result.wasSuccessful():
@@ -135,8 +188,8 @@ class WCFCBTestRunner:
             print(f"❌ Error running {module_name}: {str(e)}")
             return False
             
-    def run_all_tests(self, verbose=True):
-        """Run all WCFCB tests."""
+    def run_all_tests(self, verbose=True, modules=None):
+        """Run all WCFCB tests, or only the given modules."""
         print("🚀 Starting WCFCB Comprehensive Test Suite")
         print("=" * 60)
         
@@ -145,20 +198,67 @@ class WCFCBTestRunner:
         self.setup_mocking()
         
         results = {}
-        total_success = True
         
         try:
             # Run each test module
-            for module in self.test_modules:
-                success = self.run_test_module(module, verbose)
-                results[module] = success
-                if not success:
-                    total_success = False
+            for module in modules or self.test_modules:
+                results[module] = self.run_test_module(module, verbose)
                     
         finally:
             # Cleanup
             self.cleanup_mocking()
             
+        self.results = results
+        return self.print_summary(results)
+
+    def run_parallel(self, sites, verbose=False, modules=None):
+        """Split the modules over several test sites and run one process per site."""
+        modules = modules or self.test_modules
+        batches = {site: modules[i::len(sites)] for i, site in enumerate(sites)}
+        batches = {site: batch for site, batch in batches.items() if batch}
+
+        print(f"🚀 Running {len(modules)} test modules on {len(batches)} sites in parallel")
+        print("=" * 60)
+
+        workdir = tempfile.mkdtemp(prefix="wcfcb_tests_")
+        processes = {}
+        for site, batch in batches.items():
+            output = os.path.join(workdir, f"{site}.json")
+            log = open(os.path.join(workdir, f"{site}.log"), "w")
+            command = [
+                sys.executable, "-m", "wcfcb_zm.tests.run_wcfcb_tests",
+                "--site", site, "--modules", ",".join(batch), "--timings", output, "--slowest", "0",
+            ]
+            if verbose:
+                command.append("--verbose")
+            processes[site] = (subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT), log, output)
+
+        results = {}
+        for site, (process, log, output) in processes.items():
+            process.wait()
+            log.close()
+            print(f"\n🖥️  Site {site} (exit code {process.returncode})")
+            with open(log.name) as f:
+                print(f.read())
+
+            try:
+                with open(output) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                # The process died before writing its results
+                data = {"results": {module: False for module in batches[site]}, "tests": {}, "modules": {}}
+
+            results.update(data["results"])
+            self.timings.update(data["tests"])
+            self.module_timings.update(data["modules"])
+
+        self.results = results
+        return self.print_summary(results)
+
+    def print_summary(self, results):
+        """Print the per-module results; True when all of them passed."""
+        total_success = all(results.values())
+            
         # Print final summary
         print("\n" + "=" * 60)
         print("📊 FINAL TEST RESULTS SUMMARY")
@@ -166,7 +266,8 @@ class WCFCBTestRunner:
         
         for module, success in results.items():
             status = "✅ PASSED" if success else "❌ FAILED"
-            print(f"{module}: {status}")
+            duration = self.module_timings.get(module)
+            print(f"{module}: {status}" + (f" ({duration:.1f}s)" if duration is not None else ""))
             
         print("\n" + "=" * 60)
         if total_success:
@@ -199,8 +300,29 @@ class WCFCBTestRunner:
         finally:
             self.cleanup_mocking()
             
+        self.results = {test_mapping[test_type]: success}
         return success
 
+    def print_timings(self, limit=10):
+        """Print the slowest tests."""
+        if not limit or not self.timings:
+            return
+
+        print(f"\n⏱️  SLOWEST {min(limit, len(self.timings))} TESTS")
+        slowest = sorted(self.timings.items(), key=lambda item: item[1], reverse=True)[:limit]
+        for test_id, duration in slowest:
+            print(f"   {duration:8.3f}s  {test_id}")
+
+    def write_timings(self, path):
+        """Write results and per-test and per-module durations as JSON."""
+        with open(path, "w") as f:
+            json.dump({
+                "site": self.site,
+                "results": getattr(self, "results", {}),
+                "modules": {module: round(duration, 3) for module, duration in self.module_timings.items()},
+                "tests": {test_id: round(duration, 3) for test_id, duration in self.timings.items()},
+            }, f, indent=2)
+
 
 def main():
     """Main entry point."""
@@ -211,16 +333,28 @@ def main():
                        default='all', help='Type of tests to run')
     parser.add_argument('--verbose', '-v', action='store_true', 
                        help='Verbose output')
+    parser.add_argument('--site', default='wcfcb', help='Site to run the tests on')
+    parser.add_argument('--sites', help='Comma-separated test sites to run the modules on in parallel')
+    parser.add_argument('--modules', help='Comma-separated test modules to run instead of all of them')
+    parser.add_argument('--timings', help='Write results and per-test durations to this JSON file')
+    parser.add_argument('--slowest', type=int, default=10, help='Number of slowest tests to print')
     
     args = parser.parse_args()
     
-    runner = WCFCBTestRunner()
+    runner = WCFCBTestRunner(site=args.site)
+    modules = args.modules.split(',') if args.modules else None
     
-    if args.type == 'all':
-        success = runner.run_all_tests(args.verbose)
+    if args.sites:
+        success = runner.run_parallel(args.sites.split(','), args.verbose, modules)
+    elif args.type == 'all':
+        success = runner.run_all_tests(args.verbose, modules)
     else:
         success = runner.run_specific_test(args.type, args.verbose)
     
+    runner.print_timings(args.slowest)
+    if args.timings:
+        runner.write_timings(args.timings)
+    
     sys.exit(0 if success else 1)
 
 
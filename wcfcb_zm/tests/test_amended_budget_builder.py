@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+WCFCB Amended Budget Builder Tests - Frappe Style
+Verifies the bulk-insert fast path produces the same Budget as the ORM path
+"""
+
+import frappe
+import unittest
+
+from wcfcb_zm.api.budget_request import (
+    copy_budget_accounts_with_multiple_adjustments,
+    create_amended_budget,
+    insert_amended_budget,
+)
+from wcfcb_zm.tests.utils import make_wcfcb_budget_multi_account
+
+# Standard columns that legitimately differ between two inserts
+VOLATILE_FIELDS = {"name", "parent", "creation", "modified", "owner", "modified_by"}
+
+
+class TestAmendedBudgetBuilder(unittest.TestCase):
+    """Test the fast-path amended Budget insert against the ORM insert."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test class."""
+        frappe.set_user("Administrator")
+
+    def setUp(self):
+        """Set up test environment."""
+        frappe.set_user("Administrator")
+        self.budget = make_wcfcb_budget_multi_account()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        frappe.db.rollback()
+
+    def build_amended_budget(self, adjustments):
+        source = frappe.db.sql("SELECT * FROM `tabBudget` WHERE name = %s", self.budget.name, as_dict=True)[0]
+        accounts = frappe.db.sql(
+            "SELECT account, budget_amount FROM `tabBudget Account` WHERE parent = %s ORDER BY idx",
+            self.budget.name,
+            as_dict=True,
+        )
+        amended = create_amended_budget(source, None, self.budget.name)
+        copy_budget_accounts_with_multiple_adjustments(accounts, amended, adjustments, add_missing=True)
+        return amended
+
+    def snapshot(self, budget_name):
+        """Persisted parent and child values, minus columns that differ per insert"""
+        doc = frappe.get_doc("Budget", budget_name)
+        parent = {k: v for k, v in doc.as_dict(no_default_fields=True).items() if k != "accounts"}
+        accounts = [
+            {k: v for k, v in row.as_dict().items() if k not in VOLATILE_FIELDS}
+            for row in doc.accounts
+        ]
+        return parent, accounts
+
+    def test_fast_path_matches_orm_path(self):
+        """Both paths persist the same Budget and the same Budget Account rows."""
+        first_account = self.budget.accounts[0].account
+        adjustments = {first_account: -500.0}
+
+        orm_budget = self.build_amended_budget(adjustments)
+        orm_budget.insert()
+        orm_snapshot = self.snapshot(orm_budget.name)
+
+        # Both drafts cannot coexist (duplicate budget validation), so drop the ORM one first
+        frappe.delete_doc("Budget", orm_budget.name, force=True, ignore_permissions=True)
+
+        fast_budget = insert_amended_budget(self.build_amended_budget(adjustments))
+        fast_snapshot = self.snapshot(fast_budget.name)
+
+        self.assertEqual(fast_snapshot, orm_snapshot)
+        self.assertEqual(len(fast_budget.accounts), len(self.budget.accounts))
+        self.assertEqual(
+            fast_budget.accounts[0].budget_amount,
+            self.budget.accounts[0].budget_amount - 500.0,
+        )
+
+    def test_fast_path_uses_one_child_insert(self):
+        """All Budget Account rows are written with a single bulk statement."""
+        calls = []
+        original_bulk_insert = frappe.db.bulk_insert
+
+        def counting_bulk_insert(doctype, fields, values, *args, **kwargs):
+            calls.append((doctype, len(values)))
+            return original_bulk_insert(doctype, fields, values, *args, **kwargs)
+
+        frappe.db.bulk_insert = counting_bulk_insert
+        try:
+            insert_amended_budget(self.build_amended_budget({}))
+        finally:
+            frappe.db.bulk_insert = original_bulk_insert
+
+        self.assertEqual(calls, [("Budget Account", len(self.budget.accounts))])
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestAmendedBudgetBuilder)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
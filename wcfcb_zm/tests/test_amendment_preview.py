@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+WCFCB Amendment Preview Tests - Frappe Style
+Tests that preview_amendment returns the change plan without writing anything
+"""
+
+import frappe
+import unittest
+
+from wcfcb_zm.api.budget_request import plan_virement_amendment
+from wcfcb_zm.tests.utils import TransactionTestCase, make_wcfcb_budget_multi_account
+
+
+class TestAmendmentPreview(TransactionTestCase):
+    """Test the read-only planning phase of the amendment pipeline."""
+
+    @classmethod
+    def make_fixtures(cls):
+        """One multi-account budget shared by all tests."""
+        cls.budget = make_wcfcb_budget_multi_account()
+        if len(cls.budget.accounts) < 2:
+            raise unittest.SkipTest("Need a budget with two accounts")
+
+        cls.from_account = cls.budget.accounts[0].account
+        cls.to_account = cls.budget.accounts[1].account
+
+    def test_preview_plans_net_changes_without_writes(self):
+        """The plan shows before/after per account and leaves Budgets untouched."""
+        transfers = [
+            {'from_account': self.from_account, 'to_account': self.to_account, 'amount_requested': 700},
+            {'from_account': self.to_account, 'to_account': self.from_account, 'amount_requested': 200},
+        ]
+        budget_count = frappe.db.count("Budget")
+
+        plan = plan_virement_amendment(transfers, 'Intra-Budget', self.budget.name)
+
+        self.assertTrue(plan['success'], plan['errors'])
+        self.assertEqual(frappe.db.count("Budget"), budget_count)
+        self.assertEqual(frappe.db.get_value("Budget", self.budget.name, "docstatus"), 1)
+
+        budget_plan = plan['budgets'][0]
+        self.assertEqual(budget_plan['amends_budget'], self.budget.name)
+        changes = {change['account']: change for change in budget_plan['changes']}
+        self.assertEqual(changes[self.from_account]['delta'], -500.0)
+        self.assertEqual(
+            changes[self.from_account]['after'],
+            self.budget.accounts[0].budget_amount - 500.0,
+        )
+        self.assertEqual(changes[self.to_account]['delta'], 500.0)
+
+    def test_preview_does_not_register_budgets(self):
+        """A budget missing from the amendment chain is planned as its own head, without inserting chain rows."""
+        frappe.db.delete("Budget Amendment Chain", {"name": self.budget.name})
+        chain_count = frappe.db.count("Budget Amendment Chain")
+        transfers = [{'from_account': self.from_account, 'to_account': self.to_account, 'amount_requested': 100}]
+
+        plan = plan_virement_amendment(transfers, 'Intra-Budget', self.budget.name)
+
+        self.assertEqual(plan['budgets'][0]['amends_budget'], self.budget.name)
+        self.assertEqual(frappe.db.count("Budget Amendment Chain"), chain_count)
+
+    def test_preview_collects_validation_errors(self):
+        """Missing FROM accounts are reported in the plan instead of raised."""
+        transfers = [{'from_account': 'Missing Account', 'to_account': self.to_account, 'amount_requested': 100}]
+
+        plan = plan_virement_amendment(transfers, 'Intra-Budget', self.budget.name)
+
+        self.assertFalse(plan['success'])
+        self.assertIn('Missing Account', plan['errors'][0])
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestAmendmentPreview)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
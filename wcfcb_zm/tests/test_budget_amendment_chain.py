@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+WCFCB Budget Amendment Chain Tests - Frappe Style
+Tests that the amendment chain tracks root, version and head across virement amendments
+"""
+
+import frappe
+import unittest
+
+from wcfcb_zm.api.budget_request import get_amended_budgets, process_intra_budget_amendment
+from wcfcb_zm.exn.doctype.budget_amendment_chain.budget_amendment_chain import (
+    get_chain_head,
+    get_chain_heads,
+    get_chain_history,
+)
+from wcfcb_zm.tests.utils import make_wcfcb_budget_multi_account
+
+
+class TestBudgetAmendmentChain(unittest.TestCase):
+    """Test the persisted Budget amendment chain."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test class."""
+        frappe.set_user("Administrator")
+
+    def setUp(self):
+        """Set up test environment."""
+        frappe.set_user("Administrator")
+        self.created_budgets = []
+
+    def tearDown(self):
+        """Clean up after tests."""
+        # Delete newest versions first so amended_from links never block deletion
+        for name in reversed(self.created_budgets):
+            try:
+                frappe.db.set_value("Budget", name, "docstatus", 2)
+                frappe.delete_doc("Budget", name, force=True, ignore_permissions=True)
+            except Exception:
+                pass
+        frappe.db.commit()
+
+    def make_budget(self):
+        budget = make_wcfcb_budget_multi_account()
+        self.created_budgets.append(budget.name)
+        return budget
+
+    def amend(self, budget_name, from_account, to_account, amount=1000):
+        result = process_intra_budget_amendment(budget_name, from_account, to_account, amount)
+        self.created_budgets.append(result['amended_budget_name'])
+        return result['amended_budget_name']
+
+    def test_new_budget_is_its_own_head(self):
+        """A fresh budget is version 0 and the head of its own chain."""
+        budget = self.make_budget()
+
+        self.assertEqual(get_chain_head(budget.name), budget.name)
+        history = get_chain_history(budget.name)
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0].version, 0)
+
+    def test_lookups_do_not_register_budgets(self):
+        """A budget missing from the chain is its own head, and looking it up writes nothing."""
+        budget = self.make_budget()
+        frappe.db.delete("Budget Amendment Chain", {"name": budget.name})
+
+        self.assertEqual(get_chain_head(budget.name), budget.name)
+        self.assertEqual(get_chain_heads([budget.name]), {budget.name: budget.name})
+        self.assertEqual(get_chain_history(budget.name), [])
+        self.assertFalse(frappe.db.exists("Budget Amendment Chain", budget.name))
+
+    def test_chain_follows_multiple_hops(self):
+        """The head is found from any version, not only one amended_from hop away."""
+        budget = self.make_budget()
+        if len(budget.accounts) < 2:
+            self.skipTest("Need a budget with two accounts")
+
+        from_account = budget.accounts[0].account
+        to_account = budget.accounts[1].account
+
+        first = self.amend(budget.name, from_account, to_account)
+        second = self.amend(first, from_account, to_account)
+
+        self.assertEqual(get_chain_head(budget.name), second)
+        self.assertEqual(get_chain_head(first), second)
+        self.assertEqual(
+            [row.budget for row in get_chain_history(second)],
+            [budget.name, first, second],
+        )
+        self.assertEqual(
+            get_amended_budgets(budget.name, virement_type='Intra-Budget'),
+            [second, first],
+        )
+
+        history = {row.budget: row for row in get_chain_history(budget.name)}
+        self.assertTrue(history[budget.name].is_cancelled)
+        self.assertTrue(history[second].is_head)
+        self.assertFalse(history[first].is_head)
+
+    def test_cancelled_head_is_skipped(self):
+        """A cancelled head falls back to the newest version that is not cancelled."""
+        budget = self.make_budget()
+        if len(budget.accounts) < 2:
+            self.skipTest("Need a budget with two accounts")
+
+        first = self.amend(budget.name, budget.accounts[0].account, budget.accounts[1].account)
+        frappe.db.set_value("Budget Amendment Chain", first, "is_cancelled", 1)
+        frappe.db.set_value("Budget Amendment Chain", budget.name, "is_cancelled", 0)
+
+        self.assertEqual(get_chain_head(first), budget.name)
+        self.assertEqual(get_chain_heads([first]), {first: budget.name})
+
+    def test_fully_cancelled_chain_raises(self):
+        """A chain with every version cancelled has nothing to amend."""
+        budget = self.make_budget()
+        frappe.db.set_value("Budget Amendment Chain", budget.name, "is_cancelled", 1)
+
+        with self.assertRaises(frappe.ValidationError):
+            get_chain_head(budget.name)
+        with self.assertRaises(frappe.ValidationError):
+            get_chain_heads([budget.name])
+        self.assertEqual(get_chain_head(budget.name, raise_if_cancelled=False), budget.name)
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestBudgetAmendmentChain)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+WCFCB Budget Balance Tests - Frappe Style
+Verifies the grouped per-account balance query against get_budget_details
+"""
+
+import frappe
+import unittest
+from frappe.utils import add_days, nowdate
+
+from wcfcb_zm.api.budget_balance import check_transfer_sufficiency, get_budget_account_balances
+from wcfcb_zm.api.budget_request import budget_virement_handler
+from wcfcb_zm.api.material_request import get_budget_details
+from wcfcb_zm.tests.utils import TransactionTestCase, make_wcfcb_budget_multi_account
+
+
+class TestBudgetBalance(TransactionTestCase):
+    """Test available balances computed for all accounts of a budget at once."""
+
+    @classmethod
+    def make_fixtures(cls):
+        """One multi-account budget shared by all tests; each test is rolled back after it."""
+        cls.budget = make_wcfcb_budget_multi_account()
+
+    def test_balances_cover_every_account(self):
+        """One call returns a balance row for each account of the budget."""
+        balances = get_budget_account_balances(self.budget.name)
+
+        self.assertEqual(list(balances), [row.account for row in self.budget.accounts])
+        for row in self.budget.accounts:
+            balance = balances[row.account]
+            self.assertEqual(balance.budget_amount, row.budget_amount)
+            self.assertEqual(
+                balance.available_balance,
+                balance.budget_amount - balance.actual_expenses - balance.committed,
+            )
+
+    def test_balances_match_get_budget_details(self):
+        """The grouped query applies the same rules as the per-account budget check."""
+        balances = get_budget_account_balances(self.budget.name)
+        year_start = frappe.db.get_value("Fiscal Year", self.budget.fiscal_year, "year_start_date")
+
+        for account, balance in balances.items():
+            details = [
+                row for row in get_budget_details(account, cost_center=self.budget.cost_center, transaction_date=year_start)
+                if row["budget_name"] == self.budget.name
+            ]
+            if not details:
+                continue
+            self.assertAlmostEqual(balance.available_balance, details[0]["available_budget"], places=2)
+
+    def test_accounts_filter(self):
+        """Only the requested accounts are returned; unknown accounts are left out."""
+        account = self.budget.accounts[0].account
+        balances = get_budget_account_balances(self.budget.name, [account, "Not A Budget Account"])
+
+        self.assertEqual(list(balances), [account])
+
+    def test_get_budget_balances_action(self):
+        """The router action returns the same rows as the helper."""
+        result = budget_virement_handler("get_budget_balances", budget=self.budget.name)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(
+            {row["account"]: row["available_balance"] for row in result["data"]},
+            {account: row.available_balance for account, row in get_budget_account_balances(self.budget.name).items()},
+        )
+
+    def test_transfers_drain_accounts_progressively(self):
+        """Each row sees the balance left by earlier rows on the same account."""
+        balances = get_budget_account_balances(self.budget.name)
+        first, second = [row.account for row in self.budget.accounts[:2]]
+        available = balances[first].available_balance
+
+        rows = check_transfer_sufficiency([
+            {"from_account": first, "to_account": second, "amount_requested": available - 1000},
+            {"from_account": first, "to_account": second, "amount_requested": 3000},
+            {"from_account": second, "to_account": first, "amount_requested": 5000},
+            {"from_account": first, "to_account": second, "amount_requested": 3000},
+        ], self.budget.name)
+
+        self.assertEqual([row.sufficient for row in rows], [True, False, True, True])
+        self.assertEqual(rows[1].from_available, 1000)
+        self.assertEqual(rows[1].shortfall, 2000)
+        self.assertEqual(rows[0].to_new_amount, balances[second].available_balance + available - 1000)
+        # Row 3 returned 5000 to the first account after row 2 took it below zero
+        self.assertEqual(rows[3].from_available, 3000)
+
+    def test_transfer_from_unknown_account_is_insufficient(self):
+        """A from account outside the budget fails with a message instead of raising."""
+        rows = check_transfer_sufficiency([
+            {"from_account": "Not A Budget Account", "to_account": self.budget.accounts[0].account, "amount_requested": 10},
+        ], self.budget.name)
+
+        self.assertFalse(rows[0].sufficient)
+        self.assertEqual(rows[0].shortfall, 10)
+        self.assertIn("not found", rows[0].message)
+
+    def test_validate_transfer_items_action(self):
+        """The batch validator reports which rows are short."""
+        first, second = [row.account for row in self.budget.accounts[:2]]
+        available = get_budget_account_balances(self.budget.name)[first].available_balance
+
+        result = budget_virement_handler(
+            "validate_transfer_items",
+            budget=self.budget.name,
+            items=[
+                {"from_account": first, "to_account": second, "amount_requested": available},
+                {"from_account": first, "to_account": second, "amount_requested": 1},
+            ],
+        )
+
+        self.assertTrue(result["success"])
+        self.assertFalse(result["sufficient_budget"])
+        self.assertEqual(result["insufficient_rows"], [2])
+
+    def test_validate_budget_transfer_uses_available_balance(self):
+        """Single-account validation compares against availability, not the raw budget amount."""
+        account = self.budget.accounts[0].account
+        available = get_budget_account_balances(self.budget.name)[account].available_balance
+
+        result = budget_virement_handler(
+            "validate_budget_transfer", budget=self.budget.name, expense_account=account, amount=available + 1
+        )
+
+        self.assertTrue(result["success"])
+        self.assertFalse(result["sufficient_budget"])
+        self.assertEqual(result["available_amount"], available)
+        self.assertEqual(result["shortfall"], 1)
+
+    def test_budget_request_validate_sets_item_balances(self):
+        """Saving a Budget Request fills the balance columns of every transfer item."""
+        first, second = [row.account for row in self.budget.accounts[:2]]
+        balances = get_budget_account_balances(self.budget.name)
+
+        budget_request = frappe.get_doc({
+            "doctype": "Budget Request",
+            "virement_type": "Intra-Budget",
+            "budget": self.budget.name,
+            "amount_requested": 3000,
+            "transfer_items": [
+                {"from_account": first, "to_account": second, "amount_requested": 1000},
+                {"from_account": first, "to_account": second, "amount_requested": 2000},
+            ],
+        }).insert(ignore_permissions=True)
+
+        first_row, second_row = budget_request.transfer_items
+        self.assertEqual(first_row.from_available, balances[first].available_balance)
+        self.assertEqual(first_row.from_remaining, balances[first].available_balance - 1000)
+        self.assertEqual(first_row.to_new_amount, balances[second].available_balance + 1000)
+        self.assertEqual(second_row.from_available, first_row.from_remaining)
+        self.assertEqual(second_row.to_available, first_row.to_new_amount)
+        self.assertEqual(second_row.from_remaining, balances[first].available_balance - 3000)
+
+    def make_purchase_order(self, account, amount):
+        """Submitted Purchase Order charging `amount` to an account of the test budget."""
+        supplier = frappe.db.get_value("Supplier", {}, "name")
+        item_code = frappe.db.get_value("Item", {"is_purchase_item": 1, "is_stock_item": 0}, "name")
+        if not supplier or not item_code:
+            self.skipTest("No supplier or non-stock purchase item to build a Purchase Order")
+
+        po = frappe.get_doc({
+            "doctype": "Purchase Order",
+            "supplier": supplier,
+            "company": self.budget.company,
+            "transaction_date": nowdate(),
+            "schedule_date": add_days(nowdate(), 7),
+            "items": [{
+                "item_code": item_code,
+                "qty": 1,
+                "rate": amount,
+                "expense_account": account,
+                "cost_center": self.budget.cost_center,
+                "schedule_date": add_days(nowdate(), 7),
+            }],
+        })
+        po.insert(ignore_permissions=True)
+        po.submit()
+        return po
+
+    def test_partially_billed_orders_commit_only_the_unbilled_part(self):
+        """Billed amounts are actuals, so they no longer count as Purchase Order commitment."""
+        account = self.budget.accounts[0].account
+        before = get_budget_account_balances(self.budget.name)[account].purchase_order_committed
+
+        # Three orders: unbilled, 40% billed and fully billed
+        orders = [self.make_purchase_order(account, 1000) for _ in range(3)]
+        for po, billed in zip(orders, (0, 400, 1000)):
+            frappe.db.set_value("Purchase Order Item", po.items[0].name, "billed_amt", billed)
+
+        balance = get_budget_account_balances(self.budget.name)[account]
+        self.assertAlmostEqual(balance.purchase_order_committed - before, 1000 + 600 + 0, places=2)
+
+        details = [
+            row for row in get_budget_details(account, cost_center=self.budget.cost_center, transaction_date=nowdate())
+            if row["budget_name"] == self.budget.name
+        ]
+        if details:
+            self.assertAlmostEqual(details[0]["purchase_order_committed"], balance.purchase_order_committed, places=2)
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestBudgetBalance)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+WCFCB Budget Math Tests - Property Based
+Checks the database-free budget arithmetic; runs without a Frappe site
+"""
+
+import unittest
+
+from hypothesis import given, strategies as st
+
+from wcfcb_zm.api.budget_math import (
+    EXCEEDS_ANNUAL_BUDGET,
+    EXCEEDS_BUDGET,
+    EXCEEDS_MONTHLY_BUDGET,
+    NO_MONTHLY_DISTRIBUTION,
+    WITHIN_BUDGET,
+    apply_budget_status,
+    available_amount,
+    budget_status,
+    monthly_budget_amount,
+    shortage,
+)
+
+# Amounts in whole cents, as they come from currency fields
+amounts = st.integers(min_value=0, max_value=10**9).map(lambda cents: cents / 100)
+signed_amounts = st.integers(min_value=-10**9, max_value=10**9).map(lambda cents: cents / 100)
+percentages = st.integers(min_value=0, max_value=100)
+
+
+class TestBudgetMath(unittest.TestCase):
+    """Properties of availability, monthly split and status derivation."""
+
+    @given(amounts, amounts, amounts, amounts)
+    def test_available_is_budget_less_spent_and_committed(self, budget, actual, mr, po):
+        """Every consumed amount lowers availability by exactly that amount."""
+        available = available_amount(budget, actual, mr, po)
+
+        self.assertAlmostEqual(available, budget - actual - mr - po, places=6)
+        self.assertAlmostEqual(available_amount(budget, actual, mr, po + 1), available - 1, places=6)
+        self.assertEqual(available_amount(budget), budget)
+
+    def test_missing_amounts_count_as_zero(self):
+        """None and empty values from SQL are treated as zero."""
+        self.assertEqual(available_amount(None, None, "", 0), 0)
+        self.assertEqual(shortage(None, None), 0)
+
+    @given(amounts, percentages)
+    def test_monthly_share_is_bounded_by_annual_budget(self, annual, percentage):
+        """A month's share lies between zero and the annual budget."""
+        monthly = monthly_budget_amount(annual, percentage)
+
+        self.assertGreaterEqual(monthly, 0)
+        self.assertLessEqual(monthly, annual + 1e-6)
+        if percentage == 100:
+            self.assertAlmostEqual(monthly, annual, places=6)
+
+    @given(amounts, signed_amounts)
+    def test_shortage_is_the_uncovered_part(self, requested, available):
+        """The shortage is never negative and is zero exactly when the request fits."""
+        missing = shortage(requested, available)
+
+        self.assertGreaterEqual(missing, 0)
+        self.assertEqual(missing == 0, requested <= available)
+
+    @given(amounts, signed_amounts)
+    def test_status_without_monthly_distribution(self, requested, available):
+        """Without a distribution the overall status is the annual one."""
+        status = budget_status(requested, available)
+
+        self.assertEqual(status["within_annual_budget"], requested <= available)
+        self.assertTrue(status["within_monthly_budget"])
+        self.assertEqual(status["monthly_budget_status"], NO_MONTHLY_DISTRIBUTION)
+        self.assertEqual(status["overall_status"], WITHIN_BUDGET if requested <= available else EXCEEDS_BUDGET)
+
+    @given(amounts, signed_amounts, signed_amounts)
+    def test_monthly_excess_takes_precedence(self, requested, available, monthly_available):
+        """The monthly limit decides first, then the annual one."""
+        status = budget_status(requested, available, monthly_available)
+
+        if requested > monthly_available:
+            expected = EXCEEDS_MONTHLY_BUDGET
+        elif requested > available:
+            expected = EXCEEDS_ANNUAL_BUDGET
+        else:
+            expected = WITHIN_BUDGET
+        self.assertEqual(status["overall_status"], expected)
+        self.assertEqual(status["within_monthly_budget"], requested <= monthly_available)
+
+    @given(amounts, signed_amounts, signed_amounts, st.booleans())
+    def test_apply_budget_status_reads_the_budget_rows(self, requested, available, monthly_available, has_monthly):
+        """Rows get the same fields budget_status computes, honouring has_monthly_distribution."""
+        row = {
+            "available_budget": available,
+            "has_monthly_distribution": has_monthly,
+            "monthly_available_budget": monthly_available,
+        }
+
+        [result] = apply_budget_status([row], requested)
+
+        expected = budget_status(requested, available, monthly_available if has_monthly else None)
+        self.assertEqual({key: result[key] for key in expected}, expected)
+        self.assertEqual(result["available_budget"], available)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestBudgetMath)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
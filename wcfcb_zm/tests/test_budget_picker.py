@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+WCFCB Budget Picker Tests - Frappe Style
+Tests for the cached, paginated budget lists behind the virement pickers
+"""
+
+import frappe
+import unittest
+
+from wcfcb_zm.api import budget_picker
+from wcfcb_zm.api.budget_picker import (
+    budget_picker_query,
+    clear_budget_picker_cache,
+    get_budget_picker_rows,
+    search_budget_picker,
+)
+from wcfcb_zm.tests.utils import TransactionTestCase, make_wcfcb_budget_multi_account
+
+
+class TestBudgetPicker(TransactionTestCase):
+    """Test the budget picker cache, search and pagination."""
+
+    @classmethod
+    def make_fixtures(cls):
+        """One submitted budget shared by all tests."""
+        cls.budget = make_wcfcb_budget_multi_account()
+
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        clear_budget_picker_cache()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        super().tearDown()
+        clear_budget_picker_cache()
+
+    def test_search_and_pagination_work_on_cached_rows(self):
+        """Pages, search text, multi-account filter and exclusion all apply to the cached list."""
+        rows = [[f'BUD-{i:05d}', i % 3, f'CC-{i % 7}', f'Company {i % 2}', '2025'] for i in range(100)]
+        original_load = budget_picker.load_budget_picker_rows
+        budget_picker.load_budget_picker_rows = lambda: rows
+        try:
+            page, total = search_budget_picker(start=20, page_len=10)
+            self.assertEqual(total, 100)
+            self.assertEqual([row[0] for row in page], [f'BUD-{i:05d}' for i in range(20, 30)])
+
+            page, total = search_budget_picker(txt='cc-6', multi_account_only=True, exclude='BUD-00020', page_len=100)
+            self.assertEqual(total, len([i for i in range(100) if i % 7 == 6 and i % 3 == 2 and i != 20]))
+
+            # Company and fiscal year filter the one cached list
+            page, total = search_budget_picker(company='Company 1', fiscal_year='2025', page_len=100)
+            self.assertEqual(total, 50)
+            self.assertEqual(page[0], ['BUD-00001', 1, 'CC-1'])
+            self.assertEqual(search_budget_picker(fiscal_year='2026')[1], 0)
+        finally:
+            budget_picker.load_budget_picker_rows = original_load
+
+    def test_submit_and_cancel_refresh_the_cache(self):
+        """A submitted budget appears in the picker and disappears once cancelled."""
+        budget = frappe.get_doc("Budget", self.budget.name)
+
+        names = [row[0] for row in get_budget_picker_rows()]
+        self.assertIn(budget.name, names)
+
+        budget.cancel()
+        names = [row[0] for row in get_budget_picker_rows()]
+        self.assertNotIn(budget.name, names)
+
+    def test_link_query_returns_descriptions(self):
+        """The Link field query returns (name, description) pairs for one page."""
+        results = budget_picker_query('Budget', self.budget.name, 'name', 0, 20, {'multi_account': 1})
+
+        self.assertEqual(results[0][0], self.budget.name)
+        self.assertIn(f'{len(self.budget.accounts)} accounts', results[0][1])
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestBudgetPicker)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
@@ -60,7 +60,10 @@ class TestBudgetReservation(FrappeTestCase):
                 "qty": 10,
                 "rate": 100,
                 "amount": 1000,
-                "warehouse": frappe.db.get_value("Warehouse", {"is_group": 0}, "name")
+                "warehouse": frappe.db.get_value("Warehouse", {"is_group": 0}, "name"),
+                "expense_account": frappe.get_cached_value(
+                    "Company", frappe.defaults.get_user_default("Company"), "default_expense_account"
+                )
             }]
         })
         mr.insert()
@@ -152,6 +155,7 @@ class TestBudgetReservation(FrappeTestCase):
         """Test budget status for independent POs"""
         # Create independent Purchase Order
         po = self.create_test_purchase_order()
+        po.custom_skip_mr_auto_link = 1
         po.insert()
         
         # Verify no MR linking
@@ -224,6 +228,129 @@ class TestBudgetReservation(FrappeTestCase):
         BudgetReservationManager.transfer_budget_from_mr_to_po(po2)
         # Should handle gracefully (budget already cleared)
     
+    def test_reservation_ledger_lifecycle(self):
+        """Test the ledger through MR submit, PO submit and PO cancel"""
+        mr = self.create_test_material_request()
+        self.assertEqual(BudgetReservationManager.validate_mr_budget_status(mr.name)["reserved_amount"], 1000)
+
+        # Submitting the PO consumes the MR item's reservation
+        po = self.create_test_purchase_order(mr)
+        po.schedule_date = frappe.utils.add_days(frappe.utils.nowdate(), 7)
+        po.insert()
+        po.submit()
+        self.assertEqual(BudgetReservationManager.validate_mr_budget_status(mr.name)["reserved_amount"], 0)
+
+        # Submitting again posts nothing further
+        BudgetReservationManager.transfer_budget_from_mr_to_po(po)
+        self.assertEqual(BudgetReservationManager.validate_mr_budget_status(mr.name)["reserved_amount"], 0)
+
+        # Cancelling the PO hands the reservation back to the MR
+        po.cancel()
+        self.assertEqual(BudgetReservationManager.validate_mr_budget_status(mr.name)["reserved_amount"], 1000)
+
+    def test_reservation_covers_linked_lines(self):
+        """Test the fast path for PO lines backed by their MR item's reservation"""
+        from wcfcb_zm.api.purchase_order import check_budget
+        from wcfcb_zm.budget_reservation import get_reservation_coverage
+
+        mr = self.create_test_material_request()
+
+        # A line within the reservation skips the budget check entirely
+        po = self.create_test_purchase_order(mr)
+        self.assertTrue(BudgetReservationManager.should_skip_budget_validation(po))
+        result = check_budget(
+            po.items[0].expense_account or mr.items[0].expense_account,
+            cost_center=mr.items[0].cost_center,
+            requested_amount=1000,
+            material_request_item=mr.items[0].name,
+        )
+        self.assertEqual(result[0]["overall_status"], "COVERED BY RESERVATION")
+
+        # A larger line is only partly covered; the excess needs a budget check
+        po.items[0].amount = 1500
+        self.assertFalse(BudgetReservationManager.should_skip_budget_validation(po))
+        coverage = get_reservation_coverage(po.items)[0]
+        self.assertEqual(coverage.covered_amount, 1000)
+        self.assertEqual(coverage.excess_amount, 500)
+
+    def test_reservation_used_by_another_po_does_not_cover(self):
+        """Test that a reservation consumed by one PO no longer covers another"""
+        from wcfcb_zm.budget_reservation import get_reservation_coverage
+
+        mr = self.create_test_material_request()
+
+        first_po = self.create_test_purchase_order(mr)
+        first_po.schedule_date = frappe.utils.add_days(frappe.utils.nowdate(), 7)
+        first_po.insert()
+        first_po.submit()
+
+        second_po = self.create_test_purchase_order(mr)
+        self.assertFalse(BudgetReservationManager.should_skip_budget_validation(second_po))
+        coverage = get_reservation_coverage(second_po.items, second_po.name)[0]
+        self.assertEqual(coverage.reserved_amount, 0)
+        self.assertEqual(coverage.excess_amount, 1000)
+
+    def test_saved_po_keeps_its_own_coverage(self):
+        """Test that re-checking a submitted PO counts the reservation it consumed"""
+        from wcfcb_zm.budget_reservation import get_reservation_coverage
+
+        mr = self.create_test_material_request()
+
+        po = self.create_test_purchase_order(mr)
+        po.schedule_date = frappe.utils.add_days(frappe.utils.nowdate(), 7)
+        po.insert()
+        po.submit()
+
+        coverage = get_reservation_coverage(po.items, po.name)[0]
+        self.assertEqual(coverage.reserved_amount, 1000)
+        self.assertTrue(coverage.covered)
+
+    def test_auto_link_matches_open_mr_items(self):
+        """Test linking of unlinked PO lines to open MR items"""
+        mr = self.create_test_material_request()
+
+        po = self.create_test_purchase_order()
+        po.items[0].expense_account = mr.items[0].expense_account
+        po.items[0].cost_center = mr.items[0].cost_center
+        po.append("items", dict(po.items[0].as_dict(), name=None, idx=None))
+
+        BudgetReservationManager.auto_link_po_to_mr(po)
+
+        # The first line takes the MR item; the second finds no other candidate
+        self.assertEqual(po.items[0].material_request_item, mr.items[0].name)
+        self.assertEqual(po.items[0].material_request, mr.name)
+        self.assertFalse(po.items[1].get("material_request_item"))
+        self.assertEqual(po.custom_linked_material_request, mr.name)
+
+    def test_auto_link_leaves_manual_links_alone(self):
+        """Test that a PO linked by hand gets no further lines linked"""
+        mr = self.create_test_material_request()
+        other_mr = self.create_test_material_request()
+
+        po = self.create_test_purchase_order(mr)
+        po.items[0].expense_account = other_mr.items[0].expense_account
+        po.items[0].cost_center = other_mr.items[0].cost_center
+        po.append("items", dict(po.items[0].as_dict(), name=None, idx=None, material_request=None, material_request_item=None))
+
+        BudgetReservationManager.auto_link_po_to_mr(po)
+
+        self.assertEqual(po.items[0].material_request_item, mr.items[0].name)
+        self.assertFalse(po.items[1].get("material_request_item"))
+
+    def test_auto_link_opt_out(self):
+        """Test that POs flagged to skip auto-linking stay independent"""
+        mr = self.create_test_material_request()
+
+        po = self.create_test_purchase_order()
+        po.items[0].expense_account = mr.items[0].expense_account
+        po.items[0].cost_center = mr.items[0].cost_center
+        po.custom_skip_mr_auto_link = 1
+
+        BudgetReservationManager.auto_link_po_to_mr(po)
+
+        self.assertFalse(po.items[0].get("material_request_item"))
+        self.assertEqual(po.custom_budget_reservation_status, "Reserved Independently")
+
     def test_error_handling(self):
         """Test error handling in budget reservation operations"""
         # Test with non-existent MR
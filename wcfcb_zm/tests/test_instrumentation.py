@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+WCFCB Instrumentation Tests - Frappe Style
+Verifies per-endpoint call, latency and SQL statistics and N+1 flagging
+"""
+
+import frappe
+import unittest
+
+from wcfcb_zm.api.instrumentation import (
+    DEFAULT_N_PLUS_ONE_THRESHOLD,
+    estimate_percentile,
+    get_endpoint_stats,
+    instrumented,
+    reset_endpoint_stats,
+)
+
+
+@instrumented
+def run_queries(count):
+    for _ in range(count):
+        frappe.db.sql("SELECT 1")
+    return count
+
+
+@instrumented
+def run_nested():
+    return run_queries(2)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test the instrumented decorator and the stats API."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test class."""
+        frappe.set_user("Administrator")
+
+    def setUp(self):
+        """Set up test environment."""
+        frappe.set_user("Administrator")
+        reset_endpoint_stats()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        reset_endpoint_stats()
+        frappe.db.rollback()
+
+    def get_stats(self, fn):
+        endpoint = f"{fn.__module__}.{fn.__qualname__}"
+        return next((row for row in get_endpoint_stats() if row["endpoint"] == endpoint), None)
+
+    def test_calls_and_queries_are_counted(self):
+        """Each call adds to the count, wall time and SQL counters of the endpoint."""
+        self.assertEqual(run_queries(3), 3)
+        run_queries(1)
+
+        stats = self.get_stats(run_queries)
+        self.assertEqual(stats["count"], 2)
+        self.assertEqual(stats["sql_count"], 4)
+        self.assertEqual(stats["avg_sql_count"], 2)
+        self.assertEqual(stats["n_plus_one"], 0)
+        self.assertEqual(sum(stats["histogram"].values()), 2)
+
+    def test_repeated_statement_is_flagged(self):
+        """A statement repeated up to the threshold within one call marks the call as N+1."""
+        run_queries(DEFAULT_N_PLUS_ONE_THRESHOLD)
+
+        stats = self.get_stats(run_queries)
+        self.assertEqual(stats["n_plus_one"], 1)
+        self.assertIn("SELECT 1", stats["n_plus_one_query"])
+
+    def test_nested_calls_count_once(self):
+        """An instrumented call inside another is part of the outer endpoint."""
+        run_nested()
+
+        self.assertIsNone(self.get_stats(run_queries))
+        self.assertEqual(self.get_stats(run_nested)["sql_count"], 2)
+
+    def test_sql_wrapper_is_removed(self):
+        """The query listener is only installed for the duration of a call."""
+        run_queries(1)
+        self.assertNotIn("sql", vars(frappe.db))
+
+    def test_percentiles_from_buckets(self):
+        """Percentiles are the upper bound of the bucket that holds them."""
+        histogram = {"le_5": 50, "le_100": 45, "le_1000": 4, "le_inf": 1}
+
+        self.assertEqual(estimate_percentile(histogram, 100, 0.5), 5)
+        self.assertEqual(estimate_percentile(histogram, 100, 0.95), 100)
+        self.assertEqual(estimate_percentile(histogram, 100, 0.99), 1000)
+        self.assertIsNone(estimate_percentile(histogram, 100, 1))
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestInstrumentation)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+WCFCB Slow Query Sampler Tests - Frappe Style
+Verifies normalization, fingerprint deduplication and the capped slow query log
+"""
+
+import frappe
+import unittest
+
+from wcfcb_zm.api.slow_query import (
+    SLOW_QUERY_DOCTYPE,
+    after_request,
+    before_request,
+    get_params_shape,
+    normalize_query,
+)
+
+
+class TestSlowQuery(unittest.TestCase):
+    """Test the opt-in slow query sampler."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test class."""
+        frappe.set_user("Administrator")
+
+    def setUp(self):
+        """Set up test environment."""
+        frappe.set_user("Administrator")
+        self.conf = dict(frappe.conf)
+        frappe.db.delete(SLOW_QUERY_DOCTYPE)
+        # Any query counts as slow
+        frappe.conf.wcfcb_slow_query_threshold_ms = 0.0001
+
+    def tearDown(self):
+        """Clean up after tests."""
+        frappe.conf.clear()
+        frappe.conf.update(self.conf)
+        frappe.db.delete(SLOW_QUERY_DOCTYPE)
+        frappe.db.commit()
+
+    def run_sampled(self, *queries):
+        before_request()
+        try:
+            for query, values in queries:
+                frappe.db.sql(query, values)
+        finally:
+            after_request()
+
+    def test_normalize_query(self):
+        """Literals, placeholders and IN lists do not change the normalized text."""
+        self.assertEqual(
+            normalize_query("SELECT name FROM `tabBudget`\n WHERE name IN ('a', 'b', 'c') AND idx = 3"),
+            normalize_query("SELECT name FROM `tabBudget` WHERE name IN (%(names)s) AND idx = %s"),
+        )
+
+    def test_params_shape(self):
+        """Only names, types and sizes of parameters are kept."""
+        self.assertEqual(
+            get_params_shape({"budget": "B-1", "items": ("a", "b"), "amount": 1.5}),
+            "amount: float, budget: str, items: tuple[2]",
+        )
+
+    def test_repeats_share_one_record(self):
+        """Queries with the same fingerprint are counted on one record with an EXPLAIN."""
+        self.run_sampled(
+            ("SELECT name FROM `tabBudget` WHERE name = %s", ["A"]),
+            ("SELECT name FROM `tabBudget` WHERE name = %s", ["B"]),
+        )
+        self.run_sampled(("SELECT name FROM `tabBudget` WHERE name = %s", ["C"]))
+
+        records = frappe.get_all(SLOW_QUERY_DOCTYPE, fields=["occurrences", "caller", "explain", "params_shape"])
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].occurrences, 3)
+        self.assertIn("wcfcb_zm.tests.test_slow_query", records[0].caller)
+        self.assertEqual(records[0].params_shape, "str")
+        self.assertTrue(frappe.parse_json(records[0].explain))
+
+    def test_log_is_capped(self):
+        """The least recently seen records are dropped beyond the limit."""
+        frappe.conf.wcfcb_slow_query_log_limit = 2
+        self.run_sampled(*[
+            (f"SELECT {column} FROM `tabBudget` LIMIT 1", None)
+            for column in ("name", "owner", "creation", "modified")
+        ])
+
+        self.assertEqual(frappe.db.count(SLOW_QUERY_DOCTYPE), 2)
+
+    def test_disabled_without_threshold(self):
+        """Nothing is sampled unless the threshold is configured."""
+        frappe.conf.wcfcb_slow_query_threshold_ms = 0
+        self.run_sampled(("SELECT name FROM `tabBudget` LIMIT 1", None))
+
+        self.assertEqual(frappe.db.count(SLOW_QUERY_DOCTYPE), 0)
+        self.assertNotIn("sql", vars(frappe.db))
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSlowQuery)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
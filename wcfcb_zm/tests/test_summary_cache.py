@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+WCFCB Summary Cache Tests - Frappe Style
+Verifies Budget Request summaries are served from cache until the request or its budgets change
+"""
+
+import frappe
+import unittest
+
+import wcfcb_zm.api.budget_request as budget_request_api
+from wcfcb_zm.api.summary_cache import clear_summary_cache, get_summary_version
+from wcfcb_zm.tests.utils import TransactionTestCase, make_wcfcb_budget_multi_account
+
+
+class TestSummaryCache(TransactionTestCase):
+    """Test the versioned Budget Request summary cache."""
+
+    @classmethod
+    def make_fixtures(cls):
+        """One budget and a Budget Request against it, shared by all tests."""
+        cls.budget = make_wcfcb_budget_multi_account()
+        first, second = [row.account for row in cls.budget.accounts[:2]]
+        cls.budget_request = frappe.get_doc({
+            "doctype": "Budget Request",
+            "virement_type": "Intra-Budget",
+            "budget": cls.budget.name,
+            "amount_requested": 1000,
+            "transfer_items": [{"from_account": first, "to_account": second, "amount_requested": 1000}],
+        }).insert(ignore_permissions=True)
+
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        clear_summary_cache()
+
+        self.builds = 0
+        self.original_build = budget_request_api.build_summary_details
+
+        def counting_build(*args):
+            self.builds += 1
+            return self.original_build(*args)
+
+        budget_request_api.build_summary_details = counting_build
+
+    def tearDown(self):
+        """Clean up after tests."""
+        budget_request_api.build_summary_details = self.original_build
+        clear_summary_cache()
+        super().tearDown()
+
+    def get_summary(self):
+        return budget_request_api.get_summary_details(
+            self.budget.name, virement_type="Intra-Budget", doc_name=self.budget_request.name
+        )
+
+    def test_repeated_views_are_cached(self):
+        """The second view of an unchanged request does not rebuild the summary."""
+        first = self.get_summary()
+        second = self.get_summary()
+
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(first, second)
+        self.assertTrue(first["multi_transfer"])
+
+    def test_argument_sets_are_cached_separately(self):
+        """Different arguments for the same request (e.g. pages) each keep their own entry."""
+        first_page = budget_request_api.get_summary_details(
+            self.budget.name, virement_type="Intra-Budget", doc_name=self.budget_request.name, page_len=1
+        )
+        self.get_summary()
+        budget_request_api.get_summary_details(
+            self.budget.name, virement_type="Intra-Budget", doc_name=self.budget_request.name, page_len=1
+        )
+        self.get_summary()
+
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(
+            budget_request_api.get_summary_details(
+                self.budget.name, virement_type="Intra-Budget", doc_name=self.budget_request.name, page_len=1
+            ),
+            first_page,
+        )
+
+    def test_request_update_rebuilds(self):
+        """Saving the request changes its version and clears its entry."""
+        self.get_summary()
+        version = get_summary_version(self.budget_request.name, [self.budget.name])
+
+        budget_request = frappe.get_doc("Budget Request", self.budget_request.name)
+        budget_request.transfer_items[0].amount_requested = 2000
+        budget_request.save(ignore_permissions=True)
+        summary = self.get_summary()
+
+        self.assertNotEqual(get_summary_version(self.budget_request.name, [self.budget.name]), version)
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(summary["transfer_items"][0]["amount"], 2000)
+
+    def test_budget_change_clears_all_summaries(self):
+        """A Budget event drops every cached summary."""
+        self.get_summary()
+        clear_summary_cache(self.budget)
+        self.get_summary()
+
+        self.assertEqual(self.builds, 2)
+
+    def test_unsaved_request_is_not_cached(self):
+        """Summaries without a saved request are always computed."""
+        budget_request_api.get_summary_details(self.budget.name, virement_type="Intra-Budget")
+        budget_request_api.get_summary_details(self.budget.name, virement_type="Intra-Budget")
+
+        self.assertEqual(self.builds, 2)
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestSummaryCache)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
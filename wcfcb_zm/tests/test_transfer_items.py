@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+WCFCB Transfer Items Tests - Frappe Style
+Verifies paged transfer items, paged summaries and the SQL net-delta aggregation
+"""
+
+import frappe
+import unittest
+
+from wcfcb_zm.api.budget_request import (
+    budget_virement_handler,
+    build_summary_details,
+    consolidate_transfers,
+    get_budget_accounts,
+    get_transfers_from_doc,
+)
+from wcfcb_zm.api.transfer_items import get_net_delta_page, get_net_deltas, get_transfer_item_page
+from wcfcb_zm.tests.utils import TransactionTestCase, make_wcfcb_budget_multi_account
+
+ITEM_COUNT = 7
+
+
+class TestTransferItems(TransactionTestCase):
+    """Test reading large Budget Requests a page at a time."""
+
+    @classmethod
+    def make_fixtures(cls):
+        """Create a multi-account budget and a request with several transfer items."""
+        cls.budget = make_wcfcb_budget_multi_account()
+        if len(cls.budget.accounts) < 2:
+            raise unittest.SkipTest("Need a budget with two accounts")
+
+        first, second = [row.account for row in cls.budget.accounts[:2]]
+        cls.budget_request = frappe.get_doc({
+            "doctype": "Budget Request",
+            "virement_type": "Intra-Budget",
+            "budget": cls.budget.name,
+            "amount_requested": 0,
+            "transfer_items": [
+                {
+                    "from_account": first if i % 3 else second,
+                    "to_account": second if i % 3 else first,
+                    "amount_requested": 100 * (i + 1),
+                }
+                for i in range(ITEM_COUNT)
+            ],
+        }).insert(ignore_permissions=True)
+
+    def test_transfer_item_pages(self):
+        """Pages follow row order and report the total item count."""
+        first_page, total = get_transfer_item_page(self.budget_request.name, 0, 3)
+        last_page, _ = get_transfer_item_page(self.budget_request.name, 6, 3)
+
+        self.assertEqual(total, ITEM_COUNT)
+        self.assertEqual([row.idx for row in first_page], [1, 2, 3])
+        self.assertEqual([row.idx for row in last_page], [7])
+
+    def test_net_deltas_match_consolidation(self):
+        """The SQL aggregation nets transfers exactly like consolidate_transfers."""
+        expected = consolidate_transfers(get_transfers_from_doc(self.budget_request), self.budget.name)
+        actual = get_net_deltas(self.budget_request.name, self.budget.name)
+
+        self.assertEqual(set(actual), set(expected))
+        for key, delta in expected.items():
+            self.assertAlmostEqual(actual[key], delta, places=2)
+
+    def test_net_delta_page_before_and_after(self):
+        """The net-delta view adds each account's net change to its budget amount."""
+        rows, total = get_net_delta_page(self.budget_request.name)
+        amounts = {row.account: row.budget_amount for row in self.budget.accounts}
+
+        self.assertEqual(total, 2)
+        self.assertAlmostEqual(sum(row.net_delta for row in rows), 0, places=2)
+        for row in rows:
+            self.assertEqual(row.before, amounts[row.account])
+            self.assertAlmostEqual(row.after, row.before + row.net_delta, places=2)
+
+    def test_paged_summary_matches_full_summary(self):
+        """A summary page carries the same progressive amounts as the full summary."""
+        args = (self.budget.name, None, "Intra-Budget", None, None, self.budget_request.name)
+        full = build_summary_details(*args)
+        page = build_summary_details(*args, start=3, page_len=3)
+
+        self.assertEqual(page["total_items"], ITEM_COUNT)
+        self.assertEqual(page["start"], 3)
+        self.assertEqual(page["transfer_items"], full["transfer_items"][3:6])
+
+    def test_budget_accounts_search_folds_transfers(self):
+        """The account search shows balances after all transfers without loading the request."""
+        net_deltas = get_net_deltas(self.budget_request.name, self.budget.name)
+        results = dict(get_budget_accounts(filters={"budget": self.budget.name, "doc_name": self.budget_request.name}))
+
+        for row in self.budget.accounts:
+            current = row.budget_amount + net_deltas.get((self.budget.name, row.account), 0)
+            self.assertIn(f"K {current:,.0f}", results[row.account])
+
+    def test_paging_actions(self):
+        """The router exposes transfer item and net-delta pages."""
+        items = budget_virement_handler("get_transfer_items", doc_name=self.budget_request.name, start=5, page_len=5)
+        deltas = budget_virement_handler("get_transfer_net_deltas", doc_name=self.budget_request.name)
+
+        self.assertTrue(items["success"])
+        self.assertEqual(len(items["data"]), 2)
+        self.assertEqual(items["total"], ITEM_COUNT)
+        self.assertTrue(deltas["success"])
+        self.assertEqual(deltas["total"], 2)
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestTransferItems)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
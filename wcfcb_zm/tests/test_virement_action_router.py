@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+WCFCB Virement Action Router Tests - Frappe Style
+Tests for the registry-based dispatch behind budget_virement_handler
+"""
+
+import frappe
+import unittest
+
+from wcfcb_zm.api.action_router import ActionRouter, Param, get_action_stats, reset_action_stats, shared_cache
+from wcfcb_zm.api.budget_request import budget_virement_handler, virement_actions
+
+
+class TestVirementActionRouter(unittest.TestCase):
+    """Test parameter coercion, dispatch, batching and timing statistics."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test class."""
+        frappe.set_user("Administrator")
+
+    def setUp(self):
+        self.router = ActionRouter('test_router')
+
+        @self.router.action(
+            amount=Param(float, required=True),
+            account=Param(str, aliases=('expense_account',)),
+            items=Param(list, default=[])
+        )
+        def echo(amount, account, items):
+            return {'amount': amount, 'account': account, 'items': items}
+
+        self.loads = []
+
+        @shared_cache
+        def load(name):
+            self.loads.append(name)
+            return name.upper()
+
+        @self.router.action(name=Param(str, required=True))
+        def lookup(name):
+            return {'success': True, 'data': load(name)}
+
+    def tearDown(self):
+        """Clean up after tests."""
+        reset_action_stats('test_router')
+
+    def test_arguments_are_coerced_once(self):
+        """Request strings become typed values before the action runs."""
+        result = self.router.dispatch('echo', {
+            'amount': '1500.50',
+            'expense_account': ' Travel ',
+            'items': '["a", "b"]',
+            'cmd': 'ignored'
+        })
+
+        self.assertEqual(result, {'amount': 1500.5, 'account': 'Travel', 'items': ['a', 'b']})
+
+    def test_invalid_arguments_are_reported(self):
+        """Missing and malformed parameters are returned as failures, not raised."""
+        self.assertEqual(
+            self.router.dispatch('echo', {'amount': 'None'})['message'],
+            'Missing required parameters: amount'
+        )
+        self.assertIn('Invalid value for amount', self.router.dispatch('echo', {'amount': 'abc'})['message'])
+        self.assertIn('Invalid action', self.router.dispatch('missing', {})['message'])
+
+    def test_calls_are_recorded_per_action(self):
+        """Each dispatch adds to the action's call count and histogram."""
+        for _ in range(3):
+            self.router.dispatch('echo', {'amount': 1})
+
+        stats = {row['action']: row for row in get_action_stats('test_router')}
+        self.assertEqual(stats['echo']['count'], 3)
+        self.assertEqual(sum(stats['echo']['histogram'].values()), 3)
+
+    def test_batch_returns_results_in_order(self):
+        """A batch runs every entry and a failing entry does not stop the others."""
+        result = self.router.dispatch('batch', {'calls': [
+            {'action': 'echo', 'kwargs': {'amount': '2'}},
+            {'action': 'echo', 'kwargs': {}},
+            {'action': 'batch', 'kwargs': {'calls': []}},
+            {'action': 'lookup', 'kwargs': {'name': 'bud-1'}},
+        ]})
+
+        self.assertTrue(result['success'])
+        results = result['results']
+        self.assertEqual(results[0]['amount'], 2.0)
+        self.assertFalse(results[1]['success'])
+        self.assertFalse(results[2]['success'])
+        self.assertEqual(results[3]['data'], 'BUD-1')
+
+    def test_batch_shares_loads_between_actions(self):
+        """Shared loaders run once per batch and again for the next request."""
+        calls = [{'action': 'lookup', 'kwargs': {'name': 'bud-1'}} for _ in range(3)]
+
+        self.router.dispatch('batch', {'calls': calls})
+        self.assertEqual(self.loads, ['bud-1'])
+
+        self.router.dispatch('lookup', {'name': 'bud-1'})
+        self.assertEqual(self.loads, ['bud-1', 'bud-1'])
+
+    def test_handler_returns_action_value(self):
+        """budget_virement_handler returns the action result instead of setting frappe.response."""
+        self.assertIn('validate_amount_approval', virement_actions.actions)
+
+        result = budget_virement_handler(action='validate_amount_approval', amount='300000')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['amount'], 300000.0)
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestVirementActionRouter)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
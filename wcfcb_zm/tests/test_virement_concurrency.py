@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+WCFCB Virement Concurrency Tests - Frappe Style
+Stress test firing simultaneous approvals against the same source budget
+"""
+
+import threading
+
+import frappe
+import unittest
+
+from wcfcb_zm.api.budget_request import process_approval_with_amendment, virement_actions
+from wcfcb_zm.exn.doctype.budget_amendment_chain.budget_amendment_chain import (
+    get_chain_head,
+    get_chain_history,
+)
+from wcfcb_zm.tests.utils import make_wcfcb_budget_multi_account
+
+CONCURRENT_APPROVALS = 6
+TRANSFER_AMOUNT = 1000
+
+
+class TestVirementConcurrency(unittest.TestCase):
+    """Concurrent approvals against one budget must amend it one after the other."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test class."""
+        frappe.set_user("Administrator")
+        if not frappe.get_meta("Budget Request").has_field("workflow_state"):
+            raise unittest.SkipTest("Budget Request workflow is not installed on this site")
+
+    def setUp(self):
+        """Create one multi-account budget and N approved requests against it."""
+        frappe.set_user("Administrator")
+        self.budget = make_wcfcb_budget_multi_account()
+        if len(self.budget.accounts) < 2:
+            self.skipTest("Need a budget with two accounts")
+
+        self.from_account = self.budget.accounts[0].account
+        self.to_account = self.budget.accounts[1].account
+        self.budget_requests = [self.make_approved_request() for _ in range(CONCURRENT_APPROVALS)]
+
+        # Worker threads use their own connections and only see committed data
+        frappe.db.commit()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        for name in self.budget_requests:
+            frappe.db.set_value("Budget Request", name, "docstatus", 2)
+            frappe.delete_doc("Budget Request", name, force=True, ignore_permissions=True)
+
+        for row in reversed(get_chain_history(self.budget.name)):
+            try:
+                frappe.db.set_value("Budget", row.budget, "docstatus", 2)
+                frappe.delete_doc("Budget", row.budget, force=True, ignore_permissions=True)
+            except Exception:
+                pass
+
+        frappe.db.commit()
+
+    def make_approved_request(self):
+        budget_request = frappe.get_doc({
+            "doctype": "Budget Request",
+            "virement_type": "Intra-Budget",
+            "budget": self.budget.name,
+            "target_budget": self.budget.name,
+            "amount_requested": TRANSFER_AMOUNT,
+            "transfer_items": [{
+                "from_account": self.from_account,
+                "to_account": self.to_account,
+                "amount_requested": TRANSFER_AMOUNT,
+            }],
+        })
+        budget_request.insert(ignore_permissions=True)
+        frappe.db.set_value("Budget Request", budget_request.name, {
+            "docstatus": 1,
+            "workflow_state": "Approved",
+        })
+        return budget_request.name
+
+    def approve_in_thread(self, site, doc_name, results):
+        frappe.init(site=site)
+        frappe.connect()
+        frappe.set_user("Administrator")
+        try:
+            results[doc_name] = process_approval_with_amendment(
+                doc_name, "Intra-Budget", self.budget.name, self.budget.name, None, None, None
+            )
+        finally:
+            frappe.destroy()
+
+    def test_concurrent_approvals_build_a_linear_chain(self):
+        """Every approval lands on the previous one's amendment - none is lost."""
+        site = frappe.local.site
+        results = {}
+        threads = [
+            threading.Thread(target=self.approve_in_thread, args=(site, name, results))
+            for name in self.budget_requests
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for name in self.budget_requests:
+            self.assertTrue(results.get(name, {}).get('success'), results.get(name))
+
+        history = get_chain_history(self.budget.name)
+        self.assertEqual(len(history), CONCURRENT_APPROVALS + 1)
+        for previous, current in zip(history, history[1:]):
+            self.assertEqual(current.amended_from, previous.budget)
+
+        head = get_chain_head(self.budget.name)
+        amounts = dict(frappe.get_all(
+            "Budget Account",
+            filters={"parent": head},
+            fields=["account", "budget_amount"],
+            as_list=True,
+        ))
+        moved = CONCURRENT_APPROVALS * TRANSFER_AMOUNT
+        self.assertEqual(amounts[self.from_account], self.budget.accounts[0].budget_amount - moved)
+        self.assertEqual(amounts[self.to_account], self.budget.accounts[1].budget_amount + moved)
+
+
+    def test_approval_is_refused_in_batch(self):
+        """Approvals commit their transaction, so a batch must not run them with other actions."""
+        result = virement_actions.dispatch_batch([{
+            "action": "process_approval_with_amendment",
+            "kwargs": {
+                "doc_name": self.budget_requests[0],
+                "virement_type": "Intra-Budget",
+                "budget": self.budget.name,
+                "expense_account": self.from_account,
+                "to_expense_account": self.to_account,
+                "amount_requested": TRANSFER_AMOUNT,
+            },
+        }])
+
+        self.assertFalse(result["results"][0]["success"])
+        self.assertEqual(get_chain_head(self.budget.name), self.budget.name)
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestVirementConcurrency)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
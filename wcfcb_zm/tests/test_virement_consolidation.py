@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+WCFCB Virement Consolidation Tests - Frappe Style
+Tests for netting multi-transfer batches into per-(budget, account) deltas
+"""
+
+import frappe
+import unittest
+
+from wcfcb_zm.api.budget_request import (
+    consolidate_transfers,
+    get_budget_adjustments,
+    summarize_consolidated_transfers,
+    validate_consolidated_transfers,
+)
+
+
+class TestVirementConsolidation(unittest.TestCase):
+    """Test the consolidation stage of the batch amendment pipeline."""
+
+    def setUp(self):
+        self.transfers = [
+            {'from_account': 'Travel', 'to_account': 'Training', 'amount_requested': 100},
+            {'from_account': 'Travel', 'to_account': 'Fuel', 'amount_requested': 50},
+            {'from_account': 'Training', 'to_account': 'Travel', 'amount_requested': 30},
+        ]
+
+    def test_intra_budget_deltas_net_out(self):
+        """Opposite transfers within one budget net into a single delta per account."""
+        deltas = consolidate_transfers(self.transfers, 'BUD-A')
+
+        self.assertEqual(deltas, {
+            ('BUD-A', 'Travel'): -120.0,
+            ('BUD-A', 'Training'): 70.0,
+            ('BUD-A', 'Fuel'): 50.0,
+        })
+        self.assertEqual(sum(deltas.values()), 0)
+
+    def test_inter_budget_deltas_are_keyed_by_budget(self):
+        """The same account in the source and target budget keeps two separate deltas."""
+        deltas = consolidate_transfers(self.transfers, 'BUD-A', 'BUD-B')
+
+        self.assertEqual(get_budget_adjustments(deltas, 'BUD-A'), {'Travel': -150.0, 'Training': -30.0})
+        self.assertEqual(get_budget_adjustments(deltas, 'BUD-B'), {'Training': 100.0, 'Fuel': 50.0, 'Travel': 30.0})
+
+    def test_batch_validation_reports_all_missing_accounts(self):
+        """One pass over the batch lists every FROM account missing from the source budget."""
+        with self.assertRaises(Exception) as context:
+            validate_consolidated_transfers(self.transfers, 'BUD-A', [{'account': 'Fuel'}])
+
+        self.assertIn('Training, Travel', str(context.exception))
+
+    def test_summary_is_one_entry_per_account(self):
+        """The audit summary grows with accounts touched, not with transfer rows."""
+        transfers = self.transfers * 50
+        summary = summarize_consolidated_transfers('Intra-Budget batch', transfers, consolidate_transfers(transfers, 'BUD-A'))
+
+        self.assertIn('150 transfer(s)', summary)
+        self.assertEqual(summary.count('BUD-A/'), 3)
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestVirementConsolidation)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+WCFCB Virement Context Tests - Frappe Style
+Verifies an approval loads the Budget Request and each Budget only once
+"""
+
+import frappe
+import unittest
+
+import wcfcb_zm.api.virement_context as virement_context
+from wcfcb_zm.api.budget_request import process_approval_with_amendment
+from wcfcb_zm.tests.utils import TransactionTestCase, make_wcfcb_budget_multi_account
+
+
+class TestVirementContext(TransactionTestCase):
+    """Test that one approval reads every document once.
+
+    The approval commits; TransactionTestCase keeps that inside the class transaction.
+    """
+
+    @classmethod
+    def make_fixtures(cls):
+        """Create a multi-account budget and an approved multi-transfer request against it."""
+        if not frappe.get_meta("Budget Request").has_field("workflow_state"):
+            raise unittest.SkipTest("Budget Request workflow is not installed on this site")
+
+        cls.budget = make_wcfcb_budget_multi_account()
+        if len(cls.budget.accounts) < 2:
+            raise unittest.SkipTest("Need a budget with two accounts")
+
+        first, second = [row.account for row in cls.budget.accounts[:2]]
+        budget_request = frappe.get_doc({
+            "doctype": "Budget Request",
+            "virement_type": "Intra-Budget",
+            "budget": cls.budget.name,
+            "amount_requested": 3000,
+            "transfer_items": [
+                {"from_account": first, "to_account": second, "amount_requested": 1000},
+                {"from_account": second, "to_account": first, "amount_requested": 500},
+                {"from_account": first, "to_account": second, "amount_requested": 2000},
+            ],
+        }).insert(ignore_permissions=True)
+        frappe.db.set_value("Budget Request", budget_request.name, {
+            "docstatus": 1,
+            "workflow_state": "Approved",
+        })
+        cls.doc_name = budget_request.name
+
+    def test_approval_loads_each_document_once(self):
+        """The request, the budget and its accounts are each read a single time."""
+        contexts = []
+        original_init = virement_context.VirementContext.__init__
+
+        def recording_init(context):
+            original_init(context)
+            contexts.append(context)
+
+        request_loads = []
+        original_get_doc = frappe.get_doc
+
+        def counting_get_doc(*args, **kwargs):
+            if args and args[0] == "Budget Request":
+                request_loads.append(args[1:])
+            return original_get_doc(*args, **kwargs)
+
+        virement_context.VirementContext.__init__ = recording_init
+        frappe.get_doc = counting_get_doc
+        try:
+            result = process_approval_with_amendment(
+                self.doc_name, "Intra-Budget", self.budget.name, None, None, None, None
+            )
+        finally:
+            virement_context.VirementContext.__init__ = original_init
+            frappe.get_doc = original_get_doc
+
+        self.assertTrue(result["success"], result.get("message"))
+        self.assertEqual(len(contexts), 1)
+        self.assertEqual(dict(contexts[0].loads), {"Budget Request": 1, "Budget": 1, "Budget Account": 1})
+        self.assertEqual(len(request_loads), 1)
+
+
+    def test_batch_shares_documents_with_loaders(self):
+        """Inside a batch the context and the shared_cache loaders hold one copy of each document."""
+        frappe.local.action_batch_cache = {}
+        try:
+            budget_request = virement_context.load_budget_request(self.doc_name)
+            context = virement_context.VirementContext()
+
+            self.assertIs(context.get_budget_request(self.doc_name), budget_request)
+            self.assertIs(virement_context.load_budget(self.budget.name), context.get_budget(self.budget.name))
+            self.assertEqual(dict(context.loads), {"Budget": 1})
+        finally:
+            frappe.local.action_batch_cache = None
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestVirementContext)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+WCFCB Workflow Metadata Tests - Frappe Style
+Tests for the cached workflow states and external approval threshold
+"""
+
+import frappe
+import unittest
+
+from wcfcb_zm.api import workflow_meta
+from wcfcb_zm.api.workflow_meta import (
+    clear_workflow_meta,
+    get_workflow_meta,
+    requires_external_approval,
+)
+
+
+class TestWorkflowMeta(unittest.TestCase):
+    """Test the workflow metadata cache behind the external approval checks."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test class."""
+        frappe.set_user("Administrator")
+
+    def tearDown(self):
+        """Clean up after tests."""
+        frappe.conf.pop('budget_external_approval_threshold', None)
+        clear_workflow_meta()
+
+    def test_requires_external_approval_is_pure(self):
+        """The amount check compares absolute amounts against the threshold."""
+        self.assertTrue(requires_external_approval(300000, 250000))
+        self.assertTrue(requires_external_approval('-300000', 250000))
+        self.assertFalse(requires_external_approval(250000, 250000))
+
+    def test_threshold_comes_from_site_config(self):
+        """The threshold is read from site config when the cache is rebuilt."""
+        clear_workflow_meta()
+        self.assertEqual(get_workflow_meta()['external_approval_threshold'], 250000)
+
+        frappe.conf.budget_external_approval_threshold = 100000
+        clear_workflow_meta()
+        self.assertEqual(get_workflow_meta()['external_approval_threshold'], 100000)
+
+    def test_metadata_is_loaded_once_until_cleared(self):
+        """Repeated checks reuse the cached metadata; clearing forces one reload."""
+        loads = []
+        original_load = workflow_meta.load_workflow_meta
+
+        def counting_load(doctype):
+            loads.append(doctype)
+            return original_load(doctype)
+
+        clear_workflow_meta()
+        workflow_meta.load_workflow_meta = counting_load
+        try:
+            for _ in range(5):
+                get_workflow_meta()
+            clear_workflow_meta()
+            get_workflow_meta()
+        finally:
+            workflow_meta.load_workflow_meta = original_load
+
+        self.assertEqual(loads, ['Budget Request', 'Budget Request'])
+
+
+if __name__ == "__main__":
+    frappe.init(site="wcfcb")
+    frappe.connect()
+
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestWorkflowMeta)
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    exit(0 if result.wasSuccessful() else 1)
@@ -0,0 +1,197 @@
+"""
+Shared helpers for WCFCB tests: budget factories and a base class that cleans
+up by rolling back instead of deleting.
+"""
+
+import random
+import time
+import unittest
+
+import frappe
+from frappe.utils import nowdate
+from erpnext.accounts.utils import get_fiscal_year
+
+FIXTURES_SAVEPOINT = "wcfcb_fixtures"
+TEST_SAVEPOINT = "wcfcb_test"
+
+
+class TransactionTestCase(unittest.TestCase):
+    """Test case isolated by the database transaction.
+
+    `make_fixtures` runs once per class, inside the class transaction, and
+    whatever it creates is shared by every test of the class. Each test runs
+    after a savepoint and is rolled back to it, and the class transaction is
+    rolled back at the end, so nothing needs deleting.
+
+    For the lifetime of the class commits are disabled, as a commit by the
+    code under test would end the transaction, and a plain rollback by the
+    code under test only goes back to the current savepoint, so it cannot
+    wipe the shared fixtures. Tests that need committed data, e.g. to share it
+    with other connections, cannot use this class; neither can code that runs
+    DDL, which commits implicitly in MariaDB.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        frappe.set_user("Administrator")
+        frappe.db.rollback()
+        cls._original_commit = frappe.db.commit
+        cls._original_rollback = frappe.db.rollback
+        frappe.db.commit = lambda *args, **kwargs: None
+        frappe.db.rollback = cls.rollback_to_savepoint
+        cls._savepoint = FIXTURES_SAVEPOINT
+        frappe.db.savepoint(FIXTURES_SAVEPOINT)
+        try:
+            cls.make_fixtures()
+        except BaseException:
+            cls.tearDownClass()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._original_rollback()
+        frappe.db.commit = cls._original_commit
+        frappe.db.rollback = cls._original_rollback
+        frappe.set_user("Administrator")
+
+    @classmethod
+    def rollback_to_savepoint(cls, *, save_point=None, **kwargs):
+        """Stand-in for frappe.db.rollback: a plain rollback only undoes the current test or fixture setup"""
+        cls._original_rollback(save_point=save_point or cls._savepoint, **kwargs)
+
+    @classmethod
+    def make_fixtures(cls):
+        """Create the records shared by all tests of the class"""
+
+    def setUp(self):
+        frappe.set_user("Administrator")
+        type(self)._savepoint = TEST_SAVEPOINT
+        frappe.db.savepoint(TEST_SAVEPOINT)
+
+    def tearDown(self):
+        self._original_rollback(save_point=TEST_SAVEPOINT)
+        frappe.set_user("Administrator")
+
+
+def make_wcfcb_budget(submit=True, **args):
+    """Create a WCFCB budget with proper custom fields."""
+    args = frappe._dict(args)
+
+    # Get current fiscal year
+    fiscal_year = get_fiscal_year(nowdate())[0]
+
+    # Create unique budget name with more randomness
+    unique_suffix = str(int(time.time() * 1000))[-6:] + str(random.randint(1000, 9999))
+
+    # Create new budget
+    budget = frappe.new_doc("Budget")
+
+    # Set basic fields
+    budget.company = "Workers Compensation Fund Control Board"
+    budget.fiscal_year = fiscal_year
+    budget.budget_against = "Cost Center"
+
+    # Get unique cost center and account to avoid duplicates
+    cost_centers = frappe.get_all("Cost Center",
+        filters={"company": "Workers Compensation Fund Control Board", "is_group": 0},
+        fields=["name"],
+        limit=20  # Get more options
+    )
+    if cost_centers:
+        # Use more randomness for selection
+        cc_index = (int(unique_suffix) + random.randint(0, 100)) % len(cost_centers)
+        budget.cost_center = cost_centers[cc_index].name
+
+    # Set WCFCB custom mandatory fields
+    budget.custom_fund_type = args.get("custom_fund_type", "Pension Fund")
+    budget.custom_location = args.get("custom_location", "HQ1")
+    budget.custom_consolidation_group = args.get("custom_consolidation_group", "OPEX - HQ")
+
+    # Set monthly distribution
+    monthly_dists = frappe.get_all("Monthly Distribution", limit=1)
+    if monthly_dists:
+        budget.monthly_distribution = monthly_dists[0].name
+
+    # Set budget control settings
+    budget.applicable_on_booking_actual_expenses = 1
+    budget.action_if_annual_budget_exceeded = args.get("action_if_annual_budget_exceeded", "Warn")
+    budget.action_if_accumulated_monthly_budget_exceeded = args.get("action_if_accumulated_monthly_budget_exceeded", "Warn")
+
+    # Add budget account with more randomness
+    expense_accounts = frappe.get_all("Account",
+        filters={
+            "company": "Workers Compensation Fund Control Board",
+            "account_type": "Expense Account",
+            "is_group": 0
+        },
+        fields=["name"],
+        limit=50  # Get many more options
+    )
+
+    if expense_accounts:
+        # Use more randomness for account selection
+        account_index = (int(unique_suffix) + random.randint(0, 1000)) % len(expense_accounts)
+        budget.append("accounts", {
+            "account": expense_accounts[account_index].name,
+            "budget_amount": args.get("budget_amount", 100000)
+        })
+
+    # Insert budget
+    budget.insert(ignore_permissions=True)
+
+    if submit:
+        budget.submit()
+
+    return budget
+
+
+def make_wcfcb_budget_multi_account():
+    """Create a budget with multiple accounts for intra-budget testing."""
+    budget = make_wcfcb_budget(submit=False, budget_amount=200000)
+
+    # Add second account
+    expense_accounts = frappe.get_all("Account",
+        filters={
+            "company": "Workers Compensation Fund Control Board",
+            "account_type": "Expense Account",
+            "is_group": 0
+        },
+        fields=["name"],
+        limit=5
+    )
+
+    if len(expense_accounts) > 1:
+        budget.append("accounts", {
+            "account": expense_accounts[1].name,
+            "budget_amount": 150000
+        })
+
+    budget.submit()
+    return budget
+
+
+def make_wcfcb_budget_request(**args):
+    """Create a WCFCB Budget Request."""
+    args = frappe._dict(args)
+
+    # Create unique name
+    unique_suffix = str(int(time.time() * 1000))[-6:]
+
+    budget_request = frappe.new_doc("Budget Request")
+    budget_request.company = "Workers Compensation Fund Control Board"
+    budget_request.virement_type = args.get("virement_type", "Intra-Budget")
+    budget_request.transfer_amount = args.get("transfer_amount", 50000)
+    budget_request.reason = f"Test budget transfer {unique_suffix}"
+
+    # Set source budget if provided
+    if args.get("source_budget"):
+        budget_request.source_budget = args.source_budget
+
+    # Set target budget for inter-budget transfers
+    if args.get("target_budget"):
+        budget_request.target_budget = args.target_budget
+
+    budget_request.insert(ignore_permissions=True)
+    budget_request.submit()
+
+    return budget_request
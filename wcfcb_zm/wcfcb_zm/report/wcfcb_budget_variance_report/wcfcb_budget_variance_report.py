@@ -7,6 +7,8 @@ from frappe import _
 from frappe.utils import flt, formatdate
 from erpnext.controllers.trends import get_period_date_ranges, get_period_month_ranges
 
+from wcfcb_zm.exn.doctype.budget_amendment_chain.budget_amendment_chain import get_chain_head
+
 def execute(filters=None):
     if not filters:
         filters = {}
@@ -38,7 +40,9 @@ def get_final_data(dimension, dimension_items, filters, period_month_ranges, dat
         {budget_against_field: dimension},  # e.g., {"cost_center": "Main - DS"}
         "name"
     )
-    
+    # Link to the latest amendment rather than whichever version the lookup returned
+    budget_document_id = get_chain_head(budget_document_id, raise_if_cancelled=False)
+
     for account, monthwise_data in dimension_items.items():
         row = {
             "budget_document_id": budget_document_id,  # Ensure this is a valid Budget document name